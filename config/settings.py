@@ -42,6 +42,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
     "users",
     "materials",
@@ -96,6 +97,54 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# При нескольких процессах приложения укажите CACHE_LOCATION, чтобы версии
+# тестов и ключи ответов хранились в общем файловом кеше.
+
+if os.getenv("CACHE_LOCATION"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.getenv("CACHE_LOCATION"),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+ANSWER_KEY_CACHE_SIZE = 256
+
+# Ключ ответов в памяти процесса и в кеше Django живет не дольше
+# ANSWER_KEY_CACHE_TTL секунд: при кеше в памяти процесса исправленный ключ
+# доходит до других процессов не позже этого срока.
+ANSWER_KEY_CACHE_TTL = 30
+
+BULK_SUBMIT_CHUNK_SIZE = 500
+
+# Асинхронная проверка: отправка сохраняется как попытка и проверяется
+# обработчиками "python manage.py grade_attempts".
+ASYNC_GRADING = True if os.getenv("ASYNC_GRADING") == "True" else False
+
+REGRADE_CHUNK_SIZE = 1000
+
+# Воспроизводимое перемешивание вопросов и вариантов ответа для каждого студента.
+SHUFFLE_TEST_QUESTIONS = True
+
+# Анализ заданий тестов: "python manage.py analyze_items" заранее заполняет кеш.
+ITEM_ANALYSIS_CHUNK_SIZE = 5000
+
+ITEM_ANALYSIS_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Экспорт и импорт банков вопросов: размер порции чтения и bulk_create.
+QUESTION_BANK_CHUNK_SIZE = 1000
+
+# Выгрузка результатов тестов: размер порции чтения курсором.
+GRADEBOOK_CHUNK_SIZE = 2000
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -132,6 +181,12 @@ USE_TZ = True
 
 STATIC_URL = "static/"
 
+# Опубликованные снимки тестов (JSON, gzip) хранятся в MEDIA_ROOT/test_snapshots.
+
+MEDIA_URL = "media/"
+
+MEDIA_ROOT = BASE_DIR / "media"
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -140,19 +195,24 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 AUTH_USER_MODEL = "users.User"
 
 REST_FRAMEWORK = {
-    "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
-    ),
+    "DEFAULT_AUTHENTICATION_CLASSES": ("users.authentication.ClaimsJWTAuthentication",),
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
+    "DEFAULT_PAGINATION_CLASS": "pagination.CreatedAtCursorPagination",
 }
 
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=180),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
+    "TOKEN_OBTAIN_SERIALIZER": "users.tokens.RoleTokenObtainPairSerializer",
+    "TOKEN_REFRESH_SERIALIZER": "users.tokens.RoleTokenRefreshSerializer",
 }
 
+# Роли и версия токенов пользователя передаются в claims JWT, версия сверяется
+# с БД не чаще раза в TOKEN_VERSION_CACHE_TTL секунд на процесс.
+TOKEN_VERSION_CACHE_TTL = 30
+
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:8000",
 ]
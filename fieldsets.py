@@ -0,0 +1,124 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.utils.module_loading import import_string
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+
+
+def parse_fieldset(value):
+    """Список имен из параметра вида "a,b,c", None — параметр не передан."""
+
+    if value is None:
+        return None
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+class FieldsetSerializerMixin:
+    """Примесь ModelSerializer, оставляющая поля из context["fields"] и раскрывающая связи из context["expand"].
+
+    Раскрываемые связи задаются в expandable_fields: имя поля -> путь к
+    serializer связанной модели.
+    """
+
+    expandable_fields = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        expand = self.context.get("expand") or ()
+        for name in expand:
+            serializer_class = import_string(self.expandable_fields[name])
+            self.fields[name] = serializer_class(read_only=True)
+
+        fields = self.context.get("fields")
+        if fields is not None:
+            for name in set(self.fields) - set(fields) - set(expand):
+                self.fields.pop(name)
+
+
+class FieldsetViewSetMixin:
+    """Примесь ViewSet с параметрами ?fields= и ?expand= для чтения.
+
+    Сужает serializer и загружает из БД только нужные столбцы через only(),
+    раскрываемые связи — через select_related. Поля из required_fields и
+    поля сортировки пагинации загружаются всегда: они нужны для проверки
+    прав и курсора.
+    """
+
+    required_fields = ("id", "owner")
+
+    def get_fieldset(self):
+        """Выбранные поля (None — все) и раскрываемые связи запроса."""
+
+        if hasattr(self, "_fieldset"):
+            return self._fieldset
+
+        self._fieldset = (None, ())
+        if self.request is None or self.request.method not in SAFE_METHODS:
+            return self._fieldset
+
+        fields = parse_fieldset(self.request.query_params.get("fields"))
+        expand = parse_fieldset(self.request.query_params.get("expand")) or []
+        serializer_class = self.get_serializer_class()
+
+        unknown = [
+            name for name in expand if name not in serializer_class.expandable_fields
+        ]
+        if unknown:
+            raise ValidationError(
+                {"expand": [f"Связь нельзя раскрыть: {', '.join(unknown)}."]}
+            )
+        if fields is not None:
+            available = set(serializer_class().fields) | set(expand)
+            unknown = [name for name in fields if name not in available]
+            if unknown:
+                raise ValidationError(
+                    {"fields": [f"Неизвестные поля: {', '.join(unknown)}."]}
+                )
+
+        self._fieldset = (fields, tuple(expand))
+        return self._fieldset
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["fields"], context["expand"] = self.get_fieldset()
+        return context
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fields, expand = self.get_fieldset()
+        if expand:
+            queryset = queryset.select_related(*expand)
+        if fields is not None:
+            columns = self._get_columns(queryset.model, [*fields, *expand])
+            if columns is not None:
+                queryset = queryset.only(*columns)
+        return queryset
+
+    def _get_columns(self, model, fields):
+        """Поля модели для only(), None — среди полей есть не поля модели."""
+
+        serializer_fields = self.get_serializer_class()().fields
+        ordering = getattr(self.paginator, "ordering", None) or ()
+        if isinstance(ordering, str):
+            ordering = (ordering,)
+
+        columns = set()
+        for name in fields:
+            field = serializer_fields.get(name)
+            source = field.source.split(".")[0] if field is not None else name
+            try:
+                model_field = model._meta.get_field(source)
+            except FieldDoesNotExist:
+                return None
+            if not model_field.concrete:
+                return None
+            columns.add(source)
+
+        for name in [*self.required_fields, *ordering]:
+            name = name.lstrip("-")
+            try:
+                model._meta.get_field(name)
+            except FieldDoesNotExist:
+                continue
+            columns.add(name)
+        return sorted(columns)
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:51
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("materials", "0005_alter_material_section"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="material",
+            index=models.Index(
+                fields=["created_at", "id"], name="materials_m_created_28ec3f_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="section",
+            index=models.Index(
+                fields=["created_at", "id"], name="materials_s_created_f134a2_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("materials", "0006_list_cursor_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="material",
+            index=models.Index(
+                fields=["owner", "created_at", "id"],
+                name="materials_m_owner_i_8d9267_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="section",
+            index=models.Index(
+                fields=["owner", "created_at", "id"],
+                name="materials_s_owner_i_94fe38_idx",
+            ),
+        ),
+    ]
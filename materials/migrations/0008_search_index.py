@@ -0,0 +1,26 @@
+from django.db import migrations
+
+from search import install_search_index, uninstall_search_index
+
+TABLES = ["materials_section", "materials_material"]
+
+
+def install(apps, schema_editor):
+    for table in TABLES:
+        install_search_index(schema_editor, table)
+
+
+def uninstall(apps, schema_editor):
+    for table in TABLES:
+        uninstall_search_index(schema_editor, table)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("materials", "0007_owner_list_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(install, uninstall),
+    ]
@@ -26,6 +26,10 @@ class Section(models.Model):
     class Meta:
         verbose_name = "Раздел"
         verbose_name_plural = "Разделы"
+        indexes = [
+            models.Index(fields=["created_at", "id"]),
+            models.Index(fields=["owner", "created_at", "id"]),
+        ]
 
 
 class Material(models.Model):
@@ -59,3 +63,7 @@ class Material(models.Model):
     class Meta:
         verbose_name = "Материал"
         verbose_name_plural = "Материалы"
+        indexes = [
+            models.Index(fields=["created_at", "id"]),
+            models.Index(fields=["owner", "created_at", "id"]),
+        ]
@@ -1,19 +1,54 @@
 from rest_framework import serializers
 
+from fieldsets import FieldsetSerializerMixin
 from materials.models import Material, Section
+from tests.models import Test
 
 
-class MaterialSerializer(serializers.ModelSerializer):
+class MaterialSerializer(FieldsetSerializerMixin, serializers.ModelSerializer):
     """Serializer модели Material."""
 
+    expandable_fields = {"section": "materials.serializer.SectionSerializer"}
+
     class Meta:
         model = Material
         fields = "__all__"
 
 
-class SectionSerializer(serializers.ModelSerializer):
+class SectionSerializer(FieldsetSerializerMixin, serializers.ModelSerializer):
     """Serializer модели Section."""
 
     class Meta:
         model = Section
         fields = "__all__"
+
+
+class TestTreeSerializer(serializers.ModelSerializer):
+    """Serializer теста в дереве разделов."""
+
+    questions_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Test
+        fields = ["id", "name", "passing_score", "questions_count"]
+
+
+class MaterialTreeSerializer(serializers.ModelSerializer):
+    """Serializer материала с тестами в дереве разделов."""
+
+    tests = TestTreeSerializer(source="answers", many=True, read_only=True)
+
+    class Meta:
+        model = Material
+        fields = ["id", "name", "tests"]
+
+
+class SectionTreeSerializer(serializers.ModelSerializer):
+    """Serializer раздела с материалами в дереве разделов."""
+
+    materials_count = serializers.IntegerField(read_only=True)
+    materials = MaterialTreeSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Section
+        fields = ["id", "name", "materials_count", "materials"]
@@ -0,0 +1,67 @@
+from django.core.cache import cache
+from django.db.models import Count, Prefetch
+from rest_framework.renderers import JSONRenderer
+
+from materials.models import Material, Section
+from materials.serializer import SectionTreeSerializer
+from tests.cache import get_section_tree_version
+from tests.models import Test
+
+
+class SectionTreeService:
+    """Дерево разделов с материалами и тестами для оглавления курса.
+
+    Дерево загружается тремя запросами и кешируется в байтах под версией
+    дерева отдельно для каждого владельца; любое изменение разделов,
+    материалов, тестов или вопросов сбрасывает версию.
+    """
+
+    CACHE_KEY = "materials:section_tree:{scope}:{version}"
+
+    @staticmethod
+    def get_queryset(owner_id=None):
+        """Разделы с количеством материалов, материалами и тестами с количеством вопросов."""
+
+        tests = (
+            Test.objects.annotate(questions_count=Count("questions"))
+            .only("id", "name", "passing_score", "material")
+            .order_by("id")
+        )
+        materials = (
+            Material.objects.only("id", "name", "section")
+            .prefetch_related(Prefetch("answers", queryset=tests))
+            .order_by("id")
+        )
+        sections = (
+            Section.objects.annotate(materials_count=Count("materials"))
+            .only("id", "name")
+            .prefetch_related(Prefetch("materials", queryset=materials))
+            .order_by("id")
+        )
+        if owner_id is not None:
+            sections = sections.filter(owner_id=owner_id)
+        return sections
+
+    @staticmethod
+    def etag(owner_id, version):
+        """ETag дерева владельца."""
+
+        return f'"tree-{owner_id or "all"}-{version}"'
+
+    @staticmethod
+    def render(owner_id=None, version=None):
+        """JSON дерева разделов владельца owner_id (None — всех разделов) в байтах."""
+
+        if version is None:
+            version = get_section_tree_version()
+        key = SectionTreeService.CACHE_KEY.format(
+            scope=owner_id or "all", version=version
+        )
+        content = cache.get(key)
+        if content is None:
+            sections = SectionTreeService.get_queryset(owner_id)
+            content = JSONRenderer().render(
+                SectionTreeSerializer(sections, many=True).data
+            )
+            cache.set(key, content)
+        return content
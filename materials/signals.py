@@ -0,0 +1,13 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from materials.models import Material, Section
+from tests.cache import invalidate_section_tree
+
+
+@receiver([post_save, post_delete], sender=Section)
+@receiver([post_save, post_delete], sender=Material)
+def invalidate_section_tree_on_change(sender, instance, **kwargs):
+    """Сброс версии дерева разделов при изменении или удалении раздела или материала."""
+
+    invalidate_section_tree()
@@ -1,9 +1,12 @@
 from django.contrib.auth.models import Group
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
 from django.contrib.auth import get_user_model
 from materials.models import Section, Material
+from tests.models import Question, Test
 from materials.serializer import SectionSerializer, MaterialSerializer
 
 User = get_user_model()
@@ -182,8 +185,25 @@ class SectionViewSetTest(APITestCase):
         response = self.client.get(self.section_list_url)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]["name"], "Test Section")
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(response.data["results"][0]["name"], "Test Section")
+
+    def test_list_sections_only_own_for_teacher(self):
+        """Тест получения преподавателем только своих разделов, администратором — всех."""
+
+        other_teacher = User.objects.create(email="other@test.com", role="teacher")
+        other_teacher.groups.add(self.teacher_group)
+        Section.objects.create(name="Other Section", owner=other_teacher)
+
+        self.client.force_authenticate(user=self.teacher_user)
+        response = self.client.get(self.section_list_url)
+        self.assertEqual(
+            [item["name"] for item in response.data["results"]], ["Test Section"]
+        )
+
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.get(self.section_list_url)
+        self.assertEqual(len(response.data["results"]), 2)
 
     def test_list_sections_as_student(self):
         """Тест получения списка разделов студентом HTTP_403_FORBIDDEN."""
@@ -298,8 +318,8 @@ class MaterialViewSetTest(APITestCase):
         response = self.client.get(self.material_list_url)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]["name"], "Test Material")
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(response.data["results"][0]["name"], "Test Material")
 
     def test_list_materials_as_student(self):
         """Тест получения списка материалов студентом HTTP_200_OK."""
@@ -308,7 +328,46 @@ class MaterialViewSetTest(APITestCase):
         response = self.client.get(self.material_list_url)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data["results"]), 1)
+
+    def test_list_materials_with_fields(self):
+        """Тест вывода только запрошенных полей без загрузки описания из БД."""
+
+        self.client.force_authenticate(user=self.student_user)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.material_list_url + "?fields=id,name")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data["results"],
+            [{"id": self.material.id, "name": "Test Material"}],
+        )
+        self.assertNotIn("description", context.captured_queries[-1]["sql"])
+
+    def test_retrieve_material_with_expanded_section(self):
+        """Тест раскрытия раздела материала одним запросом."""
+
+        self.client.force_authenticate(user=self.student_user)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(
+                self.material_detail_url + "?fields=name,section&expand=section"
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data), {"name", "section"})
+        self.assertEqual(response.data["section"]["name"], "Test Section")
+        self.assertEqual(
+            len([q for q in context.captured_queries if "materials_" in q["sql"]]), 1
+        )
+
+    def test_list_materials_with_unknown_field(self):
+        """Тест ошибки при неизвестном поле HTTP_400_BAD_REQUEST."""
+
+        self.client.force_authenticate(user=self.student_user)
+        response = self.client.get(self.material_list_url + "?fields=id,unknown")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("fields", response.data)
 
     def test_create_material_as_teacher(self):
         """Тест создания материала преподавателем HTTP_201_CREATED."""
@@ -388,3 +447,183 @@ class MaterialViewSetTest(APITestCase):
 
         response = self.client.get(self.material_list_url)
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class MaterialSearchTest(APITestCase):
+    """Тесты поиска материалов и разделов ?q=."""
+
+    def setUp(self):
+        self.teacher_group, _ = Group.objects.get_or_create(name="Преподаватели")
+        self.teacher_user = User.objects.create(
+            email="teacher@test.com", role="teacher"
+        )
+        self.teacher_user.groups.add(self.teacher_group)
+        self.student_user = User.objects.create(
+            email="student@test.com", role="student"
+        )
+
+        self.by_name = Material.objects.create(
+            name="Линейная алгебра", description="Матрицы", owner=self.teacher_user
+        )
+        self.by_description = Material.objects.create(
+            name="Матрицы",
+            description="Вводный курс: алгебра и геометрия",
+            owner=self.teacher_user,
+        )
+        Material.objects.create(
+            name="История", description="Древний мир", owner=self.teacher_user
+        )
+        self.url = reverse("materials:material-list")
+
+    def _names(self, query):
+        response = self.client.get(self.url, {"q": query})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [item["name"] for item in response.data["results"]]
+
+    def test_search_ranks_name_matches_first(self):
+        """Тест выдачи совпадений по названию выше совпадений по описанию."""
+
+        self.client.force_authenticate(user=self.student_user)
+
+        self.assertEqual(self._names("алгебра"), ["Линейная алгебра", "Матрицы"])
+
+    def test_search_by_word_prefix(self):
+        """Тест поиска по началу слова."""
+
+        self.client.force_authenticate(user=self.student_user)
+
+        self.assertEqual(self._names("истор"), ["История"])
+        self.assertEqual(self._names("физика"), [])
+
+    def test_search_follows_updates_and_deletes(self):
+        """Тест поиска по измененным данным и без удаленных записей."""
+
+        self.by_name.name = "Теория вероятностей"
+        self.by_name.save()
+        self.by_description.delete()
+
+        self.client.force_authenticate(user=self.student_user)
+
+        self.assertEqual(self._names("алгебра"), [])
+        self.assertEqual(self._names("вероятностей"), ["Теория вероятностей"])
+
+    def test_search_is_paginated(self):
+        """Тест постраничной выдачи результатов поиска."""
+
+        self.client.force_authenticate(user=self.student_user)
+        response = self.client.get(self.url, {"q": "алгебра", "page_size": 1})
+
+        self.assertEqual(len(response.data["results"]), 1)
+        response = self.client.get(response.data["next"])
+        self.assertEqual(
+            [item["name"] for item in response.data["results"]], ["Матрицы"]
+        )
+        self.assertIsNone(response.data["next"])
+
+    def test_search_sections_of_teacher(self):
+        """Тест поиска среди своих разделов преподавателя."""
+
+        other_teacher = User.objects.create(email="other@test.com", role="teacher")
+        other_teacher.groups.add(self.teacher_group)
+        Section.objects.create(name="Алгебра", owner=self.teacher_user)
+        Section.objects.create(name="Алгебра 2", owner=other_teacher)
+
+        self.client.force_authenticate(user=self.teacher_user)
+        response = self.client.get(reverse("materials:section-list"), {"q": "алгебра"})
+
+        self.assertEqual(
+            [item["name"] for item in response.data["results"]], ["Алгебра"]
+        )
+
+
+class SectionTreeTest(APITestCase):
+    """Тесты дерева разделов с материалами и тестами."""
+
+    def setUp(self):
+        self.teacher_group, _ = Group.objects.get_or_create(name="Преподаватели")
+        self.teacher_user = User.objects.create(
+            email="teacher@test.com", role="teacher"
+        )
+        self.teacher_user.groups.add(self.teacher_group)
+        self.other_teacher = User.objects.create(email="other@test.com", role="teacher")
+        self.other_teacher.groups.add(self.teacher_group)
+        self.student_user = User.objects.create(
+            email="student@test.com", role="student"
+        )
+
+        self.section = Section.objects.create(name="Алгебра", owner=self.teacher_user)
+        self.materials = [
+            Material.objects.create(
+                name=f"Материал {i}", section=self.section, owner=self.teacher_user
+            )
+            for i in range(3)
+        ]
+        for material in self.materials:
+            for i in range(2):
+                test = Test.objects.create(
+                    name=f"Тест {i}",
+                    material=material,
+                    owner=self.teacher_user,
+                    passing_score=50,
+                )
+                Question.objects.bulk_create(
+                    Question(name=f"Вопрос {j}", test=test) for j in range(i + 1)
+                )
+        Section.objects.create(name="История", owner=self.other_teacher)
+        self.url = reverse("materials:section_tree")
+
+    def test_tree_structure_and_counts(self):
+        """Тест вложенности дерева и количества материалов и вопросов."""
+
+        self.client.force_authenticate(user=self.teacher_user)
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        tree = response.json()
+        self.assertEqual([section["name"] for section in tree], ["Алгебра"])
+        self.assertEqual(tree[0]["materials_count"], 3)
+        self.assertEqual(len(tree[0]["materials"]), 3)
+        self.assertEqual(
+            [test["questions_count"] for test in tree[0]["materials"][0]["tests"]],
+            [1, 2],
+        )
+
+    def test_student_gets_all_sections(self):
+        """Тест получения студентом всех разделов."""
+
+        self.client.force_authenticate(user=self.student_user)
+        response = self.client.get(self.url)
+
+        self.assertEqual(
+            [section["name"] for section in response.json()], ["Алгебра", "История"]
+        )
+
+    def test_tree_built_in_fixed_queries_and_cached(self):
+        """Тест построения дерева тремя запросами и отдачи из кеша без запросов дерева."""
+
+        self.client.force_authenticate(user=self.teacher_user)
+        with self.assertNumQueries(4):
+            self.client.get(self.url)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_tree_invalidated_on_write(self):
+        """Тест сброса дерева при изменении тестов и вопросов."""
+
+        self.client.force_authenticate(user=self.teacher_user)
+        response = self.client.get(self.url)
+        etag = response["ETag"]
+
+        response = self.client.get(self.url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        test = Test.objects.filter(material=self.materials[0]).first()
+        Question.objects.create(name="Новый вопрос", test=test)
+
+        response = self.client.get(self.url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.json()[0]["materials"][0]["tests"][0]["questions_count"], 2
+        )
@@ -1,7 +1,7 @@
 from django.urls import include, path
 from rest_framework.routers import SimpleRouter
 
-from materials.views import SectionViewSet, MaterialViewSet
+from materials.views import SectionTreeAPIView, SectionViewSet, MaterialViewSet
 
 app_name = "materials"
 
@@ -9,4 +9,7 @@ router = SimpleRouter()
 router.register("section", viewset=SectionViewSet, basename="section")
 router.register("material", viewset=MaterialViewSet, basename="material")
 
-urlpatterns = [path("", include(router.urls))]
+urlpatterns = [
+    path("tree/", SectionTreeAPIView.as_view(), name="section_tree"),
+    path("", include(router.urls)),
+]
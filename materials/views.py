@@ -1,15 +1,26 @@
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
 
+from fieldsets import FieldsetViewSetMixin
 from materials.models import Material, Section
+from search import SearchViewSetMixin
 from permissions import (
     IsAdminOrTeacherOwner,
     IsAdminOrTeacher,
+    OwnerListMixin,
+    get_user_roles,
 )
 from materials.serializer import MaterialSerializer, SectionSerializer
+from materials.services import SectionTreeService
+from tests.cache import get_section_tree_version
 
 
-class SectionViewSet(ModelViewSet):
+class SectionViewSet(
+    SearchViewSetMixin, FieldsetViewSetMixin, OwnerListMixin, ModelViewSet
+):
     """ViewSet модели Section."""
 
     queryset = Section.objects.all()
@@ -31,10 +42,10 @@ class SectionViewSet(ModelViewSet):
     def perform_create(self, serializer):
         """Метод переопределяющий при создании раздела поле owner на текущего авторизованного пользователя."""
 
-        serializer.save(owner=self.request.user)
+        serializer.save(owner_id=self.request.user.id)
 
 
-class MaterialViewSet(ModelViewSet):
+class MaterialViewSet(SearchViewSetMixin, FieldsetViewSetMixin, ModelViewSet):
     """ViewSet модели Material."""
 
     queryset = Material.objects.all()
@@ -58,4 +69,35 @@ class MaterialViewSet(ModelViewSet):
     def perform_create(self, serializer):
         """Метод переопределяющий при создании урока поле owner на текущего авторизованного пользователя."""
 
-        serializer.save(owner=self.request.user)
+        serializer.save(owner_id=self.request.user.id)
+
+
+class SectionTreeAPIView(APIView):
+    """Дерево разделов с материалами и тестами для оглавления курса.
+
+    Преподаватель получает свои разделы, администратор и студент — все.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        roles = get_user_roles(request)
+        if "Преподаватели" in roles and "Администраторы" not in roles:
+            owner_id = request.user.id
+        else:
+            owner_id = None
+        version = get_section_tree_version()
+        etag = SectionTreeService.etag(owner_id, version)
+
+        if_none_match = parse_etags(request.headers.get("If-None-Match", ""))
+        if etag in if_none_match or "*" in if_none_match:
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(
+                SectionTreeService.render(owner_id, version),
+                content_type="application/json",
+            )
+
+        response["ETag"] = etag
+        response["Cache-Control"] = "private, no-cache"
+        return response
@@ -0,0 +1,22 @@
+from rest_framework.pagination import CursorPagination
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """Постраничный вывод по ключу (created_at, id) без подсчета количества записей."""
+
+    ordering = ("-created_at", "-id")
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 500
+
+
+class CompletedAtCursorPagination(CreatedAtCursorPagination):
+    """Постраничный вывод результатов по ключу (completed_at, id)."""
+
+    ordering = ("-completed_at", "-id")
+
+
+class RankCursorPagination(CreatedAtCursorPagination):
+    """Постраничный вывод результатов поиска по убыванию релевантности rank."""
+
+    ordering = ("-rank", "-id")
@@ -1,32 +1,52 @@
 from rest_framework.permissions import BasePermission
 
 
+def get_user_roles(request):
+    """Названия групп пользователя, запоминаемые на запросе.
+
+    Берутся из claims токена, если пользователь восстановлен из него, иначе
+    загружаются одним запросом.
+    """
+
+    roles = getattr(request, "_user_roles", None)
+    if roles is None:
+        user = request.user
+        if user is None or not user.is_authenticated:
+            roles = frozenset()
+        else:
+            roles = getattr(user, "token_roles", None)
+            if roles is None:
+                roles = frozenset(user.groups.values_list("name", flat=True))
+        request._user_roles = roles
+    return roles
+
+
 class IsAdmin(BasePermission):
     """Класс проверяющий, является ли пользователь администратором"""
 
     def has_permission(self, request, view):
-        return request.user.groups.filter(name="Администраторы").exists()
+        return "Администраторы" in get_user_roles(request)
 
 
 class IsTeacher(BasePermission):
     """Класс проверяющий, является ли пользователь преподавателем"""
 
     def has_permission(self, request, view):
-        return request.user.groups.filter(name="Преподаватели").exists()
+        return "Преподаватели" in get_user_roles(request)
 
 
 class IsStudent(BasePermission):
     """Класс проверяющий, является ли пользователь студентом"""
 
     def has_permission(self, request, view):
-        return request.user.groups.filter(name="Студенты").exists()
+        return "Студенты" in get_user_roles(request)
 
 
 class IsOwner(BasePermission):
     """Класс проверяющий, является ли пользователь владельцем"""
 
     def has_object_permission(self, request, view, obj):
-        if request.user == obj.owner:
+        if obj.owner_id is not None and request.user.id == obj.owner_id:
             return True
         return False
 
@@ -35,7 +55,7 @@ class IsStudentOwner(BasePermission):
     """Класс проверяющий, является ли студент владельцем"""
 
     def has_object_permission(self, request, view, obj):
-        if request.user == obj.student:
+        if obj.student_id is not None and request.user.id == obj.student_id:
             return True
         return False
 
@@ -106,3 +126,13 @@ class IsAdminOrStudent(BasePermission):
         is_student = IsStudent().has_permission(request, view)
 
         return is_admin or is_student
+
+
+class OwnerListMixin:
+    """Примесь ViewSet, ограничивающая список записями владельца для всех, кроме администраторов."""
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == "list" and not IsAdmin().has_permission(self.request, self):
+            queryset = queryset.filter(owner_id=self.request.user.id)
+        return queryset
@@ -0,0 +1,183 @@
+"""Полнотекстовый поиск по названию и описанию разделов, материалов и тестов.
+
+В PostgreSQL у таблицы есть хранимый генерируемый столбец search_vector
+(tsvector с весом A для названия и B для описания) с GIN-индексом и
+триграммный GIN-индекс по названию для поиска с опечатками. В SQLite
+используется таблица FTS5 "<таблица>_search" с rowid, равным id записи,
+которую поддерживают триггеры. Столбцы и таблицы создаются миграциями через
+install_search_index и не описаны в моделях; если миграция пересоздает
+таблицу в SQLite, триггеры нужно создать заново.
+"""
+
+import re
+
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+from django.utils.functional import cached_property
+
+from pagination import RankCursorPagination
+
+SEARCH_CONFIG = "russian"
+
+# Вес триграммной похожести названия относительно ts_rank.
+TRIGRAM_WEIGHT = 0.5
+
+POSTGRES_INSTALL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """
+    ALTER TABLE "{table}" ADD COLUMN "search_vector" tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('{config}', coalesce("name", '')), 'A')
+        || setweight(to_tsvector('{config}', coalesce("description", '')), 'B')
+    ) STORED
+    """,
+    'CREATE INDEX "{table}_search_idx" ON "{table}" USING gin ("search_vector")',
+    'CREATE INDEX "{table}_name_trgm_idx" ON "{table}" USING gin ("name" gin_trgm_ops)',
+]
+
+POSTGRES_UNINSTALL = [
+    'DROP INDEX IF EXISTS "{table}_name_trgm_idx"',
+    'DROP INDEX IF EXISTS "{table}_search_idx"',
+    'ALTER TABLE "{table}" DROP COLUMN IF EXISTS "search_vector"',
+]
+
+SQLITE_INSTALL = [
+    """
+    CREATE VIRTUAL TABLE "{table}_search" USING fts5(
+        name, description, tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    INSERT INTO "{table}_search" (rowid, name, description)
+    SELECT id, name, coalesce(description, '') FROM "{table}"
+    """,
+    """
+    CREATE TRIGGER "{table}_search_insert" AFTER INSERT ON "{table}" BEGIN
+        INSERT INTO "{table}_search" (rowid, name, description)
+        VALUES (new.id, new.name, coalesce(new.description, ''));
+    END
+    """,
+    """
+    CREATE TRIGGER "{table}_search_update" AFTER UPDATE OF name, description
+    ON "{table}" BEGIN
+        UPDATE "{table}_search"
+        SET name = new.name, description = coalesce(new.description, '')
+        WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER "{table}_search_delete" AFTER DELETE ON "{table}" BEGIN
+        DELETE FROM "{table}_search" WHERE rowid = old.id;
+    END
+    """,
+]
+
+SQLITE_UNINSTALL = [
+    'DROP TRIGGER IF EXISTS "{table}_search_delete"',
+    'DROP TRIGGER IF EXISTS "{table}_search_update"',
+    'DROP TRIGGER IF EXISTS "{table}_search_insert"',
+    'DROP TABLE IF EXISTS "{table}_search"',
+]
+
+
+def _execute(schema_editor, statements, table):
+    for statement in statements:
+        schema_editor.execute(statement.format(table=table, config=SEARCH_CONFIG))
+
+
+def install_search_index(schema_editor, table):
+    """Создание поискового индекса таблицы для текущей СУБД."""
+
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        _execute(schema_editor, POSTGRES_INSTALL, table)
+    elif vendor == "sqlite":
+        _execute(schema_editor, SQLITE_INSTALL, table)
+
+
+def uninstall_search_index(schema_editor, table):
+    """Удаление поискового индекса таблицы."""
+
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        _execute(schema_editor, POSTGRES_UNINSTALL, table)
+    elif vendor == "sqlite":
+        _execute(schema_editor, SQLITE_UNINSTALL, table)
+
+
+def _fts5_query(query):
+    """Запрос FTS5 из слов строки поиска: все слова, каждое как префикс."""
+
+    return " ".join(f'"{word}"*' for word in re.findall(r"\w+", query))
+
+
+def search(queryset, query):
+    """Записи queryset, найденные по строке query, с релевантностью в поле rank.
+
+    Чем больше rank, тем выше запись в выдаче. В PostgreSQL к релевантности
+    полнотекстового поиска добавляется триграммная похожесть названия, и
+    записи с опечатками в названии тоже находятся.
+    """
+
+    table = queryset.model._meta.db_table
+
+    if connection.vendor == "postgresql":
+        from django.contrib.postgres.search import TrigramSimilarity
+
+        tsquery = "websearch_to_tsquery(%s, %s)"
+        return queryset.annotate(
+            matched=RawSQL(
+                f'"{table}"."search_vector" @@ {tsquery}',
+                [SEARCH_CONFIG, query],
+                output_field=BooleanField(),
+            ),
+            rank=RawSQL(
+                f'ts_rank("{table}"."search_vector", {tsquery})',
+                [SEARCH_CONFIG, query],
+                output_field=FloatField(),
+            )
+            + TrigramSimilarity("name", query) * TRIGRAM_WEIGHT,
+        ).filter(Q(matched=True) | Q(name__trigram_similar=query))
+
+    fts_query = _fts5_query(query)
+    if not fts_query:
+        return queryset.none()
+    return queryset.annotate(
+        rank=RawSQL(
+            f'SELECT -bm25("{table}_search", 10.0, 1.0) FROM "{table}_search" '
+            f'WHERE "{table}_search" MATCH %s AND "{table}_search".rowid = "{table}"."id"',
+            [fts_query],
+            output_field=FloatField(),
+        )
+    ).filter(
+        id__in=RawSQL(
+            f'SELECT rowid FROM "{table}_search" WHERE "{table}_search" MATCH %s',
+            [fts_query],
+        )
+    )
+
+
+class SearchViewSetMixin:
+    """Примесь ViewSet с поиском ?q= в списке, выдача по релевантности."""
+
+    search_param = "q"
+
+    @cached_property
+    def search_query(self):
+        if self.request is None or self.action != "list":
+            return ""
+        return self.request.query_params.get(self.search_param, "").strip()
+
+    @property
+    def paginator(self):
+        if self.search_query:
+            if not hasattr(self, "_search_paginator"):
+                self._search_paginator = RankCursorPagination()
+            return self._search_paginator
+        return super().paginator
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.search_query:
+            queryset = search(queryset, self.search_query)
+        return queryset
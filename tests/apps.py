@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class TestsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "tests"
+
+    def ready(self):
+        import tests.signals  # noqa: F401
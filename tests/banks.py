@@ -0,0 +1,116 @@
+"""Форматы файлов банка вопросов: JSON Lines и CSV.
+
+JSON Lines — один вопрос в строке:
+{"name": ..., "text": ..., "question_type": ..., "tag": ..., "difficulty": ...,
+"answers": [{"text": ..., "is_correct": ...}]}.
+
+CSV — строка на ответ со столбцами CSV_COLUMNS; столбец question — номер
+вопроса в файле, строки одного вопроса идут подряд, вопрос без ответов
+записывается одной строкой с пустыми answer и is_correct.
+
+Запись и чтение потоковые: в памяти находится только текущий вопрос.
+"""
+
+import csv
+import json
+
+from rest_framework.exceptions import ValidationError
+
+QUESTION_COLUMNS = ["name", "text", "question_type", "tag", "difficulty"]
+
+CSV_COLUMNS = ["question", *QUESTION_COLUMNS, "answer", "is_correct"]
+
+FORMATS = ("jsonl", "csv")
+
+CONTENT_TYPES = {"jsonl": "application/x-ndjson", "csv": "text/csv"}
+
+
+class LineBuffer:
+    """Буфер для csv.writer, возвращающий записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+def to_jsonl(questions):
+    """Строки JSON Lines для вопросов."""
+
+    for question in questions:
+        yield json.dumps(question, ensure_ascii=False) + "\n"
+
+
+def to_csv(questions):
+    """Строки CSV для вопросов, первой — заголовок."""
+
+    writer = csv.writer(LineBuffer())
+    yield writer.writerow(CSV_COLUMNS)
+    for number, question in enumerate(questions, start=1):
+        fields = [number, *(question[column] for column in QUESTION_COLUMNS)]
+        if not question["answers"]:
+            yield writer.writerow([*fields, "", ""])
+        for answer in question["answers"]:
+            yield writer.writerow([*fields, answer["text"], int(answer["is_correct"])])
+
+
+def from_jsonl(lines):
+    """Вопросы из строк JSON Lines."""
+
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            question = json.loads(line)
+        except ValueError:
+            raise ValidationError(
+                {"line": line_number, "errors": ["Некорректный JSON."]}
+            )
+        if not isinstance(question, dict):
+            raise ValidationError(
+                {"line": line_number, "errors": ["Ожидается объект вопроса."]}
+            )
+        question["line"] = line_number
+        yield question
+
+
+def from_csv(lines):
+    """Вопросы из строк CSV, сгруппированных по столбцу question."""
+
+    reader = csv.DictReader(lines)
+    missing = set(CSV_COLUMNS) - set(reader.fieldnames or ())
+    if missing:
+        raise ValidationError(
+            {"line": 1, "errors": [f"Нет столбцов: {', '.join(sorted(missing))}."]}
+        )
+
+    current, current_number = None, None
+    for row in reader:
+        if row["question"] != current_number:
+            if current is not None:
+                yield current
+            current_number = row["question"]
+            current = {column: row[column] for column in QUESTION_COLUMNS}
+            current["answers"] = []
+            current["line"] = reader.line_num
+        # В короткой строке отсутствующие столбцы равны None.
+        answer, is_correct = row["answer"] or "", row["is_correct"] or ""
+        if answer or is_correct:
+            current["answers"].append(
+                {
+                    "text": answer,
+                    "is_correct": is_correct.strip().lower() in ("1", "true"),
+                }
+            )
+    if current is not None:
+        yield current
+
+
+def write(questions, bank_format):
+    """Строки файла банка в формате bank_format."""
+
+    return to_jsonl(questions) if bank_format == "jsonl" else to_csv(questions)
+
+
+def read(lines, bank_format):
+    """Вопросы из строк файла банка в формате bank_format."""
+
+    return from_jsonl(lines) if bank_format == "jsonl" else from_csv(lines)
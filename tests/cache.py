@@ -0,0 +1,115 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.db import transaction
+
+TEST_VERSION_KEY = "tests:test_version:{test_id}"
+MATERIAL_POOL_VERSION_KEY = "tests:material_pool_version:{material_id}"
+SECTION_TREE_VERSION_KEY = "materials:section_tree_version"
+
+
+def _initial_version():
+    """Начальная версия, заведомо большая любой ранее выданной после вытеснения ключа."""
+
+    return time.time_ns() // 1000
+
+
+def _get_version(key):
+    """Текущее значение счетчика версии по ключу кеша."""
+
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def _bump_version(key):
+    """Увеличение счетчика версии по ключу кеша."""
+
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, _initial_version(), timeout=None)
+        return cache.get(key)
+
+
+def get_test_version(test_id):
+    """Текущая версия содержимого теста (вопросы, ответы, параметры)."""
+
+    return _get_version(TEST_VERSION_KEY.format(test_id=test_id))
+
+
+def bump_test_version(test_id):
+    """Увеличение версии теста, делающее недействительными все закешированные данные."""
+
+    return _bump_version(TEST_VERSION_KEY.format(test_id=test_id))
+
+
+def get_material_pool_version(material_id):
+    """Текущая версия пула вопросов всех тестов материала."""
+
+    return _get_version(MATERIAL_POOL_VERSION_KEY.format(material_id=material_id))
+
+
+def invalidate_material_pool(material_id):
+    """Сброс версии пула вопросов материала сразу и после фиксации транзакции."""
+
+    if material_id is None:
+        return
+    key = MATERIAL_POOL_VERSION_KEY.format(material_id=material_id)
+    _bump_version(key)
+    transaction.on_commit(lambda: _bump_version(key))
+
+
+def invalidate_test(test_id):
+    """Сброс версии теста сразу и повторно после фиксации транзакции.
+
+    Повторный сброс нужен, чтобы данные, перечитанные из БД до фиксации,
+    не остались в кеше под новой версией.
+    """
+
+    if test_id is None:
+        return
+    bump_test_version(test_id)
+    transaction.on_commit(lambda: bump_test_version(test_id))
+
+
+def get_section_tree_version():
+    """Текущая версия дерева разделов, материалов и тестов."""
+
+    return _get_version(SECTION_TREE_VERSION_KEY)
+
+
+def invalidate_section_tree():
+    """Сброс версии дерева разделов сразу и после фиксации транзакции."""
+
+    _bump_version(SECTION_TREE_VERSION_KEY)
+    transaction.on_commit(lambda: _bump_version(SECTION_TREE_VERSION_KEY))
+
+
+_content_invalidation = threading.local()
+
+
+@contextmanager
+def suppress_content_invalidation():
+    """Отключение сброса версий в обработчиках сигналов вопросов и ответов.
+
+    Для сервисов, которые сами сбрасывают версии и ставят перепроверку:
+    QuerySet.delete() отправляет post_delete для каждой строки.
+    """
+
+    previous = getattr(_content_invalidation, "suppressed", False)
+    _content_invalidation.suppressed = True
+    try:
+        yield
+    finally:
+        _content_invalidation.suppressed = previous
+
+
+def content_invalidation_suppressed():
+    """Отключен ли сброс версий в обработчиках сигналов вопросов и ответов."""
+
+    return getattr(_content_invalidation, "suppressed", False)
@@ -0,0 +1,149 @@
+"""Компактное двоичное кодирование ответов студента по вопросам теста.
+
+Формат версии 1 (все целые числа — беззнаковые varint):
+
+* версия формата (1 байт);
+* количество вопросов n;
+* id вопросов по возрастанию, разностями от предыдущего;
+* для каждого вопроса: количество выбранных ответов, их id по возрастанию
+  разностями от предыдущего выбранного id (сквозь все вопросы, со знаком в
+  zigzag-кодировании) и ссылка на текстовый ответ (0 — ответа нет, иначе id
+  записи TextAnswer);
+* битовая карта правильности ответов, ceil(n / 8) байт, младший бит первым.
+"""
+
+from collections import namedtuple
+
+FORMAT_VERSION = 1
+
+DecodedResponses = namedtuple(
+    "DecodedResponses", ["question_ids", "selected", "text_refs", "correct"]
+)
+
+
+def _write_varint(buffer, value):
+    """Запись беззнакового целого в формате varint."""
+
+    while value >= 0x80:
+        buffer.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def _read_varint(data, position):
+    """Чтение varint, возвращает значение и позицию следующего байта."""
+
+    value = 0
+    shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
+
+
+def _zigzag(value):
+    """Отображение целого со знаком в беззнаковое: 0, -1, 1, -2 -> 0, 1, 2, 3."""
+
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def _unzigzag(value):
+    """Обратное отображение для _zigzag."""
+
+    return value // 2 if value % 2 == 0 else -(value + 1) // 2
+
+
+def encode_responses(question_ids, answers_by_question, correct, text_refs=None):
+    """Кодирование ответов по вопросам question_ids.
+
+    answers_by_question — ответы, проиндексированные по question_id,
+    correct — правильность по question_id, text_refs — id интернированных
+    текстовых ответов по question_id.
+    """
+
+    text_refs = text_refs or {}
+    question_ids = sorted(question_ids)
+    buffer = bytearray([FORMAT_VERSION])
+    _write_varint(buffer, len(question_ids))
+
+    previous = 0
+    for question_id in question_ids:
+        _write_varint(buffer, question_id - previous)
+        previous = question_id
+
+    previous = 0
+    for question_id in question_ids:
+        answer = answers_by_question.get(question_id) or {}
+        selected_answers = sorted(answer.get("selected_answers") or [])
+        _write_varint(buffer, len(selected_answers))
+        for answer_id in selected_answers:
+            _write_varint(buffer, _zigzag(answer_id - previous))
+            previous = answer_id
+        _write_varint(buffer, text_refs.get(question_id) or 0)
+
+    bitmap = bytearray((len(question_ids) + 7) // 8)
+    for index, question_id in enumerate(question_ids):
+        if correct.get(question_id):
+            bitmap[index // 8] |= 1 << (index % 8)
+    buffer.extend(bitmap)
+
+    return bytes(buffer)
+
+
+def decode_responses(data):
+    """Декодирование ответов, закодированных encode_responses."""
+
+    data = bytes(data)
+    if data[0] != FORMAT_VERSION:
+        raise ValueError(f"Неизвестная версия формата ответов: {data[0]}")
+
+    count, position = _read_varint(data, 1)
+
+    question_ids = []
+    previous = 0
+    for _ in range(count):
+        delta, position = _read_varint(data, position)
+        previous += delta
+        question_ids.append(previous)
+
+    selected = []
+    text_refs = []
+    previous = 0
+    for _ in range(count):
+        selected_count, position = _read_varint(data, position)
+        answer_ids = []
+        for _ in range(selected_count):
+            delta, position = _read_varint(data, position)
+            previous += _unzigzag(delta)
+            answer_ids.append(previous)
+        selected.append(answer_ids)
+        text_ref, position = _read_varint(data, position)
+        text_refs.append(text_ref)
+
+    correct = [
+        bool(data[position + index // 8] & (1 << (index % 8))) for index in range(count)
+    ]
+
+    return DecodedResponses(question_ids, selected, text_refs, correct)
+
+
+def to_submitted_answers(decoded, texts):
+    """Восстановление списка ответов студента из декодированных данных.
+
+    texts — словарь id TextAnswer -> текст ответа.
+    """
+
+    answers = []
+    for question_id, selected_answers, text_ref in zip(
+        decoded.question_ids, decoded.selected, decoded.text_refs
+    ):
+        if not selected_answers and not text_ref:
+            continue
+        answer = {"question_id": question_id, "selected_answers": selected_answers}
+        if text_ref:
+            answer["text_answer"] = texts[text_ref]
+        answers.append(answer)
+    return answers
@@ -0,0 +1,55 @@
+"""Форматы выгрузки результатов тестов: CSV и JSON Lines.
+
+Строки результатов — кортежи значений в порядке COLUMNS; запись потоковая,
+заголовок CSV отдается до выполнения запроса к БД.
+"""
+
+import csv
+import json
+
+from tests.banks import LineBuffer
+
+COLUMNS = [
+    "id",
+    "student_email",
+    "test_id",
+    "test_name",
+    "score",
+    "total_questions",
+    "correct_answers",
+    "percentage",
+    "is_passed",
+    "attempt_number",
+    "completed_at",
+]
+
+FORMATS = ("csv", "jsonl")
+
+CONTENT_TYPES = {"csv": "text/csv", "jsonl": "application/x-ndjson"}
+
+
+def _values(row):
+    *values, completed_at = row
+    return [*values, completed_at.isoformat() if completed_at else None]
+
+
+def to_csv(rows):
+    """Строки CSV, первой — заголовок."""
+
+    writer = csv.writer(LineBuffer())
+    yield writer.writerow(COLUMNS)
+    for row in rows:
+        yield writer.writerow(_values(row))
+
+
+def to_jsonl(rows):
+    """Строки JSON Lines, объект на результат."""
+
+    for row in rows:
+        yield json.dumps(dict(zip(COLUMNS, _values(row))), ensure_ascii=False) + "\n"
+
+
+def write(rows, export_format):
+    """Строки выгрузки в формате export_format."""
+
+    return to_csv(rows) if export_format == "csv" else to_jsonl(rows)
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from tests.models import Test
+from tests.services import ItemAnalysisService
+
+
+class Command(BaseCommand):
+    """Расчет анализа заданий тестов с сохранением в кеш."""
+
+    help = (
+        "Рассчитывает трудность, различающую способность вопросов и доли "
+        "выбора вариантов ответа для всех или указанного теста."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--test", type=int, help="ID теста для анализа.")
+        parser.add_argument("--chunk-size", type=int, default=None)
+
+    def handle(self, *args, **options):
+        tests = Test.objects.filter(testresult__responses__isnull=False).distinct()
+        if options["test"] is not None:
+            if not Test.objects.filter(pk=options["test"]).exists():
+                raise CommandError(f"Тест {options['test']} не найден.")
+            tests = Test.objects.filter(pk=options["test"])
+
+        analyzed = 0
+        for test in tests.order_by("id"):
+            ItemAnalysisService.refresh(test, chunk_size=options["chunk_size"])
+            analyzed += 1
+        self.stdout.write(f"Проанализировано тестов: {analyzed}")
@@ -0,0 +1,96 @@
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from tests.models import Answer, Question, Test
+from users.models import User
+
+
+class Command(BaseCommand):
+    """Замер задержки отправки ответов при всплеске запросов."""
+
+    help = (
+        "Отправляет пачку ответов на временный тест в синхронном и асинхронном "
+        "режимах и выводит p50/p99 задержки отправки."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--submissions", type=int, default=500)
+        parser.add_argument("--questions", type=int, default=50)
+        parser.add_argument("--concurrency", type=int, default=1)
+
+    def handle(self, *args, **options):
+        student = User.objects.create(email=f"benchmark-{time.time_ns()}@test.com")
+        test = Test.objects.create(name="Benchmark", passing_score=50)
+        try:
+            payload = self._create_questions(test, options["questions"])
+            for mode, async_grading in (("sync", False), ("async", True)):
+                with override_settings(ASYNC_GRADING=async_grading):
+                    latencies = self._burst(
+                        student,
+                        test,
+                        payload,
+                        options["submissions"],
+                        options["concurrency"],
+                    )
+                self._report(mode, latencies)
+        finally:
+            test.delete()
+            student.delete()
+
+    def _create_questions(self, test, questions_count):
+        """Создание вопросов временного теста и правильной отправки на него."""
+
+        answers = []
+        for index in range(questions_count):
+            question = Question.objects.create(
+                name=f"Question {index}", text="Question text", test=test
+            )
+            correct = Answer.objects.create(
+                text="Correct", question=question, is_correct=True
+            )
+            Answer.objects.create(text="Wrong", question=question)
+            answers.append(
+                {"question_id": question.id, "selected_answers": [correct.id]}
+            )
+        return {"answers": answers}
+
+    def _burst(self, student, test, payload, submissions, concurrency):
+        """Отправка пачки ответов, возвращает задержки в миллисекундах."""
+
+        url = reverse("tests:test_submit", kwargs={"test_id": test.id})
+
+        def submit(_):
+            client = APIClient()
+            client.force_authenticate(user=student)
+            started = time.perf_counter()
+            client.post(url, payload, format="json")
+            return (time.perf_counter() - started) * 1000
+
+        if concurrency <= 1:
+            return [submit(index) for index in range(submissions)]
+
+        def submit_in_thread(index):
+            try:
+                return submit(index)
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            return list(executor.map(submit_in_thread, range(submissions)))
+
+    def _report(self, mode, latencies):
+        """Вывод перцентилей задержки."""
+
+        percentiles = statistics.quantiles(latencies, n=100, method="inclusive")
+        self.stdout.write(
+            f"{mode}: n={len(latencies)} "
+            f"p50={percentiles[49]:.2f}ms p99={percentiles[98]:.2f}ms "
+            f"max={max(latencies):.2f}ms"
+        )
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from tests import banks
+from tests.models import Test
+from tests.services import QuestionBankService
+
+
+class Command(BaseCommand):
+    """Потоковый экспорт банка вопросов теста."""
+
+    help = "Выгружает вопросы теста с ответами в JSON Lines или CSV."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--test", type=int, required=True, help="ID теста.")
+        parser.add_argument("--format", choices=banks.FORMATS, default="jsonl")
+        parser.add_argument("--output", help="Файл для записи, по умолчанию stdout.")
+        parser.add_argument("--chunk-size", type=int, default=None)
+
+    def handle(self, *args, **options):
+        test = Test.objects.filter(pk=options["test"]).first()
+        if test is None:
+            raise CommandError(f"Тест {options['test']} не найден.")
+
+        lines = banks.write(
+            QuestionBankService.export(test, chunk_size=options["chunk_size"]),
+            options["format"],
+        )
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8", newline="") as output:
+                output.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending="")
@@ -0,0 +1,65 @@
+import multiprocessing
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from tests.services import GradingQueueService
+
+
+class Command(BaseCommand):
+    """Запуск обработчиков очереди асинхронной проверки попыток."""
+
+    help = "Проверяет ожидающие попытки прохождения тестов пулом процессов."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=1)
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument("--poll-interval", type=float, default=1.0)
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Завершить работу, когда очередь опустеет.",
+        )
+
+    def handle(self, *args, **options):
+        worker_options = (
+            options["batch_size"],
+            options["poll_interval"],
+            options["once"],
+        )
+
+        if options["workers"] <= 1:
+            processed = run_worker(*worker_options)
+            self.stdout.write(f"Проверено попыток: {processed}")
+            return
+
+        # fork явно: при forkserver и spawn (по умолчанию в POSIX с Python 3.14)
+        # дочерний процесс импортирует модели до django.setup().
+        context = multiprocessing.get_context("fork")
+        connections.close_all()
+        processes = [
+            context.Process(target=run_worker, args=worker_options)
+            for _ in range(options["workers"])
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+
+def run_worker(batch_size, poll_interval, once):
+    """Цикл обработчика: забирает пачки попыток, пока очередь не опустеет."""
+
+    processed = 0
+    try:
+        while True:
+            count = GradingQueueService.process_batch(limit=batch_size)
+            processed += count
+            if count:
+                continue
+            if once:
+                return processed
+            time.sleep(poll_interval)
+    finally:
+        connections.close_all()
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from tests import banks
+from tests.models import Test
+from tests.services import QuestionBankService
+
+
+class Command(BaseCommand):
+    """Потоковый импорт банка вопросов в тест."""
+
+    help = (
+        "Добавляет к тесту вопросы с ответами из файла JSON Lines или CSV "
+        "и выводит скорость импорта."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--test", type=int, required=True, help="ID теста.")
+        parser.add_argument("--input", required=True, help="Файл банка вопросов.")
+        parser.add_argument("--format", choices=banks.FORMATS, default=None)
+        parser.add_argument("--chunk-size", type=int, default=None)
+
+    def handle(self, *args, **options):
+        test = Test.objects.filter(pk=options["test"]).first()
+        if test is None:
+            raise CommandError(f"Тест {options['test']} не найден.")
+        bank_format = options["format"] or options["input"].rsplit(".", 1)[-1]
+        if bank_format not in banks.FORMATS:
+            raise CommandError("Укажите формат файла: --format jsonl или csv.")
+
+        with open(options["input"], encoding="utf-8-sig", newline="") as lines:
+            try:
+                report = QuestionBankService.import_questions(
+                    test,
+                    banks.read(lines, bank_format),
+                    test.owner_id,
+                    chunk_size=options["chunk_size"],
+                )
+            except ValidationError as error:
+                raise CommandError(f"Ошибка в банке вопросов: {error.detail}")
+
+        self.stdout.write(
+            f"Импортировано вопросов: {report['questions']}, "
+            f"ответов: {report['answers']} за {report['seconds']} с "
+            f"({report['rows_per_second']} строк/с)"
+        )
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from tests.models import Test
+from tests.services import StatsService
+
+
+class Command(BaseCommand):
+    """Пересчет статистики результатов тестов с нуля."""
+
+    help = (
+        "Пересчитывает статистику результатов всех или указанного теста по "
+        "TestResult и сообщает о расхождениях с сохраненной статистикой."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--test", type=int, help="ID теста для пересчета.")
+
+    def handle(self, *args, **options):
+        tests = Test.objects.order_by("id")
+        if options["test"] is not None:
+            tests = tests.filter(pk=options["test"])
+            if not tests.exists():
+                raise CommandError(f"Тест {options['test']} не найден.")
+
+        mismatched = 0
+        for test_id in list(tests.values_list("id", flat=True)):
+            if StatsService.rebuild(test_id):
+                mismatched += 1
+                self.stdout.write(
+                    f"Статистика теста {test_id} расходилась и пересчитана"
+                )
+        self.stdout.write(f"Расхождений: {mismatched}")
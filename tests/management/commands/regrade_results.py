@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from tests.models import Test
+from tests.services import RegradeService
+
+
+class Command(BaseCommand):
+    """Перепроверка сохраненных результатов тестов."""
+
+    help = (
+        "Выполняет ожидающие перепроверки результатов или перепроверяет "
+        "указанный тест."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--test", type=int, help="ID теста для перепроверки.")
+        parser.add_argument("--workers", type=int, default=1)
+        parser.add_argument("--chunk-size", type=int, default=None)
+
+    def handle(self, *args, **options):
+        if options["test"] is None:
+            processed = RegradeService.process_pending(
+                workers=options["workers"], chunk_size=options["chunk_size"]
+            )
+            self.stdout.write(f"Выполнено перепроверок: {processed}")
+            return
+
+        try:
+            test = Test.objects.get(pk=options["test"])
+        except Test.DoesNotExist:
+            raise CommandError(f"Тест {options['test']} не найден.")
+
+        updated = RegradeService.regrade_test(
+            test, workers=options["workers"], chunk_size=options["chunk_size"]
+        )
+        self.stdout.write(f"Изменено результатов: {updated}")
@@ -0,0 +1,91 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:18
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tests", "0007_remove_testresult_answers_data"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TestAttempt",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("answers", models.JSONField(verbose_name="Ответы студента")),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "ожидает проверки"),
+                            ("done", "проверена"),
+                            ("failed", "ошибка проверки"),
+                        ],
+                        default="pending",
+                        max_length=7,
+                        verbose_name="Статус проверки",
+                    ),
+                ),
+                (
+                    "error",
+                    models.TextField(
+                        blank=True, null=True, verbose_name="Ошибка проверки"
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "result",
+                    models.OneToOneField(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="attempt",
+                        to="tests.testresult",
+                        verbose_name="Результат теста",
+                    ),
+                ),
+                (
+                    "student",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Студент",
+                    ),
+                ),
+                (
+                    "test",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="attempts",
+                        to="tests.test",
+                        verbose_name="Тест",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Попытка прохождения теста",
+                "verbose_name_plural": "Попытки прохождения тестов",
+                "indexes": [
+                    models.Index(
+                        fields=["status", "id"], name="tests_testa_status_ec90c4_idx"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tests", "0008_testattempt"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="testresult",
+            name="answers",
+            field=models.JSONField(
+                blank=True, null=True, verbose_name="Ответы студента для перепроверки"
+            ),
+        ),
+        migrations.CreateModel(
+            name="RegradeJob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "ожидает перепроверки"),
+                            ("done", "выполнена"),
+                        ],
+                        default="pending",
+                        max_length=7,
+                        verbose_name="Статус перепроверки",
+                    ),
+                ),
+                (
+                    "updated_results",
+                    models.IntegerField(
+                        blank=True, null=True, verbose_name="Изменено результатов"
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "test",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="regrade_jobs",
+                        to="tests.test",
+                        verbose_name="Тест",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Перепроверка результатов",
+                "verbose_name_plural": "Перепроверки результатов",
+                "indexes": [
+                    models.Index(
+                        fields=["status", "id"], name="tests_regra_status_b5935c_idx"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,184 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:24
+
+import hashlib
+
+from django.db import migrations, models
+
+# Ключ ответов, проверка и кодирование ответов скопированы в миграцию на
+# момент ее создания (формат версии 1 из tests/encoding.py), чтобы она не
+# зависела от текущего кода приложения.
+
+FORMAT_VERSION = 1
+
+
+def write_varint(buffer, value):
+    """Запись беззнакового целого в формате varint."""
+
+    while value >= 0x80:
+        buffer.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def zigzag(value):
+    """Отображение целого со знаком в беззнаковое: 0, -1, 1, -2 -> 0, 1, 2, 3."""
+
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def encode_responses(question_ids, answers_by_question, correct, text_refs):
+    """Кодирование ответов по вопросам question_ids в формате версии 1."""
+
+    question_ids = sorted(question_ids)
+    buffer = bytearray([FORMAT_VERSION])
+    write_varint(buffer, len(question_ids))
+
+    previous = 0
+    for question_id in question_ids:
+        write_varint(buffer, question_id - previous)
+        previous = question_id
+
+    previous = 0
+    for question_id in question_ids:
+        answer = answers_by_question.get(question_id) or {}
+        selected_answers = sorted(answer.get("selected_answers") or [])
+        write_varint(buffer, len(selected_answers))
+        for answer_id in selected_answers:
+            write_varint(buffer, zigzag(answer_id - previous))
+            previous = answer_id
+        write_varint(buffer, text_refs.get(question_id) or 0)
+
+    bitmap = bytearray((len(question_ids) + 7) // 8)
+    for index, question_id in enumerate(question_ids):
+        if correct.get(question_id):
+            bitmap[index // 8] |= 1 << (index % 8)
+    buffer.extend(bitmap)
+
+    return bytes(buffer)
+
+
+def load_answer_key(Question, test_id):
+    """Ключ ответов теста: question_id -> (тип, id и тексты правильных ответов)."""
+
+    questions = {}
+    for (
+        question_id,
+        question_type,
+        answer_id,
+        is_correct,
+        text,
+    ) in Question.objects.filter(test_id=test_id).values_list(
+        "id",
+        "question_type",
+        "answers__id",
+        "answers__is_correct",
+        "answers__text",
+    ):
+        entry = questions.setdefault(question_id, (question_type, set(), set()))
+        if answer_id is not None and is_correct:
+            entry[1].add(answer_id)
+            entry[2].add(text.strip().lower())
+    return questions
+
+
+def check_answer(question_key, answer):
+    """Правильность ответа студента на вопрос."""
+
+    question_type, correct_ids, correct_texts = question_key
+    selected_answers = answer.get("selected_answers") or []
+    if question_type == "single":
+        return len(selected_answers) == 1 and selected_answers[0] in correct_ids
+    if question_type == "multiple":
+        return bool(selected_answers) and set(selected_answers) == correct_ids
+    if question_type == "text":
+        text_answer = answer.get("text_answer", "").strip().lower()
+        return bool(text_answer) and text_answer in correct_texts
+    return False
+
+
+def encode_answers(apps, schema_editor):
+    """Перенос ответов из JSON-поля answers в компактную запись responses."""
+
+    Question = apps.get_model("tests", "Question")
+    TestResult = apps.get_model("tests", "TestResult")
+    TextAnswer = apps.get_model("tests", "TextAnswer")
+
+    results = TestResult.objects.filter(answers__isnull=False).order_by("test_id")
+    answer_keys = {}
+    for result in results.iterator(chunk_size=1000):
+        if result.test_id not in answer_keys:
+            answer_keys[result.test_id] = load_answer_key(Question, result.test_id)
+        answer_key = answer_keys[result.test_id]
+
+        answers_by_question = {
+            answer["question_id"]: answer
+            for answer in result.answers
+            if answer["question_id"] in answer_key
+        }
+        correct = {
+            question_id: question_id in answers_by_question
+            and check_answer(question_key, answers_by_question[question_id])
+            for question_id, question_key in answer_key.items()
+        }
+        text_refs = {}
+        for question_id, answer in answers_by_question.items():
+            text = answer.get("text_answer", "")
+            if text.strip():
+                text_refs[question_id] = TextAnswer.objects.get_or_create(
+                    digest=hashlib.sha256(text.encode("utf-8")).hexdigest(),
+                    defaults={"text": text},
+                )[0].id
+
+        result.responses = encode_responses(
+            answer_key, answers_by_question, correct, text_refs
+        )
+        result.save(update_fields=["responses"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tests", "0009_testresult_answers_regradejob"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TextAnswer",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "digest",
+                    models.CharField(
+                        max_length=64, unique=True, verbose_name="Хеш текста"
+                    ),
+                ),
+                ("text", models.TextField(verbose_name="Текстовый ответ студента")),
+            ],
+            options={
+                "verbose_name": "Текстовый ответ студента",
+                "verbose_name_plural": "Текстовые ответы студентов",
+            },
+        ),
+        migrations.AddField(
+            model_name="testresult",
+            name="responses",
+            field=models.BinaryField(
+                blank=True,
+                null=True,
+                verbose_name="Ответы студента в компактной записи",
+            ),
+        ),
+        migrations.RunPython(encode_answers, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name="testresult",
+            name="answers",
+        ),
+    ]
@@ -0,0 +1,100 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def empty_histogram():
+    """Пустая гистограмма процентов правильных ответов по 10 интервалам."""
+
+    return [0] * 10
+
+
+def build_stats(apps, schema_editor):
+    """Заполнение статистики по уже сохраненным результатам."""
+
+    TestResult = apps.get_model("tests", "TestResult")
+    TestStats = apps.get_model("tests", "TestStats")
+
+    stats = {}
+    rows = (
+        TestResult.objects.filter(test__isnull=False, percentage__isnull=False)
+        .values_list("test_id", "percentage", "is_passed")
+        .iterator()
+    )
+    for test_id, percentage, is_passed in rows:
+        test_stats = stats.setdefault(test_id, TestStats(test_id=test_id))
+        test_stats.count += 1
+        test_stats.percentage_sum += percentage
+        test_stats.percentage_squares_sum += percentage * percentage
+        test_stats.passed_count += bool(is_passed)
+        test_stats.histogram[min(max(int(percentage // 10), 0), 9)] += 1
+    TestStats.objects.bulk_create(stats.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tests", "0010_testresult_responses_textanswer"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TestStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Количество результатов"
+                    ),
+                ),
+                (
+                    "percentage_sum",
+                    models.FloatField(default=0, verbose_name="Сумма процентов"),
+                ),
+                (
+                    "percentage_squares_sum",
+                    models.FloatField(
+                        default=0, verbose_name="Сумма квадратов процентов"
+                    ),
+                ),
+                (
+                    "passed_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Количество зачтенных результатов"
+                    ),
+                ),
+                (
+                    "histogram",
+                    models.JSONField(
+                        default=empty_histogram,
+                        verbose_name="Гистограмма процентов по интервалам в 10%",
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "test",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="stats",
+                        to="tests.test",
+                        verbose_name="Тест",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Статистика теста",
+                "verbose_name_plural": "Статистика тестов",
+            },
+        ),
+        migrations.RunPython(build_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tests", "0011_teststats"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TestSnapshot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("version", models.PositiveIntegerField(verbose_name="Версия снимка")),
+                (
+                    "content",
+                    models.FileField(
+                        upload_to="test_snapshots/",
+                        verbose_name="Снимок теста (JSON, gzip)",
+                    ),
+                ),
+                (
+                    "answer_key",
+                    models.JSONField(verbose_name="Ключ ответов на момент публикации"),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "test",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="snapshots",
+                        to="tests.test",
+                        verbose_name="Тест",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Опубликованный снимок теста",
+                "verbose_name_plural": "Опубликованные снимки тестов",
+            },
+        ),
+        migrations.AddField(
+            model_name="testattempt",
+            name="snapshot",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                to="tests.testsnapshot",
+                verbose_name="Снимок теста",
+            ),
+        ),
+        migrations.AddField(
+            model_name="testresult",
+            name="snapshot",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                to="tests.testsnapshot",
+                verbose_name="Снимок теста",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="testsnapshot",
+            constraint=models.UniqueConstraint(
+                fields=("test", "version"), name="unique_test_snapshot_version"
+            ),
+        ),
+    ]
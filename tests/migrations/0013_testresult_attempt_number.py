@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tests", "0012_testsnapshot"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="testattempt",
+            name="attempt_number",
+            field=models.PositiveIntegerField(
+                blank=True,
+                null=True,
+                verbose_name="Номер попытки (зерно перемешивания вопросов)",
+            ),
+        ),
+        migrations.AddField(
+            model_name="testresult",
+            name="attempt_number",
+            field=models.PositiveIntegerField(
+                blank=True,
+                null=True,
+                verbose_name="Номер попытки (зерно перемешивания вопросов)",
+            ),
+        ),
+    ]
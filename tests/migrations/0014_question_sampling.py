@@ -0,0 +1,101 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tests", "0013_testresult_attempt_number"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="question",
+            name="difficulty",
+            field=models.CharField(
+                blank=True,
+                choices=[
+                    ("easy", "легкий"),
+                    ("medium", "средний"),
+                    ("hard", "сложный"),
+                ],
+                default="",
+                max_length=6,
+                verbose_name="Сложность вопроса",
+            ),
+        ),
+        migrations.AddField(
+            model_name="question",
+            name="tag",
+            field=models.CharField(
+                blank=True, default="", max_length=100, verbose_name="Тег вопроса"
+            ),
+        ),
+        migrations.AddField(
+            model_name="test",
+            name="sample_pool",
+            field=models.CharField(
+                choices=[
+                    ("test", "вопросы теста"),
+                    ("material", "вопросы всех тестов материала"),
+                ],
+                default="test",
+                max_length=8,
+                verbose_name="Пул вопросов для выборки",
+            ),
+        ),
+        migrations.AddField(
+            model_name="test",
+            name="sample_size",
+            field=models.PositiveIntegerField(
+                blank=True,
+                null=True,
+                verbose_name="Количество вопросов, выбираемых для попытки",
+            ),
+        ),
+        migrations.AddField(
+            model_name="test",
+            name="sample_strata",
+            field=models.CharField(
+                blank=True,
+                choices=[
+                    ("", "без групп"),
+                    ("tag", "по тегу"),
+                    ("difficulty", "по сложности"),
+                ],
+                default="",
+                max_length=10,
+                verbose_name="Пропорциональная выборка по группам",
+            ),
+        ),
+        migrations.AddField(
+            model_name="testattempt",
+            name="question_ids",
+            field=models.JSONField(
+                blank=True, null=True, verbose_name="Вопросы, выбранные для попытки"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="testattempt",
+            name="answers",
+            field=models.JSONField(
+                blank=True, null=True, verbose_name="Ответы студента"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="testattempt",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("started", "начата"),
+                    ("pending", "ожидает проверки"),
+                    ("done", "проверена"),
+                    ("failed", "ошибка проверки"),
+                ],
+                default="pending",
+                max_length=7,
+                verbose_name="Статус проверки",
+            ),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:51
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("materials", "0006_list_cursor_indexes"),
+        ("tests", "0014_question_sampling"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="answer",
+            index=models.Index(
+                fields=["created_at", "id"], name="tests_answe_created_2daebe_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="question",
+            index=models.Index(
+                fields=["created_at", "id"], name="tests_quest_created_7cba2f_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="test",
+            index=models.Index(
+                fields=["created_at", "id"], name="tests_test_created_60a2f4_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="testresult",
+            index=models.Index(
+                fields=["completed_at", "id"], name="tests_testr_complet_3cbb6c_idx"
+            ),
+        ),
+    ]
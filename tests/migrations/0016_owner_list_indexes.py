@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("materials", "0007_owner_list_indexes"),
+        ("tests", "0015_list_cursor_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="question",
+            index=models.Index(
+                fields=["owner", "created_at", "id"],
+                name="tests_quest_owner_i_54064d_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="test",
+            index=models.Index(
+                fields=["owner", "created_at", "id"],
+                name="tests_test_owner_i_0ab87a_idx",
+            ),
+        ),
+    ]
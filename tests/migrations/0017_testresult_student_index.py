@@ -0,0 +1,22 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tests", "0016_owner_list_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="testresult",
+            index=models.Index(
+                fields=["student", "-completed_at", "-id"],
+                name="tests_testr_student_0de4f6_idx",
+            ),
+        ),
+    ]
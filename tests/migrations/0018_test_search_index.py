@@ -0,0 +1,22 @@
+from django.db import migrations
+
+from search import install_search_index, uninstall_search_index
+
+
+def install(apps, schema_editor):
+    install_search_index(schema_editor, "tests_test")
+
+
+def uninstall(apps, schema_editor):
+    uninstall_search_index(schema_editor, "tests_test")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tests", "0017_testresult_student_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(install, uninstall),
+    ]
@@ -0,0 +1,115 @@
+# Generated by Django 5.2.7 on 2026-10-18 21:25
+
+from django.db import migrations, models
+
+BUCKETS = 10
+
+
+def split_histogram(apps, schema_editor):
+    """Перенос гистограммы из JSON в столбцы интервалов."""
+
+    TestStats = apps.get_model("tests", "TestStats")
+    stats = list(TestStats.objects.only("id", "histogram"))
+    for test_stats in stats:
+        for index, value in enumerate(test_stats.histogram or [0] * BUCKETS):
+            setattr(test_stats, f"bucket_{index}", value)
+    TestStats.objects.bulk_update(
+        stats, [f"bucket_{index}" for index in range(BUCKETS)], batch_size=1000
+    )
+
+
+def join_histogram(apps, schema_editor):
+    """Обратный перенос столбцов интервалов в JSON."""
+
+    TestStats = apps.get_model("tests", "TestStats")
+    stats = list(TestStats.objects.all())
+    for test_stats in stats:
+        test_stats.histogram = [
+            getattr(test_stats, f"bucket_{index}") for index in range(BUCKETS)
+        ]
+    TestStats.objects.bulk_update(stats, ["histogram"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tests", "0018_test_search_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="teststats",
+            name="bucket_0",
+            field=models.PositiveIntegerField(
+                default=0, verbose_name="Результатов от 0 до 10%"
+            ),
+        ),
+        migrations.AddField(
+            model_name="teststats",
+            name="bucket_1",
+            field=models.PositiveIntegerField(
+                default=0, verbose_name="Результатов от 10 до 20%"
+            ),
+        ),
+        migrations.AddField(
+            model_name="teststats",
+            name="bucket_2",
+            field=models.PositiveIntegerField(
+                default=0, verbose_name="Результатов от 20 до 30%"
+            ),
+        ),
+        migrations.AddField(
+            model_name="teststats",
+            name="bucket_3",
+            field=models.PositiveIntegerField(
+                default=0, verbose_name="Результатов от 30 до 40%"
+            ),
+        ),
+        migrations.AddField(
+            model_name="teststats",
+            name="bucket_4",
+            field=models.PositiveIntegerField(
+                default=0, verbose_name="Результатов от 40 до 50%"
+            ),
+        ),
+        migrations.AddField(
+            model_name="teststats",
+            name="bucket_5",
+            field=models.PositiveIntegerField(
+                default=0, verbose_name="Результатов от 50 до 60%"
+            ),
+        ),
+        migrations.AddField(
+            model_name="teststats",
+            name="bucket_6",
+            field=models.PositiveIntegerField(
+                default=0, verbose_name="Результатов от 60 до 70%"
+            ),
+        ),
+        migrations.AddField(
+            model_name="teststats",
+            name="bucket_7",
+            field=models.PositiveIntegerField(
+                default=0, verbose_name="Результатов от 70 до 80%"
+            ),
+        ),
+        migrations.AddField(
+            model_name="teststats",
+            name="bucket_8",
+            field=models.PositiveIntegerField(
+                default=0, verbose_name="Результатов от 80 до 90%"
+            ),
+        ),
+        migrations.AddField(
+            model_name="teststats",
+            name="bucket_9",
+            field=models.PositiveIntegerField(
+                default=0, verbose_name="Результатов от 90 до 100%"
+            ),
+        ),
+        migrations.RunPython(split_histogram, join_histogram),
+        migrations.RemoveField(
+            model_name="teststats",
+            name="histogram",
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-18 22:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tests", "0019_teststats_histogram_buckets"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="regradejob",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "ожидает перепроверки"),
+                    ("running", "выполняется"),
+                    ("done", "выполнена"),
+                ],
+                default="pending",
+                max_length=7,
+                verbose_name="Статус перепроверки",
+            ),
+        ),
+    ]
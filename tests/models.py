@@ -5,6 +5,18 @@ from users.models import User
 
 
 class Test(models.Model):
+
+    SAMPLE_POOL = [
+        ("test", "вопросы теста"),
+        ("material", "вопросы всех тестов материала"),
+    ]
+
+    SAMPLE_STRATA = [
+        ("", "без групп"),
+        ("tag", "по тегу"),
+        ("difficulty", "по сложности"),
+    ]
+
     name = models.CharField(max_length=200, verbose_name="Название теста")
     description = models.TextField(
         verbose_name="Описание теста",
@@ -29,6 +41,24 @@ class Test(models.Model):
     passing_score = models.PositiveIntegerField(
         verbose_name="Минимальный бал для зачета"
     )
+    sample_size = models.PositiveIntegerField(
+        verbose_name="Количество вопросов, выбираемых для попытки",
+        blank=True,
+        null=True,
+    )
+    sample_pool = models.CharField(
+        max_length=8,
+        verbose_name="Пул вопросов для выборки",
+        choices=SAMPLE_POOL,
+        default="test",
+    )
+    sample_strata = models.CharField(
+        max_length=10,
+        verbose_name="Пропорциональная выборка по группам",
+        choices=SAMPLE_STRATA,
+        blank=True,
+        default="",
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -38,6 +68,10 @@ class Test(models.Model):
     class Meta:
         verbose_name = "Тест"
         verbose_name_plural = "Тесты"
+        indexes = [
+            models.Index(fields=["created_at", "id"]),
+            models.Index(fields=["owner", "created_at", "id"]),
+        ]
 
 
 class Question(models.Model):
@@ -48,6 +82,12 @@ class Question(models.Model):
         ("text", "текстовый ответ"),
     ]
 
+    DIFFICULTY = [
+        ("easy", "легкий"),
+        ("medium", "средний"),
+        ("hard", "сложный"),
+    ]
+
     name = models.CharField(max_length=200, verbose_name="Название вопроса")
     text = models.TextField(
         verbose_name="Текст вопроса",
@@ -66,6 +106,16 @@ class Question(models.Model):
         choices=QUESTION_TYPE,
         default="single",
     )
+    tag = models.CharField(
+        max_length=100, verbose_name="Тег вопроса", blank=True, default=""
+    )
+    difficulty = models.CharField(
+        max_length=6,
+        verbose_name="Сложность вопроса",
+        choices=DIFFICULTY,
+        blank=True,
+        default="",
+    )
     owner = models.ForeignKey(
         User,
         verbose_name="Создатель вопроса",
@@ -82,6 +132,10 @@ class Question(models.Model):
     class Meta:
         verbose_name = "Вопрос"
         verbose_name_plural = "Вопросы"
+        indexes = [
+            models.Index(fields=["created_at", "id"]),
+            models.Index(fields=["owner", "created_at", "id"]),
+        ]
 
 
 class Answer(models.Model):
@@ -106,6 +160,34 @@ class Answer(models.Model):
     class Meta:
         verbose_name = "Ответ"
         verbose_name_plural = "Ответы"
+        indexes = [models.Index(fields=["created_at", "id"])]
+
+
+class TestSnapshot(models.Model):
+    test = models.ForeignKey(
+        Test,
+        verbose_name="Тест",
+        on_delete=models.CASCADE,
+        related_name="snapshots",
+    )
+    version = models.PositiveIntegerField(verbose_name="Версия снимка")
+    content = models.FileField(
+        upload_to="test_snapshots/", verbose_name="Снимок теста (JSON, gzip)"
+    )
+    answer_key = models.JSONField(verbose_name="Ключ ответов на момент публикации")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"\nТест: {self.test}\nВерсия снимка: {self.version}"
+
+    class Meta:
+        verbose_name = "Опубликованный снимок теста"
+        verbose_name_plural = "Опубликованные снимки тестов"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["test", "version"], name="unique_test_snapshot_version"
+            )
+        ]
 
 
 class TestResult(models.Model):
@@ -126,6 +208,21 @@ class TestResult(models.Model):
         verbose_name="Процент правильных ответов", blank=True, null=True
     )
     is_passed = models.BooleanField(verbose_name="Тест пройден", blank=True, null=True)
+    responses = models.BinaryField(
+        verbose_name="Ответы студента в компактной записи", blank=True, null=True
+    )
+    snapshot = models.ForeignKey(
+        TestSnapshot,
+        verbose_name="Снимок теста",
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+    )
+    attempt_number = models.PositiveIntegerField(
+        verbose_name="Номер попытки (зерно перемешивания вопросов)",
+        blank=True,
+        null=True,
+    )
     completed_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -134,3 +231,189 @@ class TestResult(models.Model):
     class Meta:
         verbose_name = "Результат теста"
         verbose_name_plural = "Результаты тестов"
+        indexes = [
+            models.Index(fields=["completed_at", "id"]),
+            models.Index(fields=["student", "-completed_at", "-id"]),
+        ]
+
+
+class TextAnswer(models.Model):
+    digest = models.CharField(max_length=64, unique=True, verbose_name="Хеш текста")
+    text = models.TextField(verbose_name="Текстовый ответ студента")
+
+    def __str__(self):
+        return self.text
+
+    class Meta:
+        verbose_name = "Текстовый ответ студента"
+        verbose_name_plural = "Текстовые ответы студентов"
+
+
+class TestAttempt(models.Model):
+
+    STATUS = [
+        ("started", "начата"),
+        ("pending", "ожидает проверки"),
+        ("done", "проверена"),
+        ("failed", "ошибка проверки"),
+    ]
+
+    student = models.ForeignKey(
+        User, verbose_name="Студент", blank=True, null=True, on_delete=models.CASCADE
+    )
+    test = models.ForeignKey(
+        Test,
+        verbose_name="Тест",
+        on_delete=models.CASCADE,
+        related_name="attempts",
+    )
+    snapshot = models.ForeignKey(
+        TestSnapshot,
+        verbose_name="Снимок теста",
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+    )
+    attempt_number = models.PositiveIntegerField(
+        verbose_name="Номер попытки (зерно перемешивания вопросов)",
+        blank=True,
+        null=True,
+    )
+    question_ids = models.JSONField(
+        verbose_name="Вопросы, выбранные для попытки", blank=True, null=True
+    )
+    answers = models.JSONField(verbose_name="Ответы студента", blank=True, null=True)
+    status = models.CharField(
+        max_length=7,
+        verbose_name="Статус проверки",
+        choices=STATUS,
+        default="pending",
+    )
+    result = models.OneToOneField(
+        TestResult,
+        verbose_name="Результат теста",
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name="attempt",
+    )
+    error = models.TextField(verbose_name="Ошибка проверки", blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"\nСтудент: {self.student}\nТест: {self.test}\nСтатус: {self.status}"
+
+    class Meta:
+        verbose_name = "Попытка прохождения теста"
+        verbose_name_plural = "Попытки прохождения тестов"
+        indexes = [models.Index(fields=["status", "id"])]
+
+
+class RegradeJob(models.Model):
+
+    STATUS = [
+        ("pending", "ожидает перепроверки"),
+        ("running", "выполняется"),
+        ("done", "выполнена"),
+    ]
+
+    test = models.ForeignKey(
+        Test,
+        verbose_name="Тест",
+        on_delete=models.CASCADE,
+        related_name="regrade_jobs",
+    )
+    status = models.CharField(
+        max_length=7,
+        verbose_name="Статус перепроверки",
+        choices=STATUS,
+        default="pending",
+    )
+    updated_results = models.IntegerField(
+        verbose_name="Изменено результатов", blank=True, null=True
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"\nТест: {self.test}\nСтатус: {self.status}"
+
+    class Meta:
+        verbose_name = "Перепроверка результатов"
+        verbose_name_plural = "Перепроверки результатов"
+        indexes = [models.Index(fields=["status", "id"])]
+
+
+class TestStats(models.Model):
+
+    HISTOGRAM_BUCKETS = 10
+
+    test = models.OneToOneField(
+        Test,
+        verbose_name="Тест",
+        on_delete=models.CASCADE,
+        related_name="stats",
+    )
+    count = models.PositiveIntegerField(
+        verbose_name="Количество результатов", default=0
+    )
+    percentage_sum = models.FloatField(verbose_name="Сумма процентов", default=0)
+    percentage_squares_sum = models.FloatField(
+        verbose_name="Сумма квадратов процентов", default=0
+    )
+    passed_count = models.PositiveIntegerField(
+        verbose_name="Количество зачтенных результатов", default=0
+    )
+    # Гистограмма процентов по интервалам в 10% — по столбцу на интервал,
+    # чтобы увеличивать их через F() одним UPDATE.
+    bucket_0 = models.PositiveIntegerField(
+        verbose_name="Результатов от 0 до 10%", default=0
+    )
+    bucket_1 = models.PositiveIntegerField(
+        verbose_name="Результатов от 10 до 20%", default=0
+    )
+    bucket_2 = models.PositiveIntegerField(
+        verbose_name="Результатов от 20 до 30%", default=0
+    )
+    bucket_3 = models.PositiveIntegerField(
+        verbose_name="Результатов от 30 до 40%", default=0
+    )
+    bucket_4 = models.PositiveIntegerField(
+        verbose_name="Результатов от 40 до 50%", default=0
+    )
+    bucket_5 = models.PositiveIntegerField(
+        verbose_name="Результатов от 50 до 60%", default=0
+    )
+    bucket_6 = models.PositiveIntegerField(
+        verbose_name="Результатов от 60 до 70%", default=0
+    )
+    bucket_7 = models.PositiveIntegerField(
+        verbose_name="Результатов от 70 до 80%", default=0
+    )
+    bucket_8 = models.PositiveIntegerField(
+        verbose_name="Результатов от 80 до 90%", default=0
+    )
+    bucket_9 = models.PositiveIntegerField(
+        verbose_name="Результатов от 90 до 100%", default=0
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"\nТест: {self.test}\nРезультатов: {self.count}"
+
+    @classmethod
+    def bucket_fields(cls):
+        """Имена столбцов интервалов гистограммы."""
+
+        return [f"bucket_{index}" for index in range(cls.HISTOGRAM_BUCKETS)]
+
+    @property
+    def histogram(self):
+        """Гистограмма процентов по интервалам в 10%."""
+
+        return [getattr(self, field) for field in self.bucket_fields()]
+
+    class Meta:
+        verbose_name = "Статистика теста"
+        verbose_name_plural = "Статистика тестов"
@@ -1,19 +1,32 @@
 from rest_framework import serializers
 
-from tests.models import Test, Question, Answer, TestResult
+from fieldsets import FieldsetSerializerMixin
 
+from tests.models import (
+    Test,
+    Question,
+    Answer,
+    TestResult,
+    TestAttempt,
+    TestStats,
+)
 
-class TestSerializer(serializers.ModelSerializer):
+
+class TestSerializer(FieldsetSerializerMixin, serializers.ModelSerializer):
     """Serializer модели Test."""
 
+    expandable_fields = {"material": "materials.serializer.MaterialSerializer"}
+
     class Meta:
         model = Test
         fields = "__all__"
 
 
-class QuestionSerializer(serializers.ModelSerializer):
+class QuestionSerializer(FieldsetSerializerMixin, serializers.ModelSerializer):
     """Serializer модели Question."""
 
+    expandable_fields = {"test": "tests.serializer.TestSerializer"}
+
     class Meta:
         model = Question
         fields = "__all__"
@@ -42,10 +55,73 @@ class TestResultSerializer(serializers.ModelSerializer):
             "correct_answers",
             "percentage",
             "is_passed",
+            "attempt_number",
             "completed_at",
         ]
 
 
+class TestAttemptSerializer(serializers.ModelSerializer):
+    """Serializer статуса асинхронной проверки попытки."""
+
+    result = TestResultSerializer(read_only=True)
+
+    class Meta:
+        model = TestAttempt
+        fields = ["id", "status", "error", "result", "created_at"]
+
+
+class TestStatsSerializer(serializers.ModelSerializer):
+    """Serializer статистики результатов теста."""
+
+    pass_rate = serializers.SerializerMethodField()
+    average_percentage = serializers.SerializerMethodField()
+    percentage_stddev = serializers.SerializerMethodField()
+
+    class Meta:
+        model = TestStats
+        fields = [
+            "test",
+            "count",
+            "passed_count",
+            "pass_rate",
+            "average_percentage",
+            "percentage_stddev",
+            "histogram",
+            "updated_at",
+        ]
+
+    def get_pass_rate(self, obj):
+        if not obj.count:
+            return None
+        return round(obj.passed_count / obj.count * 100, 2)
+
+    def get_average_percentage(self, obj):
+        if not obj.count:
+            return None
+        return round(obj.percentage_sum / obj.count, 2)
+
+    def get_percentage_stddev(self, obj):
+        if not obj.count:
+            return None
+        mean = obj.percentage_sum / obj.count
+        variance = max(obj.percentage_squares_sum / obj.count - mean * mean, 0)
+        return round(variance**0.5, 2)
+
+
+class StartedAttemptSerializer(serializers.ModelSerializer):
+    """Serializer начатой попытки с выбранными для нее вопросами."""
+
+    attempt_id = serializers.IntegerField(source="id", read_only=True)
+    questions = serializers.SerializerMethodField()
+
+    class Meta:
+        model = TestAttempt
+        fields = ["attempt_id", "status", "questions", "created_at"]
+
+    def get_questions(self, obj):
+        return SafeQuestionSerializer(self.context["questions"], many=True).data
+
+
 class SafeAnswerSerializer(serializers.ModelSerializer):
     """Serializer для безопасной передачи ответа без признака его правильности."""
 
@@ -82,12 +158,33 @@ class TestDetailSerializer(serializers.ModelSerializer):
         ]
 
 
+class TestDetailQuerySerializer(serializers.Serializer):
+    """Serializer параметров получения теста: номер попытки для перемешивания."""
+
+    attempt = serializers.IntegerField(min_value=1, default=1)
+
+
+class TestResultListQuerySerializer(serializers.Serializer):
+    """Serializer параметров списка результатов: фильтры по тесту и студенту."""
+
+    test = serializers.IntegerField(min_value=1, required=False)
+    student = serializers.IntegerField(min_value=1, required=False)
+
+
+class GradebookQuerySerializer(serializers.Serializer):
+    """Serializer параметров выгрузки результатов: тест и период завершения."""
+
+    test = serializers.IntegerField(min_value=1, required=False)
+    completed_after = serializers.DateTimeField(required=False)
+    completed_before = serializers.DateTimeField(required=False)
+
+
 class AnswerSubmissionSerializer(serializers.Serializer):
     """Serializer для отправки ответов студента."""
 
     question_id = serializers.IntegerField()
     selected_answers = serializers.ListField(
-        child=serializers.IntegerField(), required=False, allow_empty=True
+        child=serializers.IntegerField(min_value=1), required=False, allow_empty=True
     )
     text_answer = serializers.CharField(required=False, allow_blank=True)
 
@@ -96,3 +193,93 @@ class TestSubmissionSerializer(serializers.Serializer):
     """Serializer для валидации списка ответов на вопросы."""
 
     answers = AnswerSubmissionSerializer(many=True)
+    snapshot_version = serializers.IntegerField(min_value=1, required=False)
+    attempt = serializers.IntegerField(min_value=1, default=1)
+    attempt_id = serializers.IntegerField(required=False)
+
+
+class BulkSubmissionRowSerializer(serializers.Serializer):
+    """Serializer строки пакетной отправки: ответы одного студента."""
+
+    student = serializers.IntegerField()
+    answers = AnswerSubmissionSerializer(many=True)
+
+
+class AuthoringAnswerSerializer(serializers.ModelSerializer):
+    """Serializer ответа в дереве теста; ответ с id обновляется, без id — создается."""
+
+    id = serializers.IntegerField(required=False)
+
+    class Meta:
+        model = Answer
+        fields = ["id", "text", "is_correct"]
+
+
+class AuthoringQuestionSerializer(serializers.ModelSerializer):
+    """Serializer вопроса с ответами в дереве теста."""
+
+    id = serializers.IntegerField(required=False)
+    answers = AuthoringAnswerSerializer(many=True, required=False, default=list)
+
+    class Meta:
+        model = Question
+        fields = [
+            "id",
+            "name",
+            "text",
+            "question_type",
+            "tag",
+            "difficulty",
+            "answers",
+        ]
+
+    def validate(self, attrs):
+        # Тип и правильность ответов существующего вопроса могут не
+        # передаваться; такие вопросы проверяются по сохраненным значениям
+        # в TestAuthoringService.
+        if "id" in attrs:
+            return attrs
+        correct = sum(answer.get("is_correct", False) for answer in attrs["answers"])
+        if attrs.get("question_type", "single") == "single" and correct > 1:
+            raise serializers.ValidationError(
+                {
+                    "answers": [
+                        "У вопроса с одним правильным ответом отмечено несколько."
+                    ]
+                }
+            )
+        return attrs
+
+
+class TestAuthoringSerializer(serializers.ModelSerializer):
+    """Serializer теста с вопросами и ответами для создания и обновления одним запросом."""
+
+    questions = AuthoringQuestionSerializer(many=True)
+
+    class Meta:
+        model = Test
+        fields = [
+            "id",
+            "name",
+            "description",
+            "material",
+            "passing_score",
+            "sample_size",
+            "sample_pool",
+            "sample_strata",
+            "questions",
+        ]
+
+    def validate_questions(self, value):
+        question_ids = [question["id"] for question in value if "id" in question]
+        answer_ids = [
+            answer["id"]
+            for question in value
+            for answer in question["answers"]
+            if "id" in answer
+        ]
+        if len(set(question_ids)) != len(question_ids) or len(set(answer_ids)) != len(
+            answer_ids
+        ):
+            raise serializers.ValidationError("Повторяющиеся id вопросов или ответов.")
+        return value
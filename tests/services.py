@@ -1,46 +1,1152 @@
-from tests.models import Answer
+import gzip
+import hashlib
+import json
+import math
+import multiprocessing
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque, namedtuple
+from itertools import chain, islice
+
+import numpy as np
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import IntegrityError, transaction
+from django.db.models import (
+    BooleanField,
+    Count,
+    ExpressionWrapper,
+    F,
+    Max,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+    prefetch_related_objects,
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
+
+from tests.cache import (
+    get_material_pool_version,
+    get_test_version,
+    invalidate_material_pool,
+    invalidate_section_tree,
+    invalidate_test,
+    suppress_content_invalidation,
+)
+from tests.shuffle import shuffle_payload
+from tests.encoding import decode_responses, encode_responses, to_submitted_answers
+from tests.models import (
+    Answer,
+    Question,
+    RegradeJob,
+    Test,
+    TestAttempt,
+    TestResult,
+    TestSnapshot,
+    TestStats,
+    TextAnswer,
+)
+from tests.serializer import (
+    AuthoringQuestionSerializer,
+    BulkSubmissionRowSerializer,
+    TestDetailSerializer,
+)
+from users.models import User
+
+QuestionKey = namedtuple(
+    "QuestionKey", ["question_type", "answer_ids", "correct_ids", "correct_texts"]
+)
+
+
+class AnswerKey:
+    """Скомпилированный ключ ответов теста для проверки без обращений к БД."""
+
+    def __init__(self, passing_score, questions):
+        self.passing_score = passing_score
+        self.questions = questions
+
+    @classmethod
+    def from_rows(cls, passing_score, rows):
+        """Сборка ключа из строк (question_id, question_type, answer_id, is_correct, text)."""
+
+        collected = {}
+        for question_id, question_type, answer_id, is_correct, text in rows:
+            entry = collected.setdefault(
+                question_id, (question_type, set(), set(), set())
+            )
+            if answer_id is None:
+                continue
+            entry[1].add(answer_id)
+            if is_correct:
+                entry[2].add(answer_id)
+                entry[3].add(text.strip().lower())
+
+        questions = {
+            question_id: QuestionKey(
+                question_type,
+                frozenset(answer_ids),
+                frozenset(correct_ids),
+                frozenset(correct_texts),
+            )
+            for question_id, (
+                question_type,
+                answer_ids,
+                correct_ids,
+                correct_texts,
+            ) in collected.items()
+        }
+        return cls(passing_score, questions)
+
+    @classmethod
+    def for_test(cls, test):
+        """Загрузка ключа ответов теста одним запросом."""
+
+        rows = Question.objects.filter(test=test).values_list(
+            "id",
+            "question_type",
+            "answers__id",
+            "answers__is_correct",
+            "answers__text",
+        )
+        return cls.from_rows(test.passing_score, rows)
+
+    @classmethod
+    def for_questions(cls, passing_score, question_ids):
+        """Загрузка ключа ответов по списку вопросов одним запросом."""
+
+        rows = Question.objects.filter(id__in=question_ids).values_list(
+            "id",
+            "question_type",
+            "answers__id",
+            "answers__is_correct",
+            "answers__text",
+        )
+        return cls.from_rows(passing_score, rows)
+
+    def normalize_submission(self, submitted_answers):
+        """Индексация ответов студента по question_id с проверкой повторов и чужих вопросов."""
+
+        answers_by_question = {}
+        errors = []
+        for answer in submitted_answers:
+            question_id = answer["question_id"]
+            if question_id not in self.questions:
+                errors.append(f"Вопрос {question_id} не относится к тесту.")
+            elif question_id in answers_by_question:
+                errors.append(f"Ответ на вопрос {question_id} указан несколько раз.")
+            else:
+                answers_by_question[question_id] = answer
+
+        if errors:
+            raise ValidationError({"answers": errors})
+        return answers_by_question
+
+    @staticmethod
+    def compile_question(question):
+        """Сборка ключа одного вопроса из связанных с ним ответов."""
+
+        rows = [
+            (
+                question.id,
+                question.question_type,
+                answer.id,
+                answer.is_correct,
+                answer.text,
+            )
+            for answer in question.answers.all()
+        ]
+        rows = rows or [(question.id, question.question_type, None, None, None)]
+        return AnswerKey.from_rows(None, rows).questions[question.id]
+
+
+class AnswerKeyCache:
+    """LRU-кеш скомпилированных ключей ответов, привязанных к версии теста.
+
+    Первый уровень хранится в памяти процесса, второй — в кеше Django
+    (локальная память или файловый кеш), поэтому Redis не требуется. Записи
+    обоих уровней живут не дольше ttl секунд: при кеше Django в памяти
+    процесса сброс версии теста не виден другим процессам, и исправленный
+    ключ доходит до них не позже чем через ttl.
+    """
+
+    CACHE_KEY = "tests:answer_key:{test_id}:{version}"
+
+    def __init__(self, maxsize, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, test):
+        """Получение ключа ответов теста с загрузкой из БД при промахе."""
+
+        version = get_test_version(test.id)
+        local_key = (test.id, version)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(local_key)
+            if entry is not None and (entry[1] is None or entry[1] > now):
+                self._entries.move_to_end(local_key)
+                self.hits += 1
+                return entry[0]
+
+        shared_key = self.CACHE_KEY.format(test_id=test.id, version=version)
+        answer_key = cache.get(shared_key)
+        if answer_key is None:
+            answer_key = AnswerKey.for_test(test)
+            if self.ttl is None:
+                cache.set(shared_key, answer_key)
+            else:
+                cache.set(shared_key, answer_key, self.ttl)
+            with self._lock:
+                self.misses += 1
+        else:
+            with self._lock:
+                self.hits += 1
+
+        self._store(local_key, answer_key, now)
+        return answer_key
+
+    def _store(self, local_key, answer_key, now):
+        """Сохранение ключа в памяти процесса с вытеснением самых старых записей."""
+
+        expires = None if self.ttl is None else now + self.ttl
+        with self._lock:
+            self._entries[local_key] = (answer_key, expires)
+            self._entries.move_to_end(local_key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        """Счетчики попаданий и промахов кеша."""
+
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+            }
+
+    def clear(self):
+        """Очистка кеша процесса и обнуление счетчиков."""
+
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+answer_key_cache = AnswerKeyCache(
+    getattr(settings, "ANSWER_KEY_CACHE_SIZE", 256),
+    getattr(settings, "ANSWER_KEY_CACHE_TTL", 30),
+)
+
+
+class ResponseStorage:
+    """Компактное хранение ответов студентов в TestResult.responses.
+
+    Текстовые ответы интернируются в TextAnswer: одинаковые ответы разных
+    студентов хранятся один раз, а в записи остается только ссылка.
+    """
+
+    @staticmethod
+    def intern_texts(texts):
+        """Интернирование текстов двумя запросами, возвращает словарь текст -> id."""
+
+        texts_by_digest = {
+            hashlib.sha256(text.encode("utf-8")).hexdigest(): text for text in texts
+        }
+        if not texts_by_digest:
+            return {}
+
+        TextAnswer.objects.bulk_create(
+            [
+                TextAnswer(digest=digest, text=text)
+                for digest, text in texts_by_digest.items()
+            ],
+            ignore_conflicts=True,
+        )
+        return {
+            texts_by_digest[digest]: text_id
+            for digest, text_id in TextAnswer.objects.filter(
+                digest__in=texts_by_digest
+            ).values_list("digest", "id")
+        }
+
+    @staticmethod
+    def encode_many(question_ids, normalized_submissions, correct_rows):
+        """Кодирование ответов многих студентов с общим интернированием текстов."""
+
+        text_ids = ResponseStorage.intern_texts(
+            {
+                answer["text_answer"]
+                for answers_by_question in normalized_submissions
+                for answer in answers_by_question.values()
+                if answer.get("text_answer", "").strip()
+            }
+        )
+
+        return [
+            encode_responses(
+                question_ids,
+                answers_by_question,
+                dict(zip(question_ids, correct)),
+                {
+                    question_id: text_ids[answer["text_answer"]]
+                    for question_id, answer in answers_by_question.items()
+                    if answer.get("text_answer", "").strip()
+                },
+            )
+            for answers_by_question, correct in zip(
+                normalized_submissions, correct_rows
+            )
+        ]
+
+    @staticmethod
+    def decode_many(blobs):
+        """Декодирование записей ответов с загрузкой текстов одним запросом."""
+
+        decoded = [decode_responses(blob) for blob in blobs]
+        text_refs = {ref for item in decoded for ref in item.text_refs if ref}
+        texts = dict(
+            TextAnswer.objects.filter(id__in=text_refs).values_list("id", "text")
+            if text_refs
+            else []
+        )
+        return [(item, to_submitted_answers(item, texts)) for item in decoded]
+
+
+class TestDetailService:
+    """Отдача теста для прохождения из кеша отрисованного JSON.
+
+    Ответ кешируется в байтах под версией теста, а версия служит ETag,
+    поэтому повторные запросы обслуживаются без обращений к БД.
+    """
+
+    CACHE_KEY = "tests:test_detail:{test_id}:{version}"
+
+    # Значение кеша для теста с выборкой вопросов: весь пул не отдается.
+    SAMPLED = b""
+
+    @staticmethod
+    def get_queryset():
+        """Тесты с материалом, вопросами и ответами, загружаемыми тремя запросами."""
+
+        return Test.objects.select_related("material").prefetch_related(
+            "questions__answers"
+        )
+
+    @staticmethod
+    def etag(test_id, version, student_id=None, attempt=None):
+        """ETag отрисованного теста, для перемешанной выдачи — с учетом зерна."""
+
+        if student_id is None:
+            return f'"{test_id}-{version}"'
+        return f'"{test_id}-{version}-{student_id}-{attempt}"'
+
+    @staticmethod
+    def render(test_id, version):
+        """JSON теста в байтах, None — если теста нет.
+
+        Тест с выборкой вопросов проходится через tests/start/: его пул
+        может быть большим и не должен быть виден студенту целиком.
+        """
+
+        key = TestDetailService.CACHE_KEY.format(test_id=test_id, version=version)
+        content = cache.get(key)
+        if content is None:
+            test = Test.objects.select_related("material").filter(pk=test_id).first()
+            if test is None:
+                return None
+            if test.sample_size:
+                content = TestDetailService.SAMPLED
+            else:
+                prefetch_related_objects([test], "questions__answers")
+                content = JSONRenderer().render(TestDetailSerializer(test).data)
+            cache.set(key, content)
+        if content == TestDetailService.SAMPLED:
+            QuestionSamplingService.refuse_pool(test_id)
+        return content
+
+    @staticmethod
+    def render_shuffled(test_id, version, student_id, attempt):
+        """JSON теста с вопросами и вариантами, перемешанными для студента и попытки.
+
+        Перемешивается закешированная выдача, поэтому обращений к БД нет.
+        """
+
+        content = TestDetailService.render(test_id, version)
+        if content is None:
+            return None
+        return JSONRenderer().render(
+            shuffle_payload(json.loads(content), student_id, test_id, attempt)
+        )
+
+
+class SnapshotService:
+    """Публикация неизменяемых снимков теста.
+
+    Снимок содержит тест с вопросами и безопасными ответами, заранее
+    отрисованный в сжатый gzip JSON на диске, и ключ ответов на момент
+    публикации. Студенты читают файл снимка, а проверка отправок по снимку
+    выполняется по его ключу без обращений к таблицам вопросов и ответов.
+    """
+
+    ANSWER_KEY_CACHE_KEY = "tests:snapshot_answer_key:{snapshot_id}"
+
+    @staticmethod
+    def publish(test):
+        """Публикация очередной версии снимка теста.
+
+        Тест с выборкой вопросов не публикуется: снимок открыл бы весь пул.
+        """
+
+        with transaction.atomic():
+            test = (
+                TestDetailService.get_queryset()
+                .select_for_update(of=("self",))
+                .get(pk=test.pk)
+            )
+            if test.sample_size:
+                QuestionSamplingService.refuse_pool(test.id)
+            version = (
+                test.snapshots.aggregate(version=Max("version"))["version"] or 0
+            ) + 1
+
+            content = gzip.compress(
+                JSONRenderer().render(
+                    dict(TestDetailSerializer(test).data, snapshot_version=version)
+                ),
+                mtime=0,
+            )
+            rows = []
+            for question in test.questions.all():
+                answers = question.answers.all()
+                rows.extend(
+                    [
+                        question.id,
+                        question.question_type,
+                        answer.id,
+                        answer.is_correct,
+                        answer.text,
+                    ]
+                    for answer in answers
+                )
+                if not answers:
+                    rows.append([question.id, question.question_type, None, None, None])
+
+            snapshot = TestSnapshot(test=test, version=version, answer_key=rows)
+            snapshot.content.save(
+                f"{test.id}/{version}.json.gz", ContentFile(content), save=False
+            )
+            snapshot.save()
+        return snapshot
+
+    @staticmethod
+    def get_snapshot(test_id, version=None):
+        """Снимок теста указанной версии или последний опубликованный."""
+
+        snapshots = (
+            TestSnapshot.objects.filter(test_id=test_id)
+            .select_related("test")
+            .defer("answer_key")
+        )
+        if version is not None:
+            return snapshots.filter(version=version).first()
+        return snapshots.order_by("-version").first()
+
+    @staticmethod
+    def for_submission(test, version=None):
+        """Снимок, по которому проверяется отправка, указанный студентом.
+
+        Без версии отправка проверяется по текущему тесту: его отдает
+        tests/detail/, и вопросы, измененные после публикации, совпадают
+        с показанными студенту.
+        """
+
+        if version is None:
+            return None
+        snapshot = SnapshotService.get_snapshot(test.id, version)
+        if snapshot is None:
+            raise ValidationError(
+                {"snapshot_version": [f"Снимок версии {version} не найден."]}
+            )
+        return snapshot
+
+    @staticmethod
+    def answer_key(test, snapshot):
+        """Ключ ответов снимка с текущим минимальным баллом теста."""
+
+        key = SnapshotService.ANSWER_KEY_CACHE_KEY.format(snapshot_id=snapshot.id)
+        questions = cache.get(key)
+        if questions is None:
+            questions = AnswerKey.from_rows(None, snapshot.answer_key).questions
+            cache.set(key, questions)
+        return AnswerKey(test.passing_score, questions)
+
+
+class QuestionSamplingService:
+    """Выборка N вопросов для попытки из пула теста или материала.
+
+    Пул хранится в кеше как плотные массивы id вопросов по группам и
+    перестраивается одним запросом при смене версии пула, поэтому выборка
+    выполняется за O(N) без ORDER BY random(). Выбранные вопросы
+    записываются в попытку и только они учитываются при проверке.
+    """
+
+    CACHE_KEY = "tests:question_pool:{pool}:{pool_id}:{strata}:{version}"
+
+    @staticmethod
+    def get_index(test):
+        """Массивы id вопросов пула теста по группам выборки."""
+
+        if test.sample_pool == "material" and test.material_id:
+            pool, pool_id = "material", test.material_id
+            version = get_material_pool_version(test.material_id)
+            questions = Question.objects.filter(test__material_id=test.material_id)
+        else:
+            pool, pool_id = "test", test.id
+            version = get_test_version(test.id)
+            questions = Question.objects.filter(test_id=test.id)
+
+        key = QuestionSamplingService.CACHE_KEY.format(
+            pool=pool, pool_id=pool_id, strata=test.sample_strata, version=version
+        )
+        index = cache.get(key)
+        if index is None:
+            questions = questions.order_by("id")
+            if test.sample_strata:
+                grouped = {}
+                for question_id, stratum in questions.values_list(
+                    "id", test.sample_strata
+                ):
+                    grouped.setdefault(stratum, []).append(question_id)
+            else:
+                grouped = {"": list(questions.values_list("id", flat=True))}
+            index = {
+                stratum: np.array(question_ids, dtype=np.int64)
+                for stratum, question_ids in sorted(grouped.items())
+            }
+            cache.set(key, index)
+        return index
+
+    @staticmethod
+    def allocate(sizes, count):
+        """Распределение count вопросов по группам пропорционально их размеру.
+
+        Дробные доли распределяются методом наибольших остатков.
+        """
+
+        sizes = np.asarray(sizes, dtype=np.int64)
+        total = int(sizes.sum())
+        if count >= total:
+            return sizes
+        quotas = sizes * count / total
+        counts = np.floor(quotas).astype(np.int64)
+        remainder = count - int(counts.sum())
+        if remainder:
+            order = np.argsort(-(quotas - counts), kind="stable")
+            counts[order[:remainder]] += 1
+        return np.minimum(counts, sizes)
+
+    @staticmethod
+    def draw(test, rng=None):
+        """Случайный набор id вопросов для попытки."""
+
+        rng = rng or np.random.default_rng()
+        index = QuestionSamplingService.get_index(test)
+        strata = list(index.values())
+        counts = QuestionSamplingService.allocate(
+            [len(question_ids) for question_ids in strata], test.sample_size
+        )
+        drawn = [
+            question_ids[rng.choice(len(question_ids), size=int(count), replace=False)]
+            for question_ids, count in zip(strata, counts)
+            if count
+        ]
+        if not drawn:
+            return []
+        drawn = np.concatenate(drawn)
+        rng.shuffle(drawn)
+        return drawn.tolist()
+
+    @staticmethod
+    def start(student, test):
+        """Создание попытки с выбранными вопросами."""
+
+        if not test.sample_size:
+            raise ValidationError(
+                {"non_field_errors": ["Тест не использует выборку вопросов."]}
+            )
+        return TestAttempt.objects.create(
+            student_id=student.id,
+            test=test,
+            status="started",
+            question_ids=QuestionSamplingService.draw(test),
+        )
+
+    @staticmethod
+    def refuse_pool(test_id):
+        """Отказ в выдаче всего пула теста с выборкой вопросов."""
+
+        raise ValidationError(
+            {
+                "detail": f"Тест с выборкой вопросов начинается через tests/start/{test_id}/."
+            }
+        )
+
+    @staticmethod
+    def get_questions(attempt):
+        """Вопросы попытки в порядке выборки с вариантами ответа."""
+
+        questions = Question.objects.filter(
+            id__in=attempt.question_ids
+        ).prefetch_related("answers")
+        questions_by_id = {question.id: question for question in questions}
+        return [
+            questions_by_id[question_id]
+            for question_id in attempt.question_ids
+            if question_id in questions_by_id
+        ]
+
+    @staticmethod
+    def for_submission(student, test, attempt_id):
+        """Начатая попытка, к которой относится отправка, None — тест без выборки."""
+
+        if attempt_id is None:
+            if test.sample_size:
+                raise ValidationError(
+                    {"attempt_id": ["Для теста с выборкой вопросов укажите попытку."]}
+                )
+            return None
+
+        attempt = TestAttempt.objects.filter(
+            pk=attempt_id, student_id=student.id, test=test, status="started"
+        ).first()
+        if attempt is None:
+            raise ValidationError({"attempt_id": ["Начатая попытка не найдена."]})
+        return attempt
+
+    @staticmethod
+    def finish(attempt, status, **fields):
+        """Перевод начатой попытки в статус status условным UPDATE.
+
+        Повторная отправка той же попытки не проходит: UPDATE затрагивает
+        только строку в статусе started.
+        """
+
+        updated = TestAttempt.objects.filter(pk=attempt.pk, status="started").update(
+            status=status, updated_at=timezone.now(), **fields
+        )
+        if not updated:
+            raise ValidationError({"attempt_id": ["Попытка уже отправлена."]})
+        attempt.status = status
+        for field, value in fields.items():
+            setattr(attempt, field, value)
+        return attempt
+
+    @staticmethod
+    def answer_key(test, attempt):
+        """Ключ ответов только по вопросам, выбранным для попытки."""
+
+        return AnswerKey.for_questions(test.passing_score, attempt.question_ids)
+
+
+class StatsService:
+    """Инкрементальное ведение статистики результатов теста в TestStats.
+
+    Каждая запись результатов добавляет и вычитает из агрегата только свои
+    строки одним UPDATE с F(), поэтому блокировка строки статистики держится
+    только на время этого запроса, а чтение статистики не требует прохода по
+    TestResult. Полный пересчет нужен только для сверки.
+    """
+
+    @staticmethod
+    def bucket(percentage):
+        """Номер интервала гистограммы для процента правильных ответов."""
+
+        width = 100 / TestStats.HISTOGRAM_BUCKETS
+        return min(max(int(percentage // width), 0), TestStats.HISTOGRAM_BUCKETS - 1)
+
+    @staticmethod
+    def apply(test_id, added=(), removed=()):
+        """Учет добавленных и удаленных результатов.
+
+        added и removed — пары (percentage, is_passed); результаты без
+        процента в статистику не входят. Строка статистики создается только
+        при добавлении: удаление результатов теста без статистики (например,
+        каскадом вместе с тестом) ничего не меняет. Возвращает число
+        измененных строк статистики.
+        """
+
+        changes = [
+            (sign, percentage, is_passed)
+            for sign, rows in ((1, added), (-1, removed))
+            for percentage, is_passed in rows
+            if percentage is not None
+        ]
+        if test_id is None or not changes:
+            return 0
+
+        deltas = defaultdict(int)
+        for sign, percentage, is_passed in changes:
+            deltas["count"] += sign
+            deltas["percentage_sum"] += sign * percentage
+            deltas["percentage_squares_sum"] += sign * percentage * percentage
+            deltas["passed_count"] += sign * bool(is_passed)
+            deltas[f"bucket_{StatsService.bucket(percentage)}"] += sign
+        updates = {field: F(field) + delta for field, delta in deltas.items() if delta}
+        if not updates:
+            return 0
+
+        stats = TestStats.objects.filter(test_id=test_id)
+        updated = stats.update(**updates, updated_at=timezone.now())
+        if not updated and added:
+            try:
+                with transaction.atomic():
+                    TestStats.objects.create(test_id=test_id, **deltas)
+                updated = 1
+            except IntegrityError:
+                updated = stats.update(**updates, updated_at=timezone.now())
+        return updated
+
+    @staticmethod
+    def record_results(test_id, results):
+        """Учет новых результатов, results — словари с полями результата."""
+
+        return StatsService.apply(
+            test_id,
+            added=[(result["percentage"], result["is_passed"]) for result in results],
+        )
+
+    @staticmethod
+    def remove_result(test_result):
+        """Исключение удаляемого результата из статистики."""
+
+        return StatsService.apply(
+            test_result.test_id,
+            removed=[(test_result.percentage, test_result.is_passed)],
+        )
+
+    @staticmethod
+    def recount_passed(test_id):
+        """Пересчет числа зачтенных результатов одним UPDATE после смены минимального балла."""
+
+        passed = (
+            TestResult.objects.filter(
+                test_id=OuterRef("test_id"), percentage__isnull=False, is_passed=True
+            )
+            .values("test_id")
+            .annotate(passed=Count("id"))
+            .values("passed")
+        )
+        return TestStats.objects.filter(test_id=test_id).update(
+            passed_count=Coalesce(Subquery(passed), 0), updated_at=timezone.now()
+        )
+
+    @staticmethod
+    def aggregate(test_id):
+        """Подсчет статистики теста по TestResult одним агрегирующим запросом."""
+
+        width = 100 / TestStats.HISTOGRAM_BUCKETS
+        last = TestStats.HISTOGRAM_BUCKETS - 1
+        buckets = {
+            f"bucket_{index}": Count(
+                "id",
+                filter=(Q(percentage__gte=index * width) if index > 0 else Q())
+                & (Q(percentage__lt=(index + 1) * width) if index < last else Q()),
+            )
+            for index in range(TestStats.HISTOGRAM_BUCKETS)
+        }
+        values = TestResult.objects.filter(
+            test_id=test_id, percentage__isnull=False
+        ).aggregate(
+            count=Count("id"),
+            percentage_sum=Coalesce(Sum("percentage"), 0.0),
+            percentage_squares_sum=Coalesce(
+                Sum(F("percentage") * F("percentage")), 0.0
+            ),
+            passed_count=Count("id", filter=Q(is_passed=True)),
+            **buckets,
+        )
+        return values
+
+    @staticmethod
+    def rebuild(test_id):
+        """Пересчет статистики теста с нуля.
+
+        Возвращает True, если сохраненная статистика расходилась с пересчитанной.
+        """
+
+        values = StatsService.aggregate(test_id)
+        with transaction.atomic():
+            stats, created = TestStats.objects.select_for_update().get_or_create(
+                test_id=test_id, defaults=values
+            )
+            if created:
+                return values["count"] > 0
+            if StatsService._matches(stats, values):
+                return False
+            for field, value in values.items():
+                setattr(stats, field, value)
+            stats.save()
+        return True
+
+    @staticmethod
+    def _matches(stats, values):
+        """Совпадение сохраненной статистики с пересчитанной с учетом округления."""
+
+        return (
+            stats.count == values["count"]
+            and stats.passed_count == values["passed_count"]
+            and all(
+                getattr(stats, field) == values[field]
+                for field in TestStats.bucket_fields()
+            )
+            and math.isclose(
+                stats.percentage_sum, values["percentage_sum"], abs_tol=1e-6
+            )
+            and math.isclose(
+                stats.percentage_squares_sum,
+                values["percentage_squares_sum"],
+                rel_tol=1e-9,
+                abs_tol=1e-6,
+            )
+        )
+
+
+class ItemAnalysisService:
+    """Классический анализ заданий теста по сохраненным ответам студентов.
+
+    Ответы загружаются пачками в массивы NumPy, по пачкам копятся суммы, из
+    которых получаются доля правильных ответов на вопрос (p-value),
+    точечно-бисериальная корреляция ответа с баллом за остальные вопросы и
+    доли выбора каждого варианта ответа.
+    """
+
+    CACHE_KEY = "tests:item_analysis:{test_id}:{version}:{stamp}"
+
+    @staticmethod
+    def get(test):
+        """Анализ заданий теста из кеша с расчетом при промахе."""
+
+        key = ItemAnalysisService._cache_key(test)
+        analysis = cache.get(key)
+        if analysis is None:
+            analysis = ItemAnalysisService.analyze(test)
+            ItemAnalysisService._store(key, analysis)
+        return analysis
+
+    @staticmethod
+    def refresh(test, chunk_size=None):
+        """Расчет анализа заданий теста с сохранением в кеш."""
+
+        key = ItemAnalysisService._cache_key(test)
+        analysis = ItemAnalysisService.analyze(test, chunk_size=chunk_size)
+        ItemAnalysisService._store(key, analysis)
+        return analysis
+
+    @staticmethod
+    def analyze(test, chunk_size=None):
+        """Расчет анализа заданий теста по всем сохраненным ответам.
+
+        Показатели вопроса считаются по студентам, которым он был показан:
+        при выборке вопросов для попытки каждый студент видит только часть
+        пула, и непоказанный вопрос не считается неправильным ответом.
+        """
+
+        chunk_size = chunk_size or getattr(settings, "ITEM_ANALYSIS_CHUNK_SIZE", 5000)
+        answer_key = ItemAnalysisService._answer_key(test)
+        question_ids = np.array(sorted(answer_key.questions), dtype=np.int64)
+        answer_questions = sorted(
+            (answer_id, index)
+            for index, question_id in enumerate(question_ids.tolist())
+            for answer_id in answer_key.questions[question_id].answer_ids
+        )
+        answer_ids = np.array(
+            [answer_id for answer_id, _ in answer_questions], dtype=np.int64
+        )
+        answer_columns = np.array(
+            [index for _, index in answer_questions], dtype=np.int64
+        )
+
+        respondents = 0
+        presented_sum = np.zeros(len(question_ids))
+        total_sum = np.zeros(len(question_ids))
+        total_squares_sum = np.zeros(len(question_ids))
+        correct_sum = np.zeros(len(question_ids))
+        correct_total_sum = np.zeros(len(question_ids))
+        selections = np.zeros(len(answer_ids), dtype=np.int64)
+
+        rows = (
+            TestResult.objects.filter(test=test, responses__isnull=False)
+            .values_list("responses", flat=True)
+            .iterator(chunk_size=chunk_size)
+        )
+        while chunk := list(islice(rows, chunk_size)):
+            correct, presented, selected = ItemAnalysisService._load_chunk(
+                question_ids, answer_ids, chunk
+            )
+            totals = correct.sum(axis=1)
+            respondents += len(chunk)
+            presented_sum += presented.sum(axis=0)
+            total_sum += totals @ presented
+            total_squares_sum += (totals * totals) @ presented
+            correct_sum += correct.sum(axis=0)
+            correct_total_sum += totals @ correct
+            selections += selected
+
+        p_values, discrimination = ItemAnalysisService._item_statistics(
+            presented_sum, total_sum, total_squares_sum, correct_sum, correct_total_sum
+        )
+        presented_answers = presented_sum[answer_columns]
+        rates = np.full(len(answer_ids), np.nan)
+        np.divide(selections, presented_answers, out=rates, where=presented_answers > 0)
+        selection_rates = dict(zip(answer_ids.tolist(), rates.tolist()))
+
+        questions = []
+        for index, question_id in enumerate(question_ids.tolist()):
+            question_key = answer_key.questions[question_id]
+            questions.append(
+                {
+                    "question_id": question_id,
+                    "question_type": question_key.question_type,
+                    "p_value": ItemAnalysisService._round(p_values[index]),
+                    "discrimination": ItemAnalysisService._round(discrimination[index]),
+                    "answers": (
+                        []
+                        if question_key.question_type == "text"
+                        else [
+                            {
+                                "answer_id": answer_id,
+                                "is_correct": answer_id in question_key.correct_ids,
+                                "selection_rate": ItemAnalysisService._round(
+                                    selection_rates[answer_id]
+                                ),
+                            }
+                            for answer_id in sorted(question_key.answer_ids)
+                        ]
+                    ),
+                }
+            )
+
+        return {"test": test.id, "respondents": respondents, "questions": questions}
+
+    @staticmethod
+    def _answer_key(test):
+        """Ключ ответов по вопросам, которые могли быть показаны студентам теста.
+
+        При выборке из пула материала это вопросы всех тестов материала.
+        """
+
+        if test.sample_size and test.sample_pool == "material" and test.material_id:
+            return AnswerKey.for_questions(
+                test.passing_score,
+                Question.objects.filter(test__material_id=test.material_id).values(
+                    "id"
+                ),
+            )
+        return AnswerKey.for_test(test)
+
+    @staticmethod
+    def _load_chunk(question_ids, answer_ids, blobs):
+        """Декодирование пачки ответов в матрицы правильности и показа вопросов.
+
+        Возвращает также счетчики выбора вариантов ответа.
+        """
+
+        correct = np.zeros((len(blobs), len(question_ids)))
+        presented = np.zeros((len(blobs), len(question_ids)))
+        selected_ids = []
+        for row, blob in enumerate(blobs):
+            decoded = decode_responses(blob)
+            row_question_ids = np.array(decoded.question_ids, dtype=np.int64)
+            columns = np.searchsorted(question_ids, row_question_ids)
+            known = columns < len(question_ids)
+            known[known] = question_ids[columns[known]] == row_question_ids[known]
+            presented[row, columns[known]] = 1
+            correct[row, columns[known]] = np.array(decoded.correct, dtype=bool)[known]
+            for answer_ids_of_question in decoded.selected:
+                selected_ids.extend(answer_ids_of_question)
+
+        selected = np.zeros(len(answer_ids), dtype=np.int64)
+        if selected_ids and len(answer_ids):
+            selected_ids = np.array(selected_ids, dtype=np.int64)
+            positions = np.searchsorted(answer_ids, selected_ids)
+            known = positions < len(answer_ids)
+            known[known] = answer_ids[positions[known]] == selected_ids[known]
+            selected += np.bincount(positions[known], minlength=len(answer_ids))
+        return correct, presented, selected
+
+    @staticmethod
+    def _item_statistics(
+        presented_sum, total_sum, total_squares_sum, correct_sum, correct_total_sum
+    ):
+        """Доли правильных ответов и корреляции с баллом за остальные вопросы.
+
+        Все суммы берутся по студентам, которым показан вопрос: presented_sum
+        — их число, total_sum и total_squares_sum — суммы t и t^2 по ним.
+        Балл за остальные вопросы y = t - x, поэтому нужные суммы выражаются
+        через накопленные суммы x, t, t^2 и x * t (x^2 = x для 0/1).
+        """
+
+        n = presented_sum
+        p_values = np.full(len(correct_sum), np.nan)
+        discrimination = np.full(len(correct_sum), np.nan)
+        shown = n > 0
+        if not shown.any():
+            return p_values, discrimination
+
+        n, correct_sum, correct_total_sum = (
+            n[shown],
+            correct_sum[shown],
+            correct_total_sum[shown],
+        )
+        rest_sum = total_sum[shown] - correct_sum
+        rest_squares_sum = (
+            total_squares_sum[shown] - 2 * correct_total_sum + correct_sum
+        )
+        correct_rest_sum = correct_total_sum - correct_sum
+
+        covariance = correct_rest_sum - correct_sum * rest_sum / n
+        correct_variance = correct_sum - correct_sum**2 / n
+        rest_variance = rest_squares_sum - rest_sum**2 / n
+        denominator = np.sqrt(np.clip(correct_variance * rest_variance, 0, None))
+
+        item_discrimination = np.full(len(n), np.nan)
+        defined = denominator > 1e-9
+        item_discrimination[defined] = covariance[defined] / denominator[defined]
+        p_values[shown] = correct_sum / n
+        discrimination[shown] = item_discrimination
+        return p_values, discrimination
+
+    @staticmethod
+    def _round(value):
+        """Округление показателя, неопределенные значения возвращаются как None."""
+
+        if value is None or np.isnan(value):
+            return None
+        return round(float(value), 4)
+
+    @staticmethod
+    def _cache_key(test):
+        """Ключ кеша по версии теста и времени последнего изменения его результатов.
+
+        При выборке из пула материала в ключ входит и версия пула.
+        """
+
+        updated_at = (
+            TestStats.objects.filter(test_id=test.id)
+            .values_list("updated_at", flat=True)
+            .first()
+        )
+        version = get_test_version(test.id)
+        if test.sample_size and test.sample_pool == "material" and test.material_id:
+            version = f"{version}-{get_material_pool_version(test.material_id)}"
+        return ItemAnalysisService.CACHE_KEY.format(
+            test_id=test.id,
+            version=version,
+            stamp=int(updated_at.timestamp() * 1_000_000) if updated_at else 0,
+        )
+
+    @staticmethod
+    def _store(key, analysis):
+        """Сохранение анализа заданий в кеше."""
+
+        cache.set(
+            key,
+            analysis,
+            getattr(settings, "ITEM_ANALYSIS_CACHE_TIMEOUT", 60 * 60 * 24),
+        )
 
 
 class TestCalculateService:
     """Сервис для подсчета результатов"""
 
     @staticmethod
-    def calculate_results(self, test, submitted_answers):
+    def calculate_results(self, test, submitted_answers, answer_key=None):
         """Логика подсчета результатов теста."""
-        questions = test.questions.all()
-        total_questions = questions.count()
-        correct_answers_count = 0
 
-        for question in questions:
-            student_answer = next(
-                (
-                    answer
-                    for answer in submitted_answers
-                    if answer["question_id"] == question.id
-                ),
-                None,
+        if answer_key is None:
+            answer_key = answer_key_cache.get(test)
+
+        answers_by_question = answer_key.normalize_submission(submitted_answers)
+        correct = TestCalculateService.check_questions(answer_key, answers_by_question)
+        return TestCalculateService.summarize(answer_key, correct)
+
+    @staticmethod
+    def grade_submission(test, submitted_answers, answer_key=None):
+        """Подсчет результатов и компактная запись ответов для сохранения в TestResult."""
+
+        if answer_key is None:
+            answer_key = answer_key_cache.get(test)
+        answers_by_question = answer_key.normalize_submission(submitted_answers)
+        correct = TestCalculateService.check_questions(answer_key, answers_by_question)
+
+        question_ids = list(answer_key.questions)
+        responses = ResponseStorage.encode_many(
+            question_ids, [answers_by_question], [correct]
+        )[0]
+        return TestCalculateService.summarize(answer_key, correct), responses
+
+    @staticmethod
+    def check_questions(answer_key, answers_by_question):
+        """Правильность ответа на каждый вопрос ключа в порядке answer_key.questions."""
+
+        correct = []
+        for question_id, question_key in answer_key.questions.items():
+            student_answer = answers_by_question.get(question_id)
+            correct.append(
+                bool(student_answer)
+                and TestCalculateService._check_answer_correctness(
+                    question_key, student_answer
+                )
             )
+        return correct
 
-            if student_answer and TestCalculateService._check_answer_correctness(
-                question, student_answer
-            ):
-                correct_answers_count += 1
+    @staticmethod
+    def summarize(answer_key, correct):
+        """Баллы, процент и зачет по списку правильности ответов на вопросы."""
 
-        percentage = (
-            (correct_answers_count / total_questions) * 100
-            if total_questions > 0
-            else 0
+        total_questions = len(correct)
+        correct_answers_count = sum(correct)
+
+        percentage = round(
+            (
+                (correct_answers_count / total_questions) * 100
+                if total_questions > 0
+                else 0
+            ),
+            2,
         )
-        is_passed = percentage >= test.passing_score
+        is_passed = percentage >= answer_key.passing_score
 
         return {
             "score": correct_answers_count,
             "total_questions": total_questions,
             "correct_answers": correct_answers_count,
-            "percentage": round(percentage, 2),
+            "percentage": percentage,
             "is_passed": is_passed,
         }
 
+    @staticmethod
+    def _question_key(question):
+        """Получение ключа вопроса из модели Question или готового QuestionKey."""
+
+        if isinstance(question, QuestionKey):
+            return question
+        return AnswerKey.compile_question(question)
+
     @staticmethod
     def _check_answer_correctness(question, student_answer):
         """Проверка правильности ответа на вопрос."""
@@ -48,6 +1154,8 @@ class TestCalculateService:
         if not student_answer:
             return False
 
+        question = TestCalculateService._question_key(question)
+
         if question.question_type == "single":
             return TestCalculateService._check_single_choice(question, student_answer)
         elif question.question_type == "multiple":
@@ -61,43 +1169,1057 @@ class TestCalculateService:
     def _check_single_choice(question, student_answer):
         """Проверка одиночного выбора."""
 
+        question = TestCalculateService._question_key(question)
+
         selected_answers = student_answer.get("selected_answers", [])
         if len(selected_answers) != 1:
             return False
 
-        try:
-            selected_answer = Answer.objects.get(
-                id=selected_answers[0], question=question
-            )
-            return selected_answer.is_correct
-        except Answer.DoesNotExist:
-            return False
+        return selected_answers[0] in question.correct_ids
 
     @staticmethod
     def _check_multiple_choice(question, student_answer):
         """Проверка множественного выбора."""
 
+        question = TestCalculateService._question_key(question)
+
         selected_answers = set(student_answer.get("selected_answers", []))
         if not selected_answers:
             return False
 
-        correct_answers = set(
-            question.answers.filter(is_correct=True).values_list("id", flat=True)
-        )
-
-        return correct_answers == selected_answers
+        return question.correct_ids == selected_answers
 
     @staticmethod
     def _check_text_answer(question, student_answer):
         """Проверка текстового ответа."""
 
+        question = TestCalculateService._question_key(question)
+
         text_answer = student_answer.get("text_answer", "").strip().lower()
         if not text_answer:
             return False
 
-        correct_texts = [
-            answer.text.strip().lower()
-            for answer in question.answers.filter(is_correct=True)
+        return text_answer in question.correct_texts
+
+
+class BatchCalculateService:
+    """Сервис пакетного подсчета результатов многих студентов по одному тесту.
+
+    Ответы кодируются булевыми матрицами (студенты x варианты ответов), после
+    чего правильность, баллы и зачет вычисляются векторно для всех сразу.
+    Результаты совпадают с TestCalculateService.calculate_results.
+    """
+
+    @staticmethod
+    def calculate_results(test, submissions, answer_key=None):
+        """Подсчет результатов для списка отправок (списков ответов студентов)."""
+
+        if answer_key is None:
+            answer_key = answer_key_cache.get(test)
+
+        normalized = [
+            answer_key.normalize_submission(submitted_answers)
+            for submitted_answers in submissions
+        ]
+        return BatchCalculateService.grade(answer_key, normalized)
+
+    @staticmethod
+    def grade(answer_key, normalized_submissions):
+        """Векторная проверка отправок, уже проиндексированных по question_id."""
+
+        correct = BatchCalculateService.check_questions(
+            answer_key, normalized_submissions
+        )
+        return BatchCalculateService.summarize(answer_key, correct)
+
+    @staticmethod
+    def grade_with_responses(answer_key, normalized_submissions):
+        """Проверка отправок и компактная запись ответов для сохранения в TestResult."""
+
+        correct = BatchCalculateService.check_questions(
+            answer_key, normalized_submissions
+        )
+        responses = ResponseStorage.encode_many(
+            list(answer_key.questions), normalized_submissions, correct.tolist()
+        )
+        return BatchCalculateService.summarize(answer_key, correct), responses
+
+    @staticmethod
+    def check_questions(answer_key, normalized_submissions):
+        """Матрица правильности (студенты x вопросы в порядке answer_key.questions)."""
+
+        question_ids = list(answer_key.questions)
+        question_index = {
+            question_id: index for index, question_id in enumerate(question_ids)
+        }
+        students_count = len(normalized_submissions)
+        questions_count = len(question_ids)
+
+        option_column = {}
+        segment_bounds = np.zeros(questions_count + 1, dtype=np.int64)
+        correct_options = []
+        for index, question_id in enumerate(question_ids):
+            question_key = answer_key.questions[question_id]
+            for answer_id in sorted(question_key.answer_ids):
+                option_column[answer_id] = (len(correct_options), index)
+                correct_options.append(answer_id in question_key.correct_ids)
+            segment_bounds[index + 1] = len(correct_options)
+
+        selected = np.zeros((students_count, len(correct_options)), dtype=bool)
+        answered = np.zeros((students_count, questions_count), dtype=bool)
+        selected_count = np.zeros((students_count, questions_count), dtype=np.int64)
+        foreign = np.zeros((students_count, questions_count), dtype=bool)
+        text_correct = np.zeros((students_count, questions_count), dtype=bool)
+
+        for student, answers_by_question in enumerate(normalized_submissions):
+            for question_id, student_answer in answers_by_question.items():
+                index = question_index[question_id]
+                answered[student, index] = True
+
+                selected_answers = student_answer.get("selected_answers", [])
+                selected_count[student, index] = len(selected_answers)
+                for answer_id in selected_answers:
+                    column, owner = option_column.get(answer_id, (None, None))
+                    if owner != index:
+                        foreign[student, index] = True
+                    else:
+                        selected[student, column] = True
+
+                text_answer = student_answer.get("text_answer", "").strip().lower()
+                if text_answer:
+                    text_correct[student, index] = (
+                        text_answer in answer_key.questions[question_id].correct_texts
+                    )
+
+        correct_vector = np.array(correct_options, dtype=bool)
+        hits = BatchCalculateService._sum_segments(
+            selected & correct_vector, segment_bounds
+        )
+        mismatches = BatchCalculateService._sum_segments(
+            selected ^ correct_vector, segment_bounds
+        )
+
+        question_types = np.array(
+            [
+                answer_key.questions[question_id].question_type
+                for question_id in question_ids
+            ],
+            dtype=object,
+        )
+        single_correct = (selected_count == 1) & ~foreign & (hits == 1)
+        multiple_correct = (selected_count > 0) & ~foreign & (mismatches == 0)
+        return answered & (
+            (single_correct & (question_types == "single"))
+            | (multiple_correct & (question_types == "multiple"))
+            | (text_correct & (question_types == "text"))
+        )
+
+    @staticmethod
+    def summarize(answer_key, correct):
+        """Баллы, процент и зачет по матрице правильности ответов."""
+
+        students_count, questions_count = correct.shape
+        scores = correct.sum(axis=1)
+        if questions_count > 0:
+            percentages = (scores / questions_count) * 100
+        else:
+            percentages = np.zeros(students_count, dtype=np.int64)
+        percentages = [round(percentage, 2) for percentage in percentages.tolist()]
+
+        return [
+            {
+                "score": score,
+                "total_questions": questions_count,
+                "correct_answers": score,
+                "percentage": percentage,
+                "is_passed": percentage >= answer_key.passing_score,
+            }
+            for score, percentage in zip(scores.tolist(), percentages)
+        ]
+
+    @staticmethod
+    def _sum_segments(matrix, segment_bounds):
+        """Суммы по столбцам каждого вопроса, в том числе для вопросов без вариантов."""
+
+        cumulative = np.zeros((matrix.shape[0], matrix.shape[1] + 1), dtype=np.int64)
+        np.cumsum(matrix, axis=1, out=cumulative[:, 1:])
+        return cumulative[:, segment_bounds[1:]] - cumulative[:, segment_bounds[:-1]]
+
+
+class BulkSubmitService:
+    """Сервис пакетной отправки ответов многих студентов на один тест.
+
+    Строки JSON Lines разбираются по одной, проверяются, оцениваются
+    пачками по общему ключу ответов и сохраняются через bulk_create в одной
+    транзакции. Ошибки отдельных строк не прерывают обработку остальных.
+    """
+
+    @staticmethod
+    def submit(test, lines, chunk_size=None):
+        """Обработка строк отправки, возвращает число созданных результатов и ошибки.
+
+        Тест с выборкой вопросов не принимается: строка не указывает, какие
+        вопросы выпали студенту, и невыпавшие считались бы неправильными.
+        """
+
+        if test.sample_size:
+            raise ValidationError(
+                {
+                    "detail": "Пакетная отправка недоступна для теста с выборкой вопросов."
+                }
+            )
+
+        chunk_size = chunk_size or getattr(settings, "BULK_SUBMIT_CHUNK_SIZE", 500)
+        answer_key = answer_key_cache.get(test)
+        created = 0
+        errors = []
+        chunk = []
+
+        with transaction.atomic():
+            for line_number, line in enumerate(lines, start=1):
+                row = BulkSubmitService._parse_row(answer_key, line_number, line)
+                if row is None:
+                    continue
+                if "errors" in row:
+                    errors.append(row)
+                    continue
+
+                chunk.append(row)
+                if len(chunk) >= chunk_size:
+                    created += BulkSubmitService._save_chunk(
+                        test, answer_key, chunk, errors
+                    )
+                    chunk = []
+
+            if chunk:
+                created += BulkSubmitService._save_chunk(
+                    test, answer_key, chunk, errors
+                )
+
+        errors.sort(key=lambda error: error["line"])
+        return created, errors
+
+    @staticmethod
+    def _parse_row(answer_key, line_number, line):
+        """Разбор и проверка одной строки отправки."""
+
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        if not line.strip():
+            return None
+
+        try:
+            data = json.loads(line)
+        except ValueError:
+            return {
+                "line": line_number,
+                "errors": {"non_field_errors": ["Некорректный JSON."]},
+            }
+
+        serializer = BulkSubmissionRowSerializer(data=data)
+        if not serializer.is_valid():
+            return {"line": line_number, "errors": serializer.errors}
+
+        try:
+            answers_by_question = answer_key.normalize_submission(
+                serializer.validated_data["answers"]
+            )
+        except ValidationError as error:
+            return {"line": line_number, "errors": error.detail}
+
+        return {
+            "line": line_number,
+            "student": serializer.validated_data["student"],
+            "answers": answers_by_question,
+        }
+
+    @staticmethod
+    def _save_chunk(test, answer_key, chunk, errors):
+        """Проверка студентов, оценка и сохранение пачки строк."""
+
+        existing_students = set(
+            User.objects.filter(id__in={row["student"] for row in chunk}).values_list(
+                "id", flat=True
+            )
+        )
+        valid_rows = []
+        for row in chunk:
+            if row["student"] in existing_students:
+                valid_rows.append(row)
+            else:
+                errors.append(
+                    {
+                        "line": row["line"],
+                        "errors": {"student": ["Пользователь не найден."]},
+                    }
+                )
+
+        results, responses = BatchCalculateService.grade_with_responses(
+            answer_key, [row["answers"] for row in valid_rows]
+        )
+        TestResult.objects.bulk_create(
+            [
+                TestResult(
+                    student_id=row["student"],
+                    test=test,
+                    responses=row_responses,
+                    **result_data,
+                )
+                for row, result_data, row_responses in zip(
+                    valid_rows, results, responses
+                )
+            ]
+        )
+        StatsService.record_results(test.id, results)
+        return len(valid_rows)
+
+
+class GradingQueueService:
+    """Очередь асинхронной проверки попыток на таблице TestAttempt.
+
+    Обработчики забирают ожидающие попытки через SELECT ... FOR UPDATE SKIP
+    LOCKED, поэтому несколько процессов могут работать параллельно без
+    внешнего брокера сообщений.
+    """
+
+    @staticmethod
+    def enqueue(
+        student,
+        test,
+        submitted_answers,
+        snapshot=None,
+        attempt_number=None,
+        started=None,
+    ):
+        """Проверка отправки на повторы и чужие вопросы и сохранение ее как ожидающей попытки.
+
+        started — начатая попытка с выборкой вопросов, которая переводится в очередь.
+        """
+
+        if started is not None:
+            QuestionSamplingService.answer_key(test, started).normalize_submission(
+                submitted_answers
+            )
+            return QuestionSamplingService.finish(
+                started,
+                "pending",
+                answers=submitted_answers,
+                attempt_number=attempt_number,
+            )
+
+        GradingQueueService._answer_key(test, snapshot).normalize_submission(
+            submitted_answers
+        )
+        return TestAttempt.objects.create(
+            student_id=student.id,
+            test=test,
+            snapshot=snapshot,
+            attempt_number=attempt_number,
+            answers=submitted_answers,
+        )
+
+    @staticmethod
+    def process_batch(limit=100):
+        """Проверка очередной пачки ожидающих попыток, возвращает их количество."""
+
+        with transaction.atomic():
+            attempts = list(
+                TestAttempt.objects.select_for_update(skip_locked=True, of=("self",))
+                .select_related("test", "snapshot")
+                .filter(status="pending")
+                .order_by("id")[:limit]
+            )
+
+            attempts_by_test = {}
+            for attempt in attempts:
+                question_ids = attempt.question_ids
+                attempts_by_test.setdefault(
+                    (
+                        attempt.test_id,
+                        attempt.snapshot_id,
+                        tuple(question_ids) if question_ids else None,
+                    ),
+                    [],
+                ).append(attempt)
+
+            for test_attempts in attempts_by_test.values():
+                GradingQueueService._grade_attempts(test_attempts)
+
+            TestAttempt.objects.bulk_update(
+                attempts, ["status", "result", "error", "updated_at"]
+            )
+
+        return len(attempts)
+
+    @staticmethod
+    def _grade_attempts(attempts):
+        """Проверка попыток одного теста, снимка и выборки вопросов общим ключом ответов."""
+
+        test = attempts[0].test
+        snapshot = attempts[0].snapshot
+        if attempts[0].question_ids:
+            answer_key = QuestionSamplingService.answer_key(test, attempts[0])
+        elif snapshot is not None:
+            answer_key = SnapshotService.answer_key(test, snapshot)
+        else:
+            # Ключ загружается из БД, а не из answer_key_cache: обработчик
+            # работает в отдельном процессе и при кеше в памяти процесса не
+            # видит сброса версии теста веб-процессом.
+            answer_key = AnswerKey.for_test(test)
+
+        graded = []
+        for attempt in attempts:
+            try:
+                graded.append(
+                    (attempt, answer_key.normalize_submission(attempt.answers))
+                )
+            except ValidationError as error:
+                attempt.status = "failed"
+                attempt.error = json.dumps(error.detail, ensure_ascii=False)
+                attempt.updated_at = timezone.now()
+
+        results, responses = BatchCalculateService.grade_with_responses(
+            answer_key, [answers_by_question for _, answers_by_question in graded]
+        )
+        test_results = TestResult.objects.bulk_create(
+            [
+                TestResult(
+                    student_id=attempt.student_id,
+                    test=test,
+                    snapshot=snapshot,
+                    attempt_number=attempt.attempt_number,
+                    responses=attempt_responses,
+                    **result_data,
+                )
+                for (attempt, _), result_data, attempt_responses in zip(
+                    graded, results, responses
+                )
+            ]
+        )
+        for (attempt, _), test_result in zip(graded, test_results):
+            attempt.status = "done"
+            attempt.result = test_result
+            attempt.updated_at = timezone.now()
+        StatsService.record_results(test.id, results)
+
+    @staticmethod
+    def _answer_key(test, snapshot):
+        """Ключ ответов снимка или текущий ключ теста."""
+
+        if snapshot is not None:
+            return SnapshotService.answer_key(test, snapshot)
+        return answer_key_cache.get(test)
+
+
+RESULT_FIELDS = [
+    "score",
+    "total_questions",
+    "correct_answers",
+    "percentage",
+    "is_passed",
+]
+
+
+def _regrade_chunk(answer_key, rows):
+    """Перепроверка пачки подготовленных строк, возвращает изменившиеся результаты.
+
+    Строка: (id, responses, id вопросов в ответах, ответы студента, ссылки
+    на тексты, *RESULT_FIELDS), изменение: (id, прежние значения
+    RESULT_FIELDS, новые значения). Результат проверяется только по
+    сохраненным в нем вопросам, оставшимся в ключе: добавленные после
+    прохождения вопросы не считаются неотвеченными.
+    Функция не обращается к БД, поэтому выполняется в процессах пула.
+    """
+
+    groups = defaultdict(list)
+    for row in rows:
+        question_ids = tuple(
+            question_id for question_id in row[2] if question_id in answer_key.questions
+        )
+        groups[question_ids].append(row)
+
+    changed = []
+    for question_ids, group in groups.items():
+        group_key = AnswerKey(
+            answer_key.passing_score,
+            {
+                question_id: answer_key.questions[question_id]
+                for question_id in question_ids
+            },
+        )
+        changed.extend(_regrade_group(group_key, group))
+    return changed
+
+
+def _regrade_group(answer_key, rows):
+    """Перепроверка строк с одинаковым набором вопросов общим ключом ответов."""
+
+    normalized = [
+        {
+            answer["question_id"]: answer
+            for answer in answers
+            if answer["question_id"] in answer_key.questions
+        }
+        for _, _, _, answers, *_ in rows
+    ]
+    correct = BatchCalculateService.check_questions(answer_key, normalized)
+    results = BatchCalculateService.summarize(answer_key, correct)
+    question_ids = list(answer_key.questions)
+
+    changed = []
+    for row, answers_by_question, row_correct, result_data in zip(
+        rows, normalized, correct.tolist(), results
+    ):
+        result_id, old_responses, _, _, text_refs, *old_values = row
+        responses = encode_responses(
+            question_ids,
+            answers_by_question,
+            dict(zip(question_ids, row_correct)),
+            {
+                question_id: text_ref
+                for question_id, text_ref in text_refs.items()
+                if question_id in answers_by_question
+            },
+        )
+        if responses != old_responses or old_values != [
+            result_data[field] for field in RESULT_FIELDS
+        ]:
+            changed.append(
+                (
+                    result_id,
+                    dict(zip(RESULT_FIELDS, old_values)),
+                    dict(result_data, responses=responses),
+                )
+            )
+    return changed
+
+
+class RegradeService:
+    """Перепроверка сохраненных результатов после изменения ключа ответов.
+
+    Изменение только минимального балла выполняется одним UPDATE по
+    проценту, изменение ответов — перепроверкой сохраненных ответов студентов
+    пачками в пуле процессов с записью изменившихся строк через bulk_update.
+    """
+
+    @staticmethod
+    def update_passing_score(test):
+        """Пересчет признака зачета одним UPDATE после смены минимального балла."""
+
+        updated = TestResult.objects.filter(test=test, percentage__isnull=False).update(
+            is_passed=ExpressionWrapper(
+                Q(percentage__gte=test.passing_score), output_field=BooleanField()
+            )
+        )
+        StatsService.recount_passed(test.id)
+        return updated
+
+    @staticmethod
+    def schedule(test_id):
+        """Постановка перепроверки теста в очередь, если по нему есть результаты."""
+
+        if not TestResult.objects.filter(test_id=test_id).exists():
+            return None
+        job, _ = RegradeJob.objects.get_or_create(test_id=test_id, status="pending")
+        return job
+
+    @staticmethod
+    def process_pending(workers=1, chunk_size=None):
+        """Выполнение ожидающих перепроверок, возвращает число обработанных заданий.
+
+        Задание захватывается короткой транзакцией, а перепроверка идет вне
+        ее: иначе строка TestStats теста, обновляемая каждой пачкой,
+        оставалась бы заблокированной до конца задания и отправки
+        результатов этого теста ждали бы его завершения.
+        """
+
+        processed = 0
+        while True:
+            with transaction.atomic():
+                job = (
+                    RegradeJob.objects.select_for_update(skip_locked=True)
+                    .filter(status="pending")
+                    .order_by("id")
+                    .first()
+                )
+                if job is None:
+                    return processed
+                job.status = "running"
+                job.save(update_fields=["status", "updated_at"])
+
+            try:
+                job.updated_results = RegradeService.regrade_test(
+                    job.test, workers=workers, chunk_size=chunk_size
+                )
+            except Exception:
+                job.status = "pending"
+                job.save(update_fields=["status", "updated_at"])
+                raise
+            job.status = "done"
+            job.save(update_fields=["status", "updated_results", "updated_at"])
+            processed += 1
+
+    @staticmethod
+    def regrade_test(test, workers=1, chunk_size=None):
+        """Перепроверка всех результатов теста с сохраненными ответами.
+
+        Результаты, проверенные по опубликованному снимку, не перепроверяются:
+        ключ снимка неизменен. Результаты попыток с выборкой проверяются по
+        ключу вопросов своей выборки. Возвращает число изменившихся результатов.
+        """
+
+        chunk_size = chunk_size or getattr(settings, "REGRADE_CHUNK_SIZE", 1000)
+        answer_key = AnswerKey.for_test(test)
+
+        results = TestResult.objects.filter(
+            test=test, snapshot__isnull=True, responses__isnull=False
+        ).order_by("id")
+        rows = (
+            results.exclude(attempt__question_ids__isnull=False)
+            .values_list("id", "responses", *RESULT_FIELDS)
+            .iterator(chunk_size=chunk_size)
+        )
+        sampled_rows = (
+            results.filter(attempt__question_ids__isnull=False)
+            .values_list("attempt__question_ids", "id", "responses", *RESULT_FIELDS)
+            .iterator(chunk_size=chunk_size)
+        )
+        jobs = chain(
+            ((answer_key, chunk) for chunk in RegradeService._chunks(rows, chunk_size)),
+            RegradeService._sampled_jobs(test, sampled_rows, chunk_size),
+        )
+
+        updated = 0
+        if workers <= 1:
+            for job_key, chunk in jobs:
+                updated += RegradeService._save_changed(
+                    test.id, _regrade_chunk(job_key, chunk)
+                )
+            return updated
+
+        # fork явно: при forkserver и spawn процесс пула импортирует
+        # tests.services до django.setup().
+        with multiprocessing.get_context("fork").Pool(workers) as pool:
+            in_flight = deque()
+            for job_key, chunk in jobs:
+                in_flight.append(pool.apply_async(_regrade_chunk, (job_key, chunk)))
+                if len(in_flight) >= workers * 2:
+                    updated += RegradeService._save_changed(
+                        test.id, in_flight.popleft().get()
+                    )
+            while in_flight:
+                updated += RegradeService._save_changed(
+                    test.id, in_flight.popleft().get()
+                )
+        return updated
+
+    @staticmethod
+    def _sampled_jobs(test, rows, chunk_size):
+        """Пачки результатов попыток с выборкой, сгруппированные по вопросам выборки.
+
+        Ключ ответов всех вопросов пачки загружается одним запросом через
+        AnswerKey.for_questions, ключ группы — его часть по вопросам выборки.
+        """
+
+        while chunk := list(islice(rows, chunk_size)):
+            groups = defaultdict(list)
+            for question_ids, *row in chunk:
+                groups[tuple(question_ids)].append(row)
+            chunk_key = AnswerKey.for_questions(
+                test.passing_score,
+                {
+                    question_id
+                    for question_ids in groups
+                    for question_id in question_ids
+                },
+            )
+            for question_ids, group in groups.items():
+                selected = set(question_ids)
+                group_key = AnswerKey(
+                    test.passing_score,
+                    {
+                        question_id: question
+                        for question_id, question in chunk_key.questions.items()
+                        if question_id in selected
+                    },
+                )
+                yield group_key, RegradeService._prepare_chunk(group)
+
+    @staticmethod
+    def _chunks(rows, chunk_size):
+        """Разбиение потока строк на пачки по chunk_size с декодированием ответов."""
+
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                yield RegradeService._prepare_chunk(chunk)
+                chunk = []
+        if chunk:
+            yield RegradeService._prepare_chunk(chunk)
+
+    @staticmethod
+    def _prepare_chunk(chunk):
+        """Декодирование ответов пачки с загрузкой текстов одним запросом."""
+
+        decoded = ResponseStorage.decode_many([responses for _, responses, *_ in chunk])
+        return [
+            (
+                result_id,
+                bytes(responses),
+                item.question_ids,
+                answers,
+                {
+                    question_id: text_ref
+                    for question_id, text_ref in zip(item.question_ids, item.text_refs)
+                    if text_ref
+                },
+                *old_values,
+            )
+            for (result_id, responses, *old_values), (item, answers) in zip(
+                chunk, decoded
+            )
+        ]
+
+    @staticmethod
+    def _save_changed(test_id, changed):
+        """Запись изменившихся результатов одним bulk_update с учетом в статистике."""
+
+        with transaction.atomic():
+            TestResult.objects.bulk_update(
+                [
+                    TestResult(id=result_id, **result_data)
+                    for result_id, _, result_data in changed
+                ],
+                RESULT_FIELDS + ["responses"],
+            )
+            StatsService.apply(
+                test_id,
+                added=[
+                    (result_data["percentage"], result_data["is_passed"])
+                    for _, _, result_data in changed
+                ],
+                removed=[
+                    (old_data["percentage"], old_data["is_passed"])
+                    for _, old_data, _ in changed
+                ],
+            )
+        return len(changed)
+
+
+QUESTION_FIELDS = ["name", "text", "question_type", "tag", "difficulty"]
+
+ANSWER_FIELDS = ["text", "is_correct"]
+
+
+class TestAuthoringService:
+    """Создание и обновление теста вместе с вопросами и ответами.
+
+    Дерево сохраняется в одной транзакции: вопросы и ответы каждого уровня
+    создаются bulk_create, изменяются bulk_update, а отсутствующие в
+    запросе — удаляются. bulk-операции не отправляют сигналы, а обработчики
+    post_delete удаляемых строк отключены, поэтому версии теста, пула
+    вопросов и дерева разделов сбрасываются здесь.
+    """
+
+    @staticmethod
+    def get_queryset():
+        """Тесты с вопросами и ответами, загружаемыми тремя запросами."""
+
+        return Test.objects.prefetch_related("questions__answers")
+
+    @staticmethod
+    def get_tree(test_id):
+        """Тест с вопросами и ответами."""
+
+        return TestAuthoringService.get_queryset().get(pk=test_id)
+
+    @staticmethod
+    def save(validated_data, owner_id, test=None):
+        """Сохранение дерева теста, для существующего test — с обновлением по id."""
+
+        validated_data = dict(validated_data)
+        questions_data = validated_data.pop("questions")
+
+        with transaction.atomic():
+            if test is None:
+                test = Test.objects.create(owner_id=owner_id, **validated_data)
+                questions, answers = {}, {}
+            else:
+                for field, value in validated_data.items():
+                    setattr(test, field, value)
+                test.save()
+                questions = {
+                    question.id: question
+                    for question in Question.objects.filter(test=test)
+                }
+                answers = {
+                    answer.id: answer
+                    for answer in Answer.objects.filter(question__test=test)
+                }
+
+            TestAuthoringService._check_ids(questions_data, questions, answers)
+            with suppress_content_invalidation():
+                key_changed = TestAuthoringService._save_tree(
+                    test, owner_id, questions_data, questions, answers
+                )
+
+            invalidate_test(test.id)
+            invalidate_material_pool(test.material_id)
+            invalidate_section_tree()
+            if key_changed:
+                test_id = test.id
+                transaction.on_commit(lambda: RegradeService.schedule(test_id))
+        return test
+
+    @staticmethod
+    def _check_ids(questions_data, questions, answers):
+        """Проверка, что id вопросов и ответов относятся к этому тесту и вопросу."""
+
+        errors = []
+        for question_data in questions_data:
+            question_id = question_data.get("id")
+            if question_id is not None and question_id not in questions:
+                errors.append(f"Вопрос {question_id} не относится к тесту.")
+            for answer_data in question_data["answers"]:
+                answer_id = answer_data.get("id")
+                if answer_id is None:
+                    continue
+                answer = answers.get(answer_id)
+                if answer is None or answer.question_id != question_id:
+                    errors.append(f"Ответ {answer_id} не относится к вопросу.")
+        if not errors:
+            errors = TestAuthoringService._check_single_choice(
+                questions_data, questions, answers
+            )
+        if errors:
+            raise ValidationError({"questions": errors})
+
+    @staticmethod
+    def _check_single_choice(questions_data, questions, answers):
+        """Проверка единственного правильного ответа у существующих вопросов.
+
+        Непереданные тип вопроса и правильность ответа берутся из БД.
+        """
+
+        errors = []
+        for question_data in questions_data:
+            question_id = question_data.get("id")
+            if question_id is None:
+                continue
+            question_type = question_data.get(
+                "question_type", questions[question_id].question_type
+            )
+            correct = sum(
+                answer_data.get(
+                    "is_correct",
+                    "id" in answer_data and answers[answer_data["id"]].is_correct,
+                )
+                for answer_data in question_data["answers"]
+            )
+            if question_type == "single" and correct > 1:
+                errors.append(
+                    f"У вопроса {question_id} с одним правильным ответом отмечено несколько."
+                )
+        return errors
+
+    @staticmethod
+    def _save_tree(test, owner_id, questions_data, questions, answers):
+        """Создание, изменение и удаление вопросов и ответов по уровням.
+
+        Возвращает True, если изменены или удалены существующие вопросы:
+        только добавление новых вопросов перепроверки не требует.
+        """
+
+        now = timezone.now()
+        new_questions, changed_questions = [], []
+        for question_data in questions_data:
+            fields = {
+                field: question_data[field]
+                for field in QUESTION_FIELDS
+                if field in question_data
+            }
+            if "id" in question_data:
+                question = questions[question_data["id"]]
+                for field, value in fields.items():
+                    setattr(question, field, value)
+                question.updated_at = now
+                changed_questions.append(question)
+            else:
+                question = Question(test=test, owner_id=owner_id, **fields)
+                new_questions.append(question)
+            question_data["instance"] = question
+
+        Question.objects.bulk_create(new_questions)
+        Question.objects.bulk_update(
+            changed_questions, QUESTION_FIELDS + ["updated_at"]
+        )
+
+        new_answers, changed_answers = [], []
+        for question_data in questions_data:
+            question = question_data.pop("instance")
+            for answer_data in question_data["answers"]:
+                fields = {
+                    field: answer_data[field]
+                    for field in ANSWER_FIELDS
+                    if field in answer_data
+                }
+                if "id" in answer_data:
+                    answer = answers[answer_data["id"]]
+                    for field, value in fields.items():
+                        setattr(answer, field, value)
+                    answer.updated_at = now
+                    changed_answers.append(answer)
+                else:
+                    new_answers.append(Answer(question=question, **fields))
+
+        Answer.objects.bulk_create(new_answers)
+        Answer.objects.bulk_update(changed_answers, ANSWER_FIELDS + ["updated_at"])
+
+        kept_questions = {question.id for question in changed_questions}
+        kept_answers = {answer.id for answer in changed_answers}
+        removed_answers = [
+            answer_id
+            for answer_id, answer in answers.items()
+            if answer_id not in kept_answers and answer.question_id in kept_questions
         ]
+        removed_questions = [
+            question_id
+            for question_id in questions
+            if question_id not in kept_questions
+        ]
+        if removed_answers:
+            Answer.objects.filter(id__in=removed_answers).delete()
+        if removed_questions:
+            Question.objects.filter(id__in=removed_questions).delete()
+        return bool(changed_questions or removed_questions)
+
+
+class QuestionBankService:
+    """Потоковый экспорт и импорт банка вопросов теста.
+
+    Экспорт читает вопросы курсором порциями и догружает ответы одним
+    запросом на порцию, импорт проверяет вопросы и сохраняет их порциями
+    через bulk_create, поэтому память не зависит от размера банка.
+    """
+
+    @staticmethod
+    def export(test, chunk_size=None):
+        """Вопросы теста с ответами в виде словарей формата банка."""
+
+        chunk_size = chunk_size or getattr(settings, "QUESTION_BANK_CHUNK_SIZE", 1000)
+        rows = (
+            Question.objects.filter(test=test)
+            .order_by("id")
+            .values_list("id", *QUESTION_FIELDS)
+            .iterator(chunk_size=chunk_size)
+        )
+        while chunk := list(islice(rows, chunk_size)):
+            answers = defaultdict(list)
+            for question_id, text, is_correct in (
+                Answer.objects.filter(question_id__in=[row[0] for row in chunk])
+                .order_by("id")
+                .values_list("question_id", "text", "is_correct")
+            ):
+                answers[question_id].append({"text": text, "is_correct": is_correct})
+            for question_id, *values in chunk:
+                question = dict(zip(QUESTION_FIELDS, values))
+                question["answers"] = answers[question_id]
+                yield question
+
+    @staticmethod
+    def import_questions(test, questions, owner_id, chunk_size=None):
+        """Добавление вопросов из итератора questions к тесту в одной транзакции.
+
+        Возвращает количество вопросов и ответов, время и скорость импорта
+        в строках (вопросах и ответах) в секунду.
+        """
 
-        return text_answer in correct_texts
+        chunk_size = chunk_size or getattr(settings, "QUESTION_BANK_CHUNK_SIZE", 1000)
+        started = time.perf_counter()
+        imported_questions = imported_answers = 0
+
+        with transaction.atomic():
+            while chunk := list(islice(questions, chunk_size)):
+                validated = [
+                    QuestionBankService._validate(question) for question in chunk
+                ]
+                new_questions = Question.objects.bulk_create(
+                    Question(
+                        test=test,
+                        owner_id=owner_id,
+                        **{
+                            field: data[field]
+                            for field in QUESTION_FIELDS
+                            if field in data
+                        },
+                    )
+                    for data in validated
+                )
+                new_answers = Answer.objects.bulk_create(
+                    Answer(question=question, **answer)
+                    for question, data in zip(new_questions, validated)
+                    for answer in data["answers"]
+                )
+                imported_questions += len(new_questions)
+                imported_answers += len(new_answers)
+
+            if imported_questions:
+                invalidate_test(test.id)
+                invalidate_material_pool(test.material_id)
+                invalidate_section_tree()
+
+        seconds = time.perf_counter() - started
+        rows = imported_questions + imported_answers
+        return {
+            "questions": imported_questions,
+            "answers": imported_answers,
+            "seconds": round(seconds, 3),
+            "rows_per_second": round(rows / seconds) if seconds else rows,
+        }
+
+    @staticmethod
+    def _validate(question):
+        """Проверка вопроса банка, ошибка содержит номер строки файла."""
+
+        line = question.pop("line", None)
+        question.pop("id", None)
+        for answer in question.get("answers") or []:
+            if isinstance(answer, dict):
+                answer.pop("id", None)
+        serializer = AuthoringQuestionSerializer(data=question)
+        if not serializer.is_valid():
+            raise ValidationError({"line": line, "errors": serializer.errors})
+        return serializer.validated_data
+
+
+class GradebookService:
+    """Потоковая выгрузка результатов тестов.
+
+    Результаты читаются курсором на стороне сервера как кортежи значений
+    с email студента и названием теста из соединенных таблиц, без создания
+    экземпляров моделей.
+    """
+
+    @staticmethod
+    def rows(results, chunk_size=None):
+        """Кортежи значений результатов results в порядке gradebook.COLUMNS."""
+
+        chunk_size = chunk_size or getattr(settings, "GRADEBOOK_CHUNK_SIZE", 2000)
+        return (
+            results.order_by("id")
+            .values_list(
+                "id",
+                "student__email",
+                "test_id",
+                "test__name",
+                "score",
+                "total_questions",
+                "correct_answers",
+                "percentage",
+                "is_passed",
+                "attempt_number",
+                "completed_at",
+            )
+            .iterator(chunk_size=chunk_size)
+        )
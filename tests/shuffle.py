@@ -0,0 +1,55 @@
+"""Воспроизводимое перемешивание вопросов и вариантов ответа для студента.
+
+Порядок задается сортировкой по хешу от (студент, тест, номер попытки, id),
+поэтому он восстанавливается по этим данным без хранения перестановки и не
+зависит от исходного порядка элементов в выдаче.
+"""
+
+import hashlib
+
+
+def _sort_key(student_id, test_id, attempt, kind, item_id):
+    """Ключ сортировки элемента для заданного зерна."""
+
+    seed = f"{student_id}:{test_id}:{attempt}:{kind}:{item_id}".encode()
+    return hashlib.blake2b(seed, digest_size=8).digest(), item_id
+
+
+def question_order(student_id, test_id, attempt, question_ids):
+    """Порядок вопросов теста для студента и попытки."""
+
+    return sorted(
+        question_ids,
+        key=lambda question_id: _sort_key(
+            student_id, test_id, attempt, "q", question_id
+        ),
+    )
+
+
+def answer_order(student_id, test_id, attempt, answer_ids):
+    """Порядок вариантов ответа для студента и попытки."""
+
+    return sorted(
+        answer_ids,
+        key=lambda answer_id: _sort_key(student_id, test_id, attempt, "a", answer_id),
+    )
+
+
+def shuffle_payload(payload, student_id, test_id, attempt):
+    """Перемешивание вопросов и вариантов ответа в данных TestDetailSerializer."""
+
+    questions = {question["id"]: question for question in payload["questions"]}
+    shuffled = []
+    for question_id in question_order(student_id, test_id, attempt, questions):
+        question = questions[question_id]
+        answers = {answer["id"]: answer for answer in question["answers"]}
+        shuffled.append(
+            dict(
+                question,
+                answers=[
+                    answers[answer_id]
+                    for answer_id in answer_order(student_id, test_id, attempt, answers)
+                ],
+            )
+        )
+    return dict(payload, questions=shuffled)
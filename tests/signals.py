@@ -0,0 +1,218 @@
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from materials.models import Material, Section
+from tests.cache import (
+    content_invalidation_suppressed,
+    invalidate_material_pool,
+    invalidate_section_tree,
+    invalidate_test,
+)
+from tests.models import Answer, Question, Test, TestResult
+from tests.services import RegradeService, StatsService
+
+
+def schedule_regrade(test_id):
+    """Постановка перепроверки теста в очередь после фиксации транзакции.
+
+    Тесты копятся в множестве на соединении, и на транзакцию регистрируется
+    один обработчик on_commit: каскадное или массовое изменение вопросов и
+    ответов ставит каждый тест в очередь один раз. Django заменяет список
+    run_on_commit после фиксации или отката, поэтому множество, заведенное
+    для другого списка, больше не используется.
+    """
+
+    if test_id is None:
+        return
+
+    connection = transaction.get_connection()
+    pending = getattr(connection, "_pending_regrades", None)
+    if pending is not None and pending[0] is connection.run_on_commit:
+        pending[1].add(test_id)
+        return
+
+    pending = (connection.run_on_commit, {test_id})
+    connection._pending_regrades = pending
+
+    def schedule():
+        if connection._pending_regrades is pending:
+            connection._pending_regrades = None
+        for existing_id in Test.objects.filter(pk__in=pending[1]).values_list(
+            "id", flat=True
+        ):
+            RegradeService.schedule(existing_id)
+
+    transaction.on_commit(schedule)
+
+
+def deleted_with(origin, *models):
+    """Начато ли удаление с объекта или набора объектов одной из моделей."""
+
+    if isinstance(origin, QuerySet):
+        return issubclass(origin.model, models)
+    return isinstance(origin, models)
+
+
+def invalidate_question_pool(test_id):
+    """Сброс версии пула вопросов материала, к которому относится тест."""
+
+    if test_id is None:
+        return
+    material_id = (
+        Test.objects.filter(pk=test_id).values_list("material_id", flat=True).first()
+    )
+    invalidate_material_pool(material_id)
+
+
+@receiver(pre_save, sender=Test)
+def remember_passing_score(sender, instance, raw=False, **kwargs):
+    """Запоминание минимального балла и материала до сохранения теста."""
+
+    instance._previous_passing_score = None
+    instance._previous_material_id = None
+    if instance.pk and not raw:
+        previous = (
+            Test.objects.filter(pk=instance.pk)
+            .values_list("passing_score", "material_id")
+            .first()
+        )
+        if previous is not None:
+            (
+                instance._previous_passing_score,
+                instance._previous_material_id,
+            ) = previous
+
+
+@receiver([post_save, post_delete], sender=Test)
+def invalidate_test_on_change(sender, instance, **kwargs):
+    """Сброс версии теста и дерева разделов при изменении или удалении теста."""
+
+    invalidate_test(instance.pk)
+    invalidate_section_tree()
+
+
+@receiver(post_save, sender=Test)
+def invalidate_question_pool_on_material_change(sender, instance, created, **kwargs):
+    """Сброс пулов вопросов материалов при переносе теста в другой материал."""
+
+    previous = getattr(instance, "_previous_material_id", None)
+    if not created and previous != instance.material_id:
+        invalidate_material_pool(previous)
+        invalidate_material_pool(instance.material_id)
+
+
+@receiver(post_delete, sender=Test)
+def invalidate_question_pool_on_test_delete(sender, instance, **kwargs):
+    """Сброс пула вопросов материала при удалении теста."""
+
+    invalidate_material_pool(instance.material_id)
+
+
+@receiver(post_save, sender=Test)
+def update_passing_on_passing_score_change(sender, instance, created, **kwargs):
+    """Пересчет зачета сохраненных результатов при смене минимального балла."""
+
+    previous = getattr(instance, "_previous_passing_score", None)
+    if not created and previous is not None and previous != instance.passing_score:
+        RegradeService.update_passing_score(instance)
+
+
+@receiver(pre_save, sender=Question)
+def remember_question_test(sender, instance, raw=False, **kwargs):
+    """Запоминание теста вопроса до сохранения."""
+
+    instance._previous_test_id = None
+    if instance.pk and not raw:
+        instance._previous_test_id = (
+            Question.objects.filter(pk=instance.pk)
+            .values_list("test_id", flat=True)
+            .first()
+        )
+
+
+@receiver([post_save, post_delete], sender=Question)
+def invalidate_test_on_question_change(sender, instance, created=False, **kwargs):
+    """Сброс версии теста и перепроверка при изменении или удалении вопроса.
+
+    При переносе вопроса в другой тест сбрасываются и прежний, и новый тест.
+    Новый вопрос сохраненные результаты не меняет, перепроверка не нужна.
+    Вопросы удаляемого теста сбрасывает обработчик удаления теста.
+    """
+
+    if content_invalidation_suppressed() or deleted_with(
+        kwargs.get("origin"), Test, Material, Section
+    ):
+        return
+    test_ids = {instance.test_id, getattr(instance, "_previous_test_id", None)}
+    invalidate_section_tree()
+    for test_id in test_ids - {None}:
+        invalidate_test(test_id)
+        invalidate_question_pool(test_id)
+        if not created:
+            schedule_regrade(test_id)
+
+
+@receiver(pre_save, sender=Answer)
+def remember_answer_question(sender, instance, raw=False, **kwargs):
+    """Запоминание вопроса ответа до сохранения."""
+
+    instance._previous_question_id = None
+    if instance.pk and not raw:
+        instance._previous_question_id = (
+            Answer.objects.filter(pk=instance.pk)
+            .values_list("question_id", flat=True)
+            .first()
+        )
+
+
+@receiver([post_save, post_delete], sender=Answer)
+def invalidate_test_on_answer_change(sender, instance, **kwargs):
+    """Сброс версии теста и перепроверка при изменении или удалении ответа.
+
+    При переносе ответа к вопросу другого теста сбрасываются оба теста.
+    Ответы, удаляемые каскадно вместе с вопросом, сбрасывает обработчик
+    удаления вопроса или теста.
+    """
+
+    origin = kwargs.get("origin")
+    if content_invalidation_suppressed() or (
+        origin is not None and not deleted_with(origin, Answer)
+    ):
+        return
+    question_ids = {
+        instance.question_id,
+        getattr(instance, "_previous_question_id", None),
+    } - {None}
+    if not question_ids:
+        return
+    test_ids = set(
+        Question.objects.filter(pk__in=question_ids).values_list("test_id", flat=True)
+    )
+    for test_id in test_ids - {None}:
+        invalidate_test(test_id)
+        schedule_regrade(test_id)
+
+
+@receiver(post_save, sender=Material)
+def invalidate_tests_on_material_change(sender, instance, created, **kwargs):
+    """Сброс версий тестов материала при его изменении (название входит в тест)."""
+
+    if created:
+        return
+    for test_id in Test.objects.filter(material=instance).values_list("id", flat=True):
+        invalidate_test(test_id)
+
+
+@receiver(post_delete, sender=TestResult)
+def remove_result_from_stats(sender, instance, **kwargs):
+    """Исключение удаленного результата из статистики теста.
+
+    Результаты удаляемого теста не вычитаются: его статистика удаляется
+    вместе с ним.
+    """
+
+    if deleted_with(kwargs.get("origin"), Test, Material, Section):
+        return
+    StatsService.remove_result(instance)
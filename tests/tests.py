@@ -1,10 +1,40 @@
+import csv
+import gzip
+import json
+import random
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from io import StringIO
+
+import numpy as np
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
 from rest_framework import status
-from rest_framework.test import APITestCase
+from rest_framework.test import APIRequestFactory, APITestCase
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group
-from tests.models import Test, Question, Answer, TestResult
+from tests.models import (
+    Test,
+    Question,
+    Answer,
+    TestResult,
+    TestAttempt,
+    RegradeJob,
+    TextAnswer,
+    TestStats,
+    TestSnapshot,
+)
 from materials.models import Material
+from permissions import IsAdmin, IsAdminOrTeacherOwner, IsOwner, IsStudent, IsTeacher
 from tests.serializer import (
     TestSerializer,
     QuestionSerializer,
@@ -16,7 +46,24 @@ from tests.serializer import (
     AnswerSubmissionSerializer,
     TestSubmissionSerializer,
 )
-from tests.services import TestCalculateService
+from tests.services import (
+    AnswerKey,
+    AnswerKeyCache,
+    BatchCalculateService,
+    BulkSubmitService,
+    GradingQueueService,
+    ItemAnalysisService,
+    GradebookService,
+    QuestionBankService,
+    QuestionSamplingService,
+    RegradeService,
+    ResponseStorage,
+    StatsService,
+    TestCalculateService,
+)
+from tests.cache import get_test_version
+from tests.encoding import decode_responses, encode_responses, to_submitted_answers
+from tests.shuffle import answer_order, question_order
 
 User = get_user_model()
 
@@ -947,3 +994,3021 @@ class TestResultViewTestCase(APITestCase):
             reverse("tests:test_result_detail", kwargs={"pk": self.test_result.id})
         )
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class TestSubmitQueryCountTestCase(APITestCase):
+    """Тесты количества запросов при отправке ответов на тест."""
+
+    def setUp(self):
+        self.student_user = User.objects.create(
+            email="student@test.com", role="student"
+        )
+        self.teacher_user = User.objects.create(
+            email="teacher@test.com", role="teacher"
+        )
+
+    def _create_test(self, questions_count):
+        test = Test.objects.create(
+            name=f"Query Test {questions_count}",
+            owner=self.teacher_user,
+            passing_score=50,
+        )
+        answers = []
+        for index in range(questions_count):
+            question = Question.objects.create(
+                name=f"Question {index}",
+                text="Question text",
+                test=test,
+                question_type=["single", "multiple", "text"][index % 3],
+                owner=self.teacher_user,
+            )
+            correct = Answer.objects.create(
+                text="Correct", question=question, is_correct=True
+            )
+            Answer.objects.create(text="Wrong", question=question, is_correct=False)
+            answers.append(
+                {
+                    "question_id": question.id,
+                    "selected_answers": [correct.id],
+                    "text_answer": "correct",
+                }
+            )
+        return test, {"answers": answers}
+
+    def _count_submit_queries(self, questions_count):
+        test, data = self._create_test(questions_count)
+        self.client.force_authenticate(user=self.student_user)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(
+                reverse("tests:test_submit", kwargs={"test_id": test.id}),
+                data,
+                format="json",
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["correct_answers"], questions_count)
+        return len(context.captured_queries)
+
+    def test_submit_query_count_does_not_depend_on_questions(self):
+        """Тестирует, что число запросов при отправке не зависит от числа вопросов."""
+
+        self.assertEqual(self._count_submit_queries(1), self._count_submit_queries(30))
+
+    def test_answer_key_loaded_with_single_query(self):
+        """Тестирует загрузку ключа ответов одним запросом."""
+
+        test, _ = self._create_test(10)
+        with self.assertNumQueries(1):
+            answer_key = AnswerKey.for_test(test)
+
+        self.assertEqual(len(answer_key.questions), 10)
+        for question_key in answer_key.questions.values():
+            self.assertEqual(len(question_key.answer_ids), 2)
+            self.assertEqual(len(question_key.correct_ids), 1)
+            self.assertEqual(question_key.correct_texts, frozenset({"correct"}))
+
+
+class TestSubmissionNormalizationTestCase(APITestCase):
+    """Тесты индексации ответов студента по question_id."""
+
+    def setUp(self):
+        self.student_user = User.objects.create(
+            email="student@test.com", role="student"
+        )
+        self.test = Test.objects.create(name="Normalization Test", passing_score=50)
+        self.question = Question.objects.create(
+            name="Question", text="Question text", test=self.test
+        )
+        self.correct_answer = Answer.objects.create(
+            text="Correct", question=self.question, is_correct=True
+        )
+
+    def test_duplicate_question_rejected(self):
+        """Тестирует отклонение повторного ответа на один вопрос HTTP_400_BAD_REQUEST."""
+
+        answer = {
+            "question_id": self.question.id,
+            "selected_answers": [self.correct_answer.id],
+        }
+        self.client.force_authenticate(user=self.student_user)
+        response = self.client.post(
+            reverse("tests:test_submit", kwargs={"test_id": self.test.id}),
+            {"answers": [answer, answer]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("answers", response.data)
+        self.assertFalse(TestResult.objects.exists())
+
+    def test_unknown_question_rejected(self):
+        """Тестирует отклонение ответа на вопрос другого теста."""
+
+        with self.assertRaises(ValidationError):
+            TestCalculateService.calculate_results(
+                self, self.test, [{"question_id": self.question.id + 1000}]
+            )
+
+    def test_grading_time_grows_linearly(self):
+        """Микро-бенчмарк: время проверки растет линейно с числом вопросов."""
+
+        def measure(questions_count):
+            rows = [
+                (question_id, "single", question_id * 10, True, "correct")
+                for question_id in range(questions_count)
+            ]
+            answer_key = AnswerKey.from_rows(50, rows)
+            submission = [
+                {"question_id": question_id, "selected_answers": [question_id * 10]}
+                for question_id in reversed(range(questions_count))
+            ]
+            timings = []
+            for _ in range(5):
+                started = time.perf_counter()
+                TestCalculateService.calculate_results(
+                    self, None, submission, answer_key=answer_key
+                )
+                timings.append(time.perf_counter() - started)
+            return min(timings)
+
+        small, large = measure(250), measure(4000)
+        # Рост в 16 раз: линейная проверка дает ~16x, квадратичная — ~256x.
+        self.assertLess(large / small, 48)
+
+
+class AnswerKeyCacheTestCase(APITestCase):
+    """Тесты кеша ключей ответов AnswerKeyCache."""
+
+    def setUp(self):
+        self.test = Test.objects.create(name="Cache Test", passing_score=50)
+        self.question = Question.objects.create(
+            name="Question", text="Question text", test=self.test
+        )
+        self.answer = Answer.objects.create(
+            text="Correct", question=self.question, is_correct=True
+        )
+        self.cache = AnswerKeyCache(maxsize=2)
+
+    def test_second_lookup_is_hit_without_queries(self):
+        """Тестирует, что повторное получение ключа не обращается к БД."""
+
+        self.cache.get(self.test)
+        with self.assertNumQueries(0):
+            answer_key = self.cache.get(self.test)
+
+        self.assertIn(self.question.id, answer_key.questions)
+        self.assertEqual(self.cache.stats()["hits"], 1)
+        self.assertEqual(self.cache.stats()["misses"], 1)
+
+    def test_answer_change_invalidates_key(self):
+        """Тестирует сброс ключа при изменении правильности ответа."""
+
+        answer_key = self.cache.get(self.test)
+        self.assertEqual(
+            answer_key.questions[self.question.id].correct_ids, {self.answer.id}
+        )
+
+        self.answer.is_correct = False
+        self.answer.save()
+
+        answer_key = self.cache.get(self.test)
+        self.assertEqual(answer_key.questions[self.question.id].correct_ids, set())
+
+    def test_passing_score_change_invalidates_key(self):
+        """Тестирует сброс ключа при изменении минимального балла."""
+
+        self.cache.get(self.test)
+        self.test.passing_score = 90
+        self.test.save()
+
+        self.assertEqual(self.cache.get(self.test).passing_score, 90)
+
+    def test_question_delete_invalidates_key(self):
+        """Тестирует сброс ключа при удалении вопроса."""
+
+        self.cache.get(self.test)
+        self.question.delete()
+
+        self.assertEqual(self.cache.get(self.test).questions, {})
+
+    def test_move_question_and_answer_invalidates_both_tests(self):
+        """Тестирует сброс ключей прежнего и нового теста при переносе вопроса и ответа."""
+
+        other_test = Test.objects.create(name="Other Test", passing_score=50)
+        other_question = Question.objects.create(
+            name="Other", text="Other text", test=other_test
+        )
+        self.cache.get(self.test)
+        self.cache.get(other_test)
+
+        self.answer.question = other_question
+        self.answer.save()
+
+        self.assertEqual(
+            self.cache.get(self.test).questions[self.question.id].correct_ids, set()
+        )
+        self.assertEqual(
+            self.cache.get(other_test).questions[other_question.id].correct_ids,
+            {self.answer.id},
+        )
+
+        self.question.test = other_test
+        self.question.save()
+
+        self.assertEqual(self.cache.get(self.test).questions, {})
+        self.assertIn(self.question.id, self.cache.get(other_test).questions)
+
+    def test_expired_key_reloaded_without_version_change(self):
+        """Тестирует перезагрузку ключа по истечении ttl без сброса версии теста."""
+
+        answer_key_cache = AnswerKeyCache(maxsize=2, ttl=0)
+        answer_key_cache.get(self.test)
+        # UPDATE без сигналов: версия не меняется, как в процессе, не видящем
+        # сброс версии из другого процесса.
+        Answer.objects.filter(pk=self.answer.pk).update(is_correct=False)
+
+        answer_key = answer_key_cache.get(self.test)
+        self.assertEqual(answer_key.questions[self.question.id].correct_ids, set())
+        self.assertEqual(answer_key_cache.stats()["misses"], 2)
+
+    def test_lru_eviction(self):
+        """Тестирует вытеснение давно не использованных ключей."""
+
+        tests = [
+            Test.objects.create(name=f"Test {index}", passing_score=50)
+            for index in range(3)
+        ]
+        for test in tests:
+            self.cache.get(test)
+
+        self.assertEqual(self.cache.stats()["size"], 2)
+
+
+class BatchCalculateServiceTestCase(APITestCase):
+    """Тесты пакетного подсчета результатов BatchCalculateService."""
+
+    def setUp(self):
+        self.random = random.Random(42)
+        rows = []
+        answer_id = 1
+        for question_id in range(1, 41):
+            question_type = ["single", "multiple", "text"][question_id % 3]
+            options_count = self.random.randint(0, 5)
+            if options_count == 0:
+                rows.append((question_id, question_type, None, None, None))
+            for option in range(options_count):
+                rows.append(
+                    (
+                        question_id,
+                        question_type,
+                        answer_id,
+                        self.random.random() < 0.4,
+                        f" Answer {option} ",
+                    )
+                )
+                answer_id += 1
+        self.answer_key = AnswerKey.from_rows(20, rows)
+
+    def _random_submission(self):
+        submission = []
+        for question_id, question_key in self.answer_key.questions.items():
+            if self.random.random() < 0.15:
+                continue
+            options = sorted(question_key.answer_ids)
+            choice = self.random.random()
+            if choice < 0.3 and question_key.correct_ids:
+                selected = sorted(question_key.correct_ids)
+            elif choice < 0.5 and options:
+                selected = [self.random.choice(options)] * self.random.randint(1, 2)
+            elif choice < 0.6:
+                selected = [10_000 + question_id]
+            else:
+                selected = self.random.sample(
+                    options, self.random.randint(0, len(options))
+                )
+            answer = {"question_id": question_id, "selected_answers": selected}
+            if question_key.question_type == "text":
+                answer["text_answer"] = self.random.choice(
+                    ["answer 0", "ANSWER 1 ", "", "wrong"]
+                )
+            submission.append(answer)
+        return submission
+
+    def test_batch_matches_scalar_grader(self):
+        """Тестирует совпадение пакетного и поштучного подсчета результатов."""
+
+        submissions = [self._random_submission() for _ in range(300)]
+
+        batch_results = BatchCalculateService.calculate_results(
+            None, submissions, answer_key=self.answer_key
+        )
+        scalar_results = [
+            TestCalculateService.calculate_results(
+                self, None, submission, answer_key=self.answer_key
+            )
+            for submission in submissions
+        ]
+
+        self.assertEqual(batch_results, scalar_results)
+        self.assertTrue(any(result["is_passed"] for result in batch_results))
+        self.assertTrue(any(not result["is_passed"] for result in batch_results))
+
+    def test_batch_matches_scalar_grader_for_database_test(self):
+        """Тестирует совпадение результатов на тесте из БД."""
+
+        test = Test.objects.create(name="Batch Test", passing_score=50)
+        question = Question.objects.create(
+            name="Question", text="Question text", test=test, question_type="single"
+        )
+        correct = Answer.objects.create(text="A", question=question, is_correct=True)
+        wrong = Answer.objects.create(text="B", question=question, is_correct=False)
+        submissions = [
+            [{"question_id": question.id, "selected_answers": [correct.id]}],
+            [{"question_id": question.id, "selected_answers": [wrong.id]}],
+            [],
+        ]
+
+        self.assertEqual(
+            BatchCalculateService.calculate_results(test, submissions),
+            [
+                TestCalculateService.calculate_results(self, test, submission)
+                for submission in submissions
+            ],
+        )
+
+    def test_empty_test(self):
+        """Тестирует подсчет для теста без вопросов."""
+
+        answer_key = AnswerKey.from_rows(0, [])
+        results = BatchCalculateService.calculate_results(
+            None, [[], []], answer_key=answer_key
+        )
+
+        self.assertEqual(
+            results,
+            [
+                TestCalculateService.calculate_results(
+                    self, None, [], answer_key=answer_key
+                )
+            ]
+            * 2,
+        )
+
+
+class TestBulkSubmitViewTestCase(APITestCase):
+    """Тесты пакетной отправки ответов на тест."""
+
+    def setUp(self):
+        self.teacher_group, _ = Group.objects.get_or_create(name="Преподаватели")
+        self.student_group, _ = Group.objects.get_or_create(name="Студенты")
+
+        self.teacher_user = User.objects.create(
+            email="teacher@test.com", role="teacher"
+        )
+        self.teacher_user.groups.add(self.teacher_group)
+
+        self.other_teacher = User.objects.create(email="other@test.com", role="teacher")
+        self.other_teacher.groups.add(self.teacher_group)
+
+        self.student_user = User.objects.create(
+            email="student@test.com", role="student"
+        )
+        self.student_user.groups.add(self.student_group)
+
+        self.test = Test.objects.create(
+            name="Bulk Test", owner=self.teacher_user, passing_score=50
+        )
+        self.question = Question.objects.create(
+            name="Question", text="Question text", test=self.test
+        )
+        self.correct_answer = Answer.objects.create(
+            text="Correct", question=self.question, is_correct=True
+        )
+        self.wrong_answer = Answer.objects.create(
+            text="Wrong", question=self.question, is_correct=False
+        )
+        self.url = reverse("tests:test_submit_bulk", kwargs={"test_id": self.test.id})
+
+    def _line(self, student_id, answer_id):
+        return json.dumps(
+            {
+                "student": student_id,
+                "answers": [
+                    {"question_id": self.question.id, "selected_answers": [answer_id]}
+                ],
+            }
+        )
+
+    def _post(self, lines):
+        return self.client.post(
+            self.url, "\n".join(lines), content_type="application/x-ndjson"
+        )
+
+    def test_bulk_submit_creates_results(self):
+        """Тестирует создание результатов для всех строк HTTP_201_CREATED."""
+
+        self.client.force_authenticate(user=self.teacher_user)
+        response = self._post(
+            [
+                self._line(self.student_user.id, self.correct_answer.id),
+                self._line(self.teacher_user.id, self.wrong_answer.id),
+            ]
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data, {"created": 2, "errors": []})
+        self.assertTrue(
+            TestResult.objects.get(student=self.student_user, test=self.test).is_passed
+        )
+        self.assertFalse(
+            TestResult.objects.get(student=self.teacher_user, test=self.test).is_passed
+        )
+
+    def test_bulk_submit_reports_row_errors(self):
+        """Тестирует, что ошибки строк не прерывают обработку остальных."""
+
+        self.client.force_authenticate(user=self.teacher_user)
+        response = self._post(
+            [
+                "not json",
+                self._line(self.student_user.id, self.correct_answer.id),
+                json.dumps({"student": self.student_user.id}),
+                self._line(999999, self.correct_answer.id),
+                "",
+                json.dumps(
+                    {
+                        "student": self.student_user.id,
+                        "answers": [{"question_id": self.question.id + 1000}],
+                    }
+                ),
+            ]
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["created"], 1)
+        self.assertEqual(
+            [error["line"] for error in response.data["errors"]], [1, 3, 4, 6]
+        )
+        self.assertEqual(TestResult.objects.count(), 1)
+
+    def test_bulk_submit_in_chunks(self):
+        """Тестирует сохранение строк несколькими пачками."""
+
+        lines = [
+            self._line(self.student_user.id, self.correct_answer.id) for _ in range(7)
+        ]
+        created, errors = BulkSubmitService.submit(self.test, lines, chunk_size=3)
+
+        self.assertEqual(created, 7)
+        self.assertEqual(errors, [])
+        self.assertEqual(TestResult.objects.filter(test=self.test).count(), 7)
+
+    def test_bulk_submit_as_other_teacher(self):
+        """Тестирует запрет пакетной отправки на чужой тест HTTP_403_FORBIDDEN."""
+
+        self.client.force_authenticate(user=self.other_teacher)
+        response = self._post(
+            [self._line(self.student_user.id, self.correct_answer.id)]
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_bulk_submit_refused_for_sampled_test(self):
+        """Тестирует отказ в пакетной отправке на тест с выборкой HTTP_400_BAD_REQUEST."""
+
+        self.test.sample_size = 1
+        self.test.save()
+
+        self.client.force_authenticate(user=self.teacher_user)
+        response = self._post(
+            [self._line(self.student_user.id, self.correct_answer.id)]
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(TestResult.objects.exists())
+
+    def test_bulk_submit_as_student(self):
+        """Тестирует запрет пакетной отправки студентом HTTP_403_FORBIDDEN."""
+
+        self.client.force_authenticate(user=self.student_user)
+        response = self._post(
+            [self._line(self.student_user.id, self.correct_answer.id)]
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+@override_settings(ASYNC_GRADING=True)
+class AsyncGradingTestCase(APITestCase):
+    """Тесты асинхронной проверки попыток через очередь TestAttempt."""
+
+    def setUp(self):
+        self.student_user = User.objects.create(
+            email="student@test.com", role="student"
+        )
+        self.other_student = User.objects.create(email="other@test.com", role="student")
+        self.test = Test.objects.create(name="Async Test", passing_score=50)
+        self.question = Question.objects.create(
+            name="Question", text="Question text", test=self.test
+        )
+        self.correct_answer = Answer.objects.create(
+            text="Correct", question=self.question, is_correct=True
+        )
+        self.submission_data = {
+            "answers": [
+                {
+                    "question_id": self.question.id,
+                    "selected_answers": [self.correct_answer.id],
+                }
+            ]
+        }
+
+    def _submit(self):
+        self.client.force_authenticate(user=self.student_user)
+        return self.client.post(
+            reverse("tests:test_submit", kwargs={"test_id": self.test.id}),
+            self.submission_data,
+            format="json",
+        )
+
+    def test_submit_returns_pending_attempt(self):
+        """Тестирует, что отправка в асинхронном режиме возвращает HTTP_202_ACCEPTED."""
+
+        response = self._submit()
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["status"], "pending")
+        self.assertFalse(TestResult.objects.exists())
+        self.assertTrue(
+            TestAttempt.objects.filter(
+                id=response.data["attempt_id"], status="pending"
+            ).exists()
+        )
+
+    def test_worker_grades_attempt_and_status_returns_result(self):
+        """Тестирует проверку попытки обработчиком и получение результата."""
+
+        attempt_id = self._submit().data["attempt_id"]
+
+        self.assertEqual(GradingQueueService.process_batch(), 1)
+        self.assertEqual(GradingQueueService.process_batch(), 0)
+
+        response = self.client.get(
+            reverse("tests:test_attempt_detail", kwargs={"pk": attempt_id})
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["status"], "done")
+        self.assertEqual(response.data["result"]["percentage"], 100.0)
+        self.assertTrue(response.data["result"]["is_passed"])
+
+    def test_worker_grades_with_current_answer_key(self):
+        """Тестирует проверку обработчиком по ключу из БД, а не из кеша процесса."""
+
+        attempt_id = self._submit().data["attempt_id"]
+        # UPDATE без сигналов: версия теста не меняется, как у обработчика,
+        # не видящего сброс версии в кеше веб-процесса.
+        Answer.objects.filter(pk=self.correct_answer.pk).update(is_correct=False)
+
+        GradingQueueService.process_batch()
+
+        attempt = TestAttempt.objects.select_related("result").get(id=attempt_id)
+        self.assertEqual(attempt.result.percentage, 0.0)
+
+    def test_attempt_of_deleted_question_fails(self):
+        """Тестирует пометку попытки ошибочной, если вопрос удален до проверки."""
+
+        attempt_id = self._submit().data["attempt_id"]
+        self.question.delete()
+
+        GradingQueueService.process_batch()
+
+        attempt = TestAttempt.objects.get(id=attempt_id)
+        self.assertEqual(attempt.status, "failed")
+        self.assertIsNone(attempt.result)
+
+    def test_status_of_other_student_attempt(self):
+        """Тестирует недоступность чужой попытки HTTP_404_NOT_FOUND."""
+
+        attempt_id = self._submit().data["attempt_id"]
+
+        self.client.force_authenticate(user=self.other_student)
+        response = self.client.get(
+            reverse("tests:test_attempt_detail", kwargs={"pk": attempt_id})
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_grade_attempts_command(self):
+        """Тестирует команду grade_attempts в режиме --once."""
+
+        self._submit()
+        self._submit()
+        output = StringIO()
+
+        call_command("grade_attempts", "--once", stdout=output)
+
+        self.assertIn("2", output.getvalue())
+        self.assertEqual(TestResult.objects.count(), 2)
+
+    def test_benchmark_submit_command(self):
+        """Тестирует вывод перцентилей задержки командой benchmark_submit."""
+
+        output = StringIO()
+
+        call_command(
+            "benchmark_submit", "--submissions=5", "--questions=3", stdout=output
+        )
+
+        self.assertIn("sync:", output.getvalue())
+        self.assertIn("async:", output.getvalue())
+        self.assertIn("p99=", output.getvalue())
+        self.assertFalse(Test.objects.filter(name="Benchmark").exists())
+
+
+class RegradeServiceTestCase(APITestCase):
+    """Тесты перепроверки результатов RegradeService."""
+
+    def setUp(self):
+        self.students = [
+            User.objects.create(email=f"student{index}@test.com", role="student")
+            for index in range(3)
+        ]
+        self.test = Test.objects.create(name="Regrade Test", passing_score=50)
+        # Перепроверка регистрируется одна на транзакцию: обработчики создания
+        # выполняются здесь, чтобы тесты регистрировали свою.
+        with self.captureOnCommitCallbacks(execute=True):
+            self.question = Question.objects.create(
+                name="Question", text="Question text", test=self.test
+            )
+            self.answer_a = Answer.objects.create(
+                text="A", question=self.question, is_correct=True
+            )
+            self.answer_b = Answer.objects.create(
+                text="B", question=self.question, is_correct=False
+            )
+            self.other_question = Question.objects.create(
+                name="Other", text="Other text", test=self.test
+            )
+            self.other_answer = Answer.objects.create(
+                text="C", question=self.other_question, is_correct=True
+            )
+
+        selections = [self.answer_a.id, self.answer_b.id, self.answer_b.id]
+        for student, answer_id in zip(self.students, selections):
+            self.client.force_authenticate(user=student)
+            self.client.post(
+                reverse("tests:test_submit", kwargs={"test_id": self.test.id}),
+                {
+                    "answers": [
+                        {
+                            "question_id": self.question.id,
+                            "selected_answers": [answer_id],
+                        },
+                        {
+                            "question_id": self.other_question.id,
+                            "selected_answers": [self.other_answer.id],
+                        },
+                    ]
+                },
+                format="json",
+            )
+
+        self.legacy_result = TestResult.objects.create(
+            student=self.students[0],
+            test=self.test,
+            score=0,
+            total_questions=2,
+            correct_answers=0,
+            percentage=0.0,
+            is_passed=False,
+        )
+
+    def _fix_answer_key(self):
+        self.answer_a.is_correct = False
+        self.answer_a.save()
+        self.answer_b.is_correct = True
+        self.answer_b.save()
+
+    def test_answer_change_schedules_regrade(self):
+        """Тестирует постановку перепроверки в очередь при изменении ответа."""
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self._fix_answer_key()
+
+        self.assertEqual(
+            RegradeJob.objects.filter(test=self.test, status="pending").count(), 1
+        )
+        self.assertEqual(RegradeService.process_pending(), 1)
+
+        job = RegradeJob.objects.get(test=self.test)
+        self.assertEqual(job.status, "done")
+        self.assertEqual(job.updated_results, 3)
+        percentages = sorted(
+            TestResult.objects.filter(responses__isnull=False).values_list(
+                "percentage", flat=True
+            )
+        )
+        self.assertEqual(percentages, [50.0, 100.0, 100.0])
+
+    def test_regrade_scheduled_once_per_transaction(self):
+        """Тестирует одну постановку перепроверки на тест за транзакцию."""
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self._fix_answer_key()
+            self.other_answer.is_correct = False
+            self.other_answer.save()
+            self.other_question.delete()
+
+        scheduled = [
+            callback
+            for callback in callbacks
+            if callback.__qualname__.startswith("schedule_regrade")
+        ]
+        self.assertEqual(len(scheduled), 1)
+
+    def test_regrade_updates_only_changed_results(self):
+        """Тестирует, что перепроверка записывает только изменившиеся результаты."""
+
+        self.other_answer.is_correct = False
+        self.other_answer.save()
+        Answer.objects.create(text="D", question=self.other_question, is_correct=True)
+
+        self.assertEqual(RegradeService.regrade_test(self.test), 3)
+        self.assertEqual(RegradeService.regrade_test(self.test), 0)
+        self.legacy_result.refresh_from_db()
+        self.assertEqual(self.legacy_result.total_questions, 2)
+
+    def test_new_question_does_not_change_results(self):
+        """Тестирует, что добавленный вопрос не снижает сохраненные результаты."""
+
+        with self.captureOnCommitCallbacks(execute=True):
+            question = Question.objects.create(
+                name="New", text="New text", test=self.test
+            )
+        self.assertFalse(RegradeJob.objects.exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Answer.objects.create(text="E", question=question, is_correct=True)
+        RegradeService.process_pending()
+
+        results = TestResult.objects.filter(responses__isnull=False).order_by("id")
+        self.assertEqual(
+            [(result.percentage, result.is_passed) for result in results],
+            [(100.0, True), (50.0, True), (50.0, True)],
+        )
+        self.assertNotIn(
+            question.id, decode_responses(results[0].responses).question_ids
+        )
+
+    def test_regrade_in_process_pool(self):
+        """Тестирует перепроверку пачками в пуле процессов."""
+
+        self._fix_answer_key()
+
+        updated = RegradeService.regrade_test(self.test, workers=2, chunk_size=1)
+
+        self.assertEqual(updated, 3)
+        self.assertEqual(
+            TestResult.objects.filter(test=self.test, is_passed=True).count(), 3
+        )
+
+    def test_passing_score_change_updates_with_single_query(self):
+        """Тестирует пересчет зачета одним UPDATE при смене минимального балла."""
+
+        self.test.passing_score = 100
+        with self.assertNumQueries(4):
+            self.test.save()
+
+        self.assertEqual(
+            TestResult.objects.filter(test=self.test, is_passed=True).count(), 1
+        )
+        self.assertFalse(RegradeJob.objects.exists())
+
+    def test_regrade_results_command(self):
+        """Тестирует команду regrade_results для указанного теста."""
+
+        self._fix_answer_key()
+        output = StringIO()
+
+        call_command("regrade_results", f"--test={self.test.id}", stdout=output)
+
+        self.assertIn("3", output.getvalue())
+
+
+class ResponseEncodingTestCase(APITestCase):
+    """Тесты компактной записи ответов студента."""
+
+    def test_encode_decode_roundtrip(self):
+        """Тестирует восстановление ответов после кодирования."""
+
+        answers_by_question = {
+            10: {"question_id": 10, "selected_answers": [105, 101, 101]},
+            300: {"question_id": 300, "text_answer": "Ответ"},
+        }
+        data = encode_responses(
+            [300, 10, 20], answers_by_question, {10: True, 300: True}, {300: 7}
+        )
+
+        decoded = decode_responses(data)
+
+        self.assertEqual(decoded.question_ids, [10, 20, 300])
+        self.assertEqual(decoded.selected, [[101, 101, 105], [], []])
+        self.assertEqual(decoded.text_refs, [0, 0, 7])
+        self.assertEqual(decoded.correct, [True, False, True])
+        self.assertEqual(
+            to_submitted_answers(decoded, {7: "Ответ"}),
+            [
+                {"question_id": 10, "selected_answers": [101, 101, 105]},
+                {"question_id": 300, "selected_answers": [], "text_answer": "Ответ"},
+            ],
+        )
+
+    def test_encoding_is_compact(self):
+        """Тестирует, что запись 100 вопросов занимает несколько сотен байт."""
+
+        question_ids = list(range(5000, 5100))
+        answers_by_question = {
+            question_id: {
+                "question_id": question_id,
+                "selected_answers": [question_id * 4],
+            }
+            for question_id in question_ids
+        }
+        data = encode_responses(
+            question_ids,
+            answers_by_question,
+            {question_id: True for question_id in question_ids},
+        )
+
+        self.assertLess(len(data), 500)
+        self.assertLess(
+            len(data), len(json.dumps(list(answers_by_question.values()))) / 5
+        )
+
+    def test_submit_stores_responses_with_interned_text(self):
+        """Тестирует сохранение ответов при отправке и интернирование текстов."""
+
+        students = [
+            User.objects.create(email=f"student{index}@test.com", role="student")
+            for index in range(2)
+        ]
+        test = Test.objects.create(name="Responses Test", passing_score=50)
+        question = Question.objects.create(
+            name="Question", text="Question text", test=test, question_type="text"
+        )
+        Answer.objects.create(text="Django", question=question, is_correct=True)
+
+        for student in students:
+            self.client.force_authenticate(user=student)
+            self.client.post(
+                reverse("tests:test_submit", kwargs={"test_id": test.id}),
+                {"answers": [{"question_id": question.id, "text_answer": " django"}]},
+                format="json",
+            )
+
+        self.assertEqual(TextAnswer.objects.count(), 1)
+        decoded = ResponseStorage.decode_many(
+            TestResult.objects.values_list("responses", flat=True)
+        )
+        for item, answers in decoded:
+            self.assertEqual(item.correct, [True])
+            self.assertEqual(
+                answers,
+                [
+                    {
+                        "question_id": question.id,
+                        "selected_answers": [],
+                        "text_answer": "django",
+                    }
+                ],
+            )
+
+
+class TestStatsTestCase(APITestCase):
+    """Тесты инкрементальной статистики результатов теста."""
+
+    def setUp(self):
+        self.teacher_group, _ = Group.objects.get_or_create(name="Преподаватели")
+
+        self.teacher_user = User.objects.create(
+            email="teacher@test.com", role="teacher"
+        )
+        self.teacher_user.groups.add(self.teacher_group)
+
+        self.other_teacher = User.objects.create(email="other@test.com", role="teacher")
+        self.other_teacher.groups.add(self.teacher_group)
+
+        self.students = [
+            User.objects.create(email=f"student{index}@test.com", role="student")
+            for index in range(4)
+        ]
+
+        self.test = Test.objects.create(
+            name="Stats Test", owner=self.teacher_user, passing_score=50
+        )
+        self.questions = []
+        self.correct_answers = []
+        self.wrong_answers = []
+        for index in range(2):
+            question = Question.objects.create(
+                name=f"Question {index}", text="Question text", test=self.test
+            )
+            self.questions.append(question)
+            self.correct_answers.append(
+                Answer.objects.create(
+                    text="Correct", question=question, is_correct=True
+                )
+            )
+            self.wrong_answers.append(
+                Answer.objects.create(text="Wrong", question=question, is_correct=False)
+            )
+        self.url = reverse("tests:test_stats", kwargs={"test_id": self.test.id})
+
+    def _submit(self, student, correct_count):
+        self.client.force_authenticate(user=student)
+        answers = [
+            {
+                "question_id": question.id,
+                "selected_answers": [(correct if index < correct_count else wrong).id],
+            }
+            for index, (question, correct, wrong) in enumerate(
+                zip(self.questions, self.correct_answers, self.wrong_answers)
+            )
+        ]
+        return self.client.post(
+            reverse("tests:test_submit", kwargs={"test_id": self.test.id}),
+            {"answers": answers},
+            format="json",
+        )
+
+    def _get_stats(self):
+        self.client.force_authenticate(user=self.teacher_user)
+        return self.client.get(self.url)
+
+    def _assert_consistent(self):
+        output = StringIO()
+        call_command("rebuild_test_stats", f"--test={self.test.id}", stdout=output)
+        self.assertIn("Расхождений: 0", output.getvalue())
+
+    def test_submit_updates_stats(self):
+        """Тестирует учет отправленных ответов в статистике теста."""
+
+        for student, correct_count in zip(self.students, [2, 1, 0, 2]):
+            self._submit(student, correct_count)
+
+        response = self._get_stats()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 4)
+        self.assertEqual(response.data["passed_count"], 3)
+        self.assertEqual(response.data["pass_rate"], 75.0)
+        self.assertEqual(response.data["average_percentage"], 62.5)
+        self.assertEqual(response.data["percentage_stddev"], 41.46)
+        self.assertEqual(response.data["histogram"], [1, 0, 0, 0, 0, 1, 0, 0, 0, 2])
+        self._assert_consistent()
+
+    def test_stats_read_does_not_scan_results(self):
+        """Тестирует чтение статистики фиксированным числом запросов."""
+
+        self._submit(self.students[0], 2)
+        self.client.force_authenticate(user=self.teacher_user)
+        with self.assertNumQueries(3):
+            self.client.get(self.url)
+
+        for student in self.students[1:]:
+            self._submit(student, 1)
+        self.client.force_authenticate(user=self.teacher_user)
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data["count"], 4)
+
+    def test_empty_stats(self):
+        """Тестирует статистику теста без результатов."""
+
+        response = self._get_stats()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 0)
+        self.assertIsNone(response.data["average_percentage"])
+        self.assertEqual(response.data["histogram"], [0] * 10)
+
+    def test_stats_forbidden_for_other_teacher(self):
+        """Тестирует запрет просмотра статистики чужого теста HTTP_403_FORBIDDEN."""
+
+        self.client.force_authenticate(user=self.other_teacher)
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_bulk_submit_and_queue_update_stats(self):
+        """Тестирует учет пакетной отправки и асинхронной проверки в статистике."""
+
+        lines = [
+            json.dumps(
+                {
+                    "student": student.id,
+                    "answers": [
+                        {
+                            "question_id": self.questions[0].id,
+                            "selected_answers": [self.correct_answers[0].id],
+                        }
+                    ],
+                }
+            )
+            for student in self.students[:2]
+        ]
+        BulkSubmitService.submit(self.test, lines)
+        GradingQueueService.enqueue(self.students[2], self.test, [])
+        GradingQueueService.process_batch()
+
+        stats = TestStats.objects.get(test=self.test)
+        self.assertEqual(stats.count, 3)
+        self.assertEqual(stats.passed_count, 2)
+        self._assert_consistent()
+
+    def test_regrade_and_passing_score_change_update_stats(self):
+        """Тестирует обновление статистики при перепроверке и смене минимального балла."""
+
+        for student, correct_count in zip(self.students, [2, 1, 0, 2]):
+            self._submit(student, correct_count)
+
+        self.correct_answers[1].is_correct = False
+        self.correct_answers[1].save()
+        RegradeService.regrade_test(self.test)
+        stats = TestStats.objects.get(test=self.test)
+        self.assertEqual(stats.histogram, [1, 0, 0, 0, 0, 3, 0, 0, 0, 0])
+        self._assert_consistent()
+
+        self.test.passing_score = 60
+        self.test.save()
+        stats.refresh_from_db()
+        self.assertEqual(stats.passed_count, 0)
+        self._assert_consistent()
+
+    def test_destroy_result_updates_stats(self):
+        """Тестирует исключение удаленного результата из статистики."""
+
+        self._submit(self.students[0], 2)
+        self._submit(self.students[1], 0)
+        result = TestResult.objects.get(student=self.students[0])
+
+        self.client.force_authenticate(user=self.students[0])
+        response = self.client.delete(
+            reverse("tests:test_result_destroy", kwargs={"pk": result.id})
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        stats = TestStats.objects.get(test=self.test)
+        self.assertEqual(stats.count, 1)
+        self.assertEqual(stats.passed_count, 0)
+        self._assert_consistent()
+
+    def test_cascade_delete_updates_stats(self):
+        """Тестирует учет результатов, удаленных каскадом и удалением набора."""
+
+        for student, correct_count in zip(self.students, [2, 1, 0, 2]):
+            self._submit(student, correct_count)
+
+        self.students[0].delete()
+        TestResult.objects.filter(student=self.students[1]).delete()
+
+        stats = TestStats.objects.get(test=self.test)
+        self.assertEqual(stats.count, 2)
+        self.assertEqual(stats.passed_count, 1)
+        self._assert_consistent()
+
+        self.test.delete()
+        self.assertFalse(TestStats.objects.exists())
+
+    def test_rebuild_command_fixes_drift(self):
+        """Тестирует обнаружение и исправление расхождений командой rebuild_test_stats."""
+
+        self._submit(self.students[0], 2)
+        TestStats.objects.filter(test=self.test).update(count=10)
+        output = StringIO()
+
+        call_command("rebuild_test_stats", stdout=output)
+
+        self.assertIn("Расхождений: 1", output.getvalue())
+        self.assertEqual(TestStats.objects.get(test=self.test).count, 1)
+        self.assertFalse(StatsService.rebuild(self.test.id))
+
+    def test_apply_single_update_without_row_read(self):
+        """Тестирует учет результатов одним UPDATE без чтения строки статистики."""
+
+        StatsService.apply(self.test.id, added=[(100.0, True)])
+
+        with CaptureQueriesContext(connection) as context:
+            StatsService.apply(
+                self.test.id,
+                added=[(55.0, True), (0.0, False)],
+                removed=[(100.0, True)],
+            )
+
+        self.assertEqual(len(context.captured_queries), 1)
+        self.assertTrue(context.captured_queries[0]["sql"].startswith("UPDATE"))
+        stats = TestStats.objects.get(test=self.test)
+        self.assertEqual(stats.count, 2)
+        self.assertEqual(stats.passed_count, 1)
+        self.assertEqual(stats.percentage_sum, 55.0)
+        self.assertEqual(stats.histogram, [1, 0, 0, 0, 0, 1, 0, 0, 0, 0])
+
+
+class ItemAnalysisTestCase(APITestCase):
+    """Тесты анализа заданий теста."""
+
+    def setUp(self):
+        self.teacher_group, _ = Group.objects.get_or_create(name="Преподаватели")
+
+        self.teacher_user = User.objects.create(
+            email="teacher@test.com", role="teacher"
+        )
+        self.teacher_user.groups.add(self.teacher_group)
+
+        self.other_teacher = User.objects.create(email="other@test.com", role="teacher")
+        self.other_teacher.groups.add(self.teacher_group)
+
+        self.test = Test.objects.create(
+            name="Items Test", owner=self.teacher_user, passing_score=50
+        )
+        self.questions = []
+        self.options = []
+        for index in range(3):
+            question = Question.objects.create(
+                name=f"Question {index}", text="Question text", test=self.test
+            )
+            self.questions.append(question)
+            self.options.append(
+                [
+                    Answer.objects.create(
+                        text=text, question=question, is_correct=text == "A"
+                    )
+                    for text in ["A", "B", "C"]
+                ]
+            )
+        self.url = reverse("tests:test_item_analysis", kwargs={"test_id": self.test.id})
+
+    def _submit(self, choices):
+        student = User.objects.create(
+            email=f"student{User.objects.count()}@test.com", role="student"
+        )
+        self.client.force_authenticate(user=student)
+        self.client.post(
+            reverse("tests:test_submit", kwargs={"test_id": self.test.id}),
+            {
+                "answers": [
+                    {
+                        "question_id": question.id,
+                        "selected_answers": [options[choice].id],
+                    }
+                    for question, options, choice in zip(
+                        self.questions, self.options, choices
+                    )
+                ]
+            },
+            format="json",
+        )
+
+    def _expected(self, patterns):
+        correct = np.array(
+            [[choice == 0 for choice in choices] for choices in patterns], dtype=float
+        )
+        totals = correct.sum(axis=1)
+        expected = []
+        for column in range(correct.shape[1]):
+            item = correct[:, column]
+            rest = totals - item
+            if item.std() == 0 or rest.std() == 0:
+                discrimination = None
+            else:
+                discrimination = round(float(np.corrcoef(item, rest)[0, 1]), 4)
+            expected.append((round(float(item.mean()), 4), discrimination))
+        return expected
+
+    def test_item_statistics_match_reference(self):
+        """Тестирует совпадение показателей с прямым расчетом по каждому вопросу."""
+
+        rng = random.Random(7)
+        patterns = [[rng.randrange(3) for _ in range(3)] for _ in range(40)]
+        for choices in patterns:
+            self._submit(choices)
+
+        analysis = ItemAnalysisService.analyze(self.test, chunk_size=7)
+
+        self.assertEqual(analysis["respondents"], 40)
+        expected = self._expected(patterns)
+        for question_analysis, (p_value, discrimination) in zip(
+            analysis["questions"], expected
+        ):
+            self.assertEqual(question_analysis["p_value"], p_value)
+            if discrimination is None:
+                self.assertIsNone(question_analysis["discrimination"])
+            else:
+                self.assertAlmostEqual(
+                    question_analysis["discrimination"], discrimination, places=3
+                )
+
+        for index, question_analysis in enumerate(analysis["questions"]):
+            rates = [
+                answer["selection_rate"] for answer in question_analysis["answers"]
+            ]
+            counts = [
+                sum(choices[index] == choice for choices in patterns)
+                for choice in range(3)
+            ]
+            self.assertEqual(rates, [round(count / 40, 4) for count in counts])
+            self.assertEqual(
+                [answer["is_correct"] for answer in question_analysis["answers"]],
+                [True, False, False],
+            )
+
+    def test_analysis_without_results(self):
+        """Тестирует анализ теста без сохраненных ответов."""
+
+        analysis = ItemAnalysisService.analyze(self.test)
+
+        self.assertEqual(analysis["respondents"], 0)
+        self.assertIsNone(analysis["questions"][0]["p_value"])
+        self.assertIsNone(analysis["questions"][0]["answers"][0]["selection_rate"])
+
+    def test_analysis_cached_per_version_and_results(self):
+        """Тестирует кеширование анализа до изменения теста или его результатов."""
+
+        self._submit([0, 0, 1])
+        self._submit([1, 0, 0])
+        first = ItemAnalysisService.get(self.test)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(ItemAnalysisService.get(self.test), first)
+
+        self._submit([0, 1, 1])
+        self.assertEqual(ItemAnalysisService.get(self.test)["respondents"], 3)
+
+        self.options[0][1].is_correct = True
+        self.options[0][1].save()
+        analysis = ItemAnalysisService.get(self.test)
+        self.assertEqual(analysis["questions"][0]["answers"][1]["is_correct"], True)
+
+    def test_item_analysis_endpoint(self):
+        """Тестирует получение анализа заданий владельцем теста HTTP_200_OK."""
+
+        self._submit([0, 0, 0])
+        self.client.force_authenticate(user=self.teacher_user)
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["respondents"], 1)
+        self.assertEqual(len(response.data["questions"]), 3)
+
+    def test_item_analysis_forbidden_for_other_teacher(self):
+        """Тестирует запрет анализа заданий чужого теста HTTP_403_FORBIDDEN."""
+
+        self.client.force_authenticate(user=self.other_teacher)
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_analyze_items_command(self):
+        """Тестирует заполнение кеша анализа заданий командой analyze_items."""
+
+        self._submit([0, 1, 2])
+        output = StringIO()
+
+        call_command("analyze_items", stdout=output)
+
+        self.assertIn("Проанализировано тестов: 1", output.getvalue())
+        with self.assertNumQueries(1):
+            ItemAnalysisService.get(self.test)
+
+
+class TestDetailCacheTestCase(APITestCase):
+    """Тесты отдачи теста для прохождения из кеша с ETag."""
+
+    def setUp(self):
+        self.teacher_user = User.objects.create(
+            email="teacher@test.com", role="teacher"
+        )
+        self.student_user = User.objects.create(
+            email="student@test.com", role="student"
+        )
+        self.material = Material.objects.create(
+            name="Material", owner=self.teacher_user
+        )
+        self.client.force_authenticate(user=self.student_user)
+
+    def _create_test(self, questions_count):
+        test = Test.objects.create(
+            name=f"Detail Test {questions_count}",
+            material=self.material,
+            owner=self.teacher_user,
+            passing_score=50,
+        )
+        for index in range(questions_count):
+            question = Question.objects.create(
+                name=f"Question {index}", text="Question text", test=test
+            )
+            Answer.objects.create(text="Correct", question=question, is_correct=True)
+            Answer.objects.create(text="Wrong", question=question, is_correct=False)
+        return test
+
+    def _get(self, test, **headers):
+        return self.client.get(
+            reverse("tests:test_detail", kwargs={"pk": test.id}), headers=headers
+        )
+
+    def test_detail_query_count_does_not_depend_on_questions(self):
+        """Тестирует постоянное число запросов при отрисовке теста."""
+
+        small_test = self._create_test(1)
+        large_test = self._create_test(30)
+
+        with self.assertNumQueries(3):
+            self._get(small_test)
+        with self.assertNumQueries(3):
+            response = self._get(large_test)
+
+        data = json.loads(response.content)
+        self.assertEqual(len(data["questions"]), 30)
+        self.assertEqual(data["material_name"], "Material")
+        self.assertNotIn("is_correct", data["questions"][0]["answers"][0])
+
+    def test_detail_served_from_cache(self):
+        """Тестирует повторную отдачу теста без обращений к БД."""
+
+        test = self._create_test(3)
+        first = self._get(test)
+
+        with self.assertNumQueries(0):
+            second = self._get(test)
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second["ETag"], first["ETag"])
+
+    def test_detail_not_modified(self):
+        """Тестирует ответ HTTP_304_NOT_MODIFIED при совпадении If-None-Match."""
+
+        test = self._create_test(2)
+        etag = self._get(test)["ETag"]
+
+        with self.assertNumQueries(0):
+            response = self._get(test, **{"If-None-Match": etag})
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_detail_changes_after_test_content_change(self):
+        """Тестирует смену ETag и содержимого при изменении вопросов и материала."""
+
+        test = self._create_test(2)
+        etag = self._get(test)["ETag"]
+
+        question = test.questions.first()
+        question.text = "Changed text"
+        question.save()
+        response = self._get(test, **{"If-None-Match": etag})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("Changed text", response.content.decode())
+
+        self.material.name = "Renamed material"
+        self.material.save()
+        response = self._get(test, **{"If-None-Match": response["ETag"]})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            json.loads(response.content)["material_name"], "Renamed material"
+        )
+
+    def test_detail_not_found(self):
+        """Тестирует получение несуществующего теста HTTP_404_NOT_FOUND."""
+
+        response = self.client.get(reverse("tests:test_detail", kwargs={"pk": 999}))
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class TestSnapshotTestCase(APITestCase):
+    """Тесты публикации и отдачи неизменяемых снимков теста."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        media_settings = override_settings(MEDIA_ROOT=self.media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+
+        self.teacher_group, _ = Group.objects.get_or_create(name="Преподаватели")
+        self.teacher_user = User.objects.create(
+            email="teacher@test.com", role="teacher"
+        )
+        self.teacher_user.groups.add(self.teacher_group)
+        self.other_teacher = User.objects.create(email="other@test.com", role="teacher")
+        self.other_teacher.groups.add(self.teacher_group)
+        self.student_user = User.objects.create(
+            email="student@test.com", role="student"
+        )
+
+        self.test = Test.objects.create(
+            name="Snapshot Test", owner=self.teacher_user, passing_score=50
+        )
+        self.question = Question.objects.create(
+            name="Question", text="Question text", test=self.test
+        )
+        self.correct_answer = Answer.objects.create(
+            text="Correct", question=self.question, is_correct=True
+        )
+        self.wrong_answer = Answer.objects.create(
+            text="Wrong", question=self.question, is_correct=False
+        )
+
+    def _publish(self):
+        self.client.force_authenticate(user=self.teacher_user)
+        return self.client.post(
+            reverse("tests:test-publish", kwargs={"pk": self.test.id})
+        )
+
+    def _submit(self, answer, **extra):
+        self.client.force_authenticate(user=self.student_user)
+        return self.client.post(
+            reverse("tests:test_submit", kwargs={"test_id": self.test.id}),
+            {
+                "answers": [
+                    {"question_id": self.question.id, "selected_answers": [answer.id]}
+                ],
+                **extra,
+            },
+            format="json",
+        )
+
+    def test_publish_creates_versioned_snapshots(self):
+        """Тестирует публикацию снимков с возрастающими версиями HTTP_201_CREATED."""
+
+        first = self._publish()
+        second = self._publish()
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(first.data["snapshot_version"], 1)
+        self.assertEqual(second.data["snapshot_version"], 2)
+        self.assertEqual(TestSnapshot.objects.filter(test=self.test).count(), 2)
+
+    def test_publish_forbidden_for_other_teacher(self):
+        """Тестирует запрет публикации чужого теста HTTP_403_FORBIDDEN."""
+
+        self.client.force_authenticate(user=self.other_teacher)
+        response = self.client.post(
+            reverse("tests:test-publish", kwargs={"pk": self.test.id})
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_snapshot_served_as_gzip_without_question_queries(self):
+        """Тестирует отдачу снимка файлом gzip без запросов к вопросам и ответам."""
+
+        self._publish()
+        self.client.force_authenticate(user=self.student_user)
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(
+                reverse("tests:test_snapshot_latest", kwargs={"test_id": self.test.id}),
+                headers={"Accept-Encoding": "gzip"},
+            )
+            content = b"".join(response.streaming_content)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        data = json.loads(gzip.decompress(content))
+        self.assertEqual(data["snapshot_version"], 1)
+        self.assertEqual(
+            [answer["text"] for answer in data["questions"][0]["answers"]],
+            ["Correct", "Wrong"],
+        )
+        self.assertNotIn("is_correct", data["questions"][0]["answers"][0])
+        for query in context.captured_queries:
+            self.assertNotIn("tests_question", query["sql"])
+            self.assertNotIn("tests_answer", query["sql"])
+
+    def test_snapshot_is_immutable_and_supports_etag(self):
+        """Тестирует неизменность снимка после правки теста и ответ HTTP_304_NOT_MODIFIED."""
+
+        self._publish()
+        self.question.text = "Changed text"
+        self.question.save()
+
+        self.client.force_authenticate(user=self.student_user)
+        url = reverse(
+            "tests:test_snapshot", kwargs={"test_id": self.test.id, "version": 1}
+        )
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            json.loads(response.content)["questions"][0]["text"], "Question text"
+        )
+
+        response = self.client.get(url, headers={"If-None-Match": response["ETag"]})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_snapshot_not_found(self):
+        """Тестирует получение неопубликованного теста HTTP_404_NOT_FOUND."""
+
+        self.client.force_authenticate(user=self.student_user)
+        response = self.client.get(
+            reverse("tests:test_snapshot_latest", kwargs={"test_id": self.test.id})
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_submission_graded_against_snapshot(self):
+        """Тестирует проверку отправки по ключу снимка после изменения ответов."""
+
+        self._publish()
+        self.correct_answer.is_correct = False
+        self.correct_answer.save()
+        self.wrong_answer.is_correct = True
+        self.wrong_answer.save()
+
+        response = self._submit(self.correct_answer, snapshot_version=1)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["snapshot_version"], 1)
+        self.assertTrue(response.data["is_passed"])
+        result = TestResult.objects.get(student=self.student_user)
+        self.assertEqual(result.snapshot.version, 1)
+
+        self.assertEqual(RegradeService.regrade_test(self.test), 0)
+        result.refresh_from_db()
+        self.assertTrue(result.is_passed)
+
+    def test_submission_of_detail_after_edit_graded_against_test(self):
+        """Тестирует проверку без версии снимка по тесту, отданному tests/detail/."""
+
+        self._publish()
+        added = Question.objects.create(name="Added", text="Added", test=self.test)
+        added_answer = Answer.objects.create(
+            text="Added correct", question=added, is_correct=True
+        )
+
+        self.client.force_authenticate(user=self.student_user)
+        detail = self.client.get(
+            reverse("tests:test_detail", kwargs={"pk": self.test.id})
+        )
+        correct = {self.correct_answer.id, added_answer.id}
+        answers = [
+            {
+                "question_id": question["id"],
+                "selected_answers": [
+                    answer["id"]
+                    for answer in question["answers"]
+                    if answer["id"] in correct
+                ],
+            }
+            for question in json.loads(detail.content)["questions"]
+        ]
+        response = self.client.post(
+            reverse("tests:test_submit", kwargs={"test_id": self.test.id}),
+            {"answers": answers},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn("snapshot_version", response.data)
+        self.assertEqual(response.data["total_questions"], 2)
+        self.assertEqual(response.data["correct_answers"], 2)
+        self.assertIsNone(TestResult.objects.get(student=self.student_user).snapshot)
+
+    def test_submission_with_unknown_snapshot_version(self):
+        """Тестирует отправку с несуществующей версией снимка HTTP_400_BAD_REQUEST."""
+
+        self._publish()
+        response = self._submit(self.correct_answer, snapshot_version=5)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("snapshot_version", response.data)
+
+    @override_settings(ASYNC_GRADING=True)
+    def test_queued_attempt_graded_against_snapshot(self):
+        """Тестирует асинхронную проверку попытки по ключу снимка."""
+
+        self._publish()
+        self.wrong_answer.is_correct = True
+        self.wrong_answer.save()
+        self.correct_answer.is_correct = False
+        self.correct_answer.save()
+
+        response = self._submit(self.correct_answer, snapshot_version=1)
+        GradingQueueService.process_batch()
+
+        attempt = TestAttempt.objects.get(pk=response.data["attempt_id"])
+        self.assertEqual(attempt.status, "done")
+        self.assertEqual(attempt.result.snapshot_id, attempt.snapshot_id)
+        self.assertTrue(attempt.result.is_passed)
+
+
+@override_settings(SHUFFLE_TEST_QUESTIONS=True)
+class TestShuffleTestCase(APITestCase):
+    """Тесты перемешивания вопросов и вариантов ответа для студента."""
+
+    def setUp(self):
+        self.teacher_user = User.objects.create(
+            email="teacher@test.com", role="teacher"
+        )
+        self.students = [
+            User.objects.create(email=f"student{index}@test.com", role="student")
+            for index in range(2)
+        ]
+        self.test = Test.objects.create(
+            name="Shuffle Test", owner=self.teacher_user, passing_score=50
+        )
+        for index in range(10):
+            question = Question.objects.create(
+                name=f"Question {index}", text="Question text", test=self.test
+            )
+            for text in ["A", "B", "C", "D"]:
+                Answer.objects.create(
+                    text=text, question=question, is_correct=text == "A"
+                )
+        self.url = reverse("tests:test_detail", kwargs={"pk": self.test.id})
+
+    def _get(self, student, headers=None, **params):
+        self.client.force_authenticate(user=student)
+        return self.client.get(self.url, params, headers=headers)
+
+    def _question_ids(self, response):
+        return [
+            question["id"] for question in json.loads(response.content)["questions"]
+        ]
+
+    def test_order_is_reproducible_per_student_and_attempt(self):
+        """Тестирует одинаковый порядок для того же студента и попытки и разный для других."""
+
+        first = self._question_ids(self._get(self.students[0]))
+        again = self._question_ids(self._get(self.students[0], attempt=1))
+        other_student = self._question_ids(self._get(self.students[1]))
+        other_attempt = self._question_ids(self._get(self.students[0], attempt=2))
+
+        self.assertEqual(first, again)
+        self.assertNotEqual(first, other_student)
+        self.assertNotEqual(first, other_attempt)
+        self.assertEqual(sorted(first), sorted(other_student))
+
+    def test_order_reconstructed_from_seed(self):
+        """Тестирует восстановление порядка вопросов и ответов по студенту, тесту и попытке."""
+
+        student = self.students[1]
+        data = json.loads(self._get(student, attempt=3).content)
+
+        question_ids = [question["id"] for question in data["questions"]]
+        self.assertEqual(
+            question_ids,
+            question_order(student.id, self.test.id, 3, sorted(question_ids)),
+        )
+        for question in data["questions"]:
+            answer_ids = [answer["id"] for answer in question["answers"]]
+            self.assertEqual(
+                answer_ids,
+                answer_order(student.id, self.test.id, 3, sorted(answer_ids)),
+            )
+
+    def test_shuffled_detail_served_without_queries(self):
+        """Тестирует перемешивание закешированной выдачи без обращений к БД."""
+
+        self._get(self.students[0])
+
+        with self.assertNumQueries(0):
+            response = self._get(self.students[1], attempt=2)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(0):
+            response = self._get(
+                self.students[1], {"If-None-Match": response["ETag"]}, attempt=2
+            )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_invalid_attempt(self):
+        """Тестирует получение теста с некорректным номером попытки HTTP_400_BAD_REQUEST."""
+
+        response = self._get(self.students[0], attempt=0)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_submission_stores_attempt_number(self):
+        """Тестирует сохранение номера попытки в результате для восстановления порядка."""
+
+        question = self.test.questions.first()
+        self.client.force_authenticate(user=self.students[0])
+        self.client.post(
+            reverse("tests:test_submit", kwargs={"test_id": self.test.id}),
+            {
+                "answers": [
+                    {
+                        "question_id": question.id,
+                        "selected_answers": [question.answers.first().id],
+                    }
+                ],
+                "attempt": 2,
+            },
+            format="json",
+        )
+
+        self.assertEqual(TestResult.objects.get().attempt_number, 2)
+
+
+class QuestionSamplingTestCase(APITestCase):
+    """Тесты выборки вопросов для попытки из пула."""
+
+    def setUp(self):
+        self.teacher_user = User.objects.create(
+            email="teacher@test.com", role="teacher"
+        )
+        self.student_user = User.objects.create(
+            email="student@test.com", role="student"
+        )
+        self.material = Material.objects.create(
+            name="Material", owner=self.teacher_user
+        )
+        self.test = Test.objects.create(
+            name="Sampling Test",
+            owner=self.teacher_user,
+            material=self.material,
+            passing_score=50,
+            sample_size=5,
+        )
+        self.correct_answers = {}
+        for index in range(20):
+            self._create_question(self.test, ["algebra", "geometry"][index % 4 == 0])
+
+    def _create_question(self, test, tag):
+        question = Question.objects.create(
+            name="Question", text="Question text", test=test, tag=tag
+        )
+        self.correct_answers[question.id] = Answer.objects.create(
+            text="Correct", question=question, is_correct=True
+        )
+        Answer.objects.create(text="Wrong", question=question, is_correct=False)
+        return question
+
+    def _start(self):
+        self.client.force_authenticate(user=self.student_user)
+        return self.client.post(
+            reverse("tests:test_start", kwargs={"test_id": self.test.id})
+        )
+
+    def _submit(self, attempt_id, question_ids):
+        return self.client.post(
+            reverse("tests:test_submit", kwargs={"test_id": self.test.id}),
+            {
+                "attempt_id": attempt_id,
+                "answers": [
+                    {
+                        "question_id": question_id,
+                        "selected_answers": [self.correct_answers[question_id].id],
+                    }
+                    for question_id in question_ids
+                ],
+            },
+            format="json",
+        )
+
+    def test_allocate_largest_remainder(self):
+        """Тестирует пропорциональное распределение вопросов по группам."""
+
+        self.assertEqual(
+            QuestionSamplingService.allocate([50, 30, 20], 10).tolist(), [5, 3, 2]
+        )
+        self.assertEqual(QuestionSamplingService.allocate([1, 1, 1], 2).sum(), 2)
+        self.assertEqual(QuestionSamplingService.allocate([3, 2], 10).tolist(), [3, 2])
+
+    def test_draw_uses_cached_index_without_random_ordering(self):
+        """Тестирует выборку по закешированному индексу без ORDER BY random()."""
+
+        with CaptureQueriesContext(connection) as context:
+            first = QuestionSamplingService.draw(self.test)
+        for query in context.captured_queries:
+            self.assertNotIn("RANDOM", query["sql"].upper())
+
+        with self.assertNumQueries(0):
+            second = QuestionSamplingService.draw(self.test)
+
+        self.assertEqual(len(first), 5)
+        self.assertEqual(len(set(first)), 5)
+        self.assertTrue(set(first + second) <= set(self.correct_answers))
+
+    def test_stratified_draw_by_tag(self):
+        """Тестирует пропорциональную выборку по тегам вопросов."""
+
+        self.test.sample_strata = "tag"
+        self.test.sample_size = 8
+        self.test.save()
+
+        tags = dict(Question.objects.values_list("id", "tag"))
+        for _ in range(5):
+            drawn = QuestionSamplingService.draw(self.test)
+            drawn_tags = [tags[question_id] for question_id in drawn]
+            self.assertEqual(drawn_tags.count("geometry"), 2)
+            self.assertEqual(drawn_tags.count("algebra"), 6)
+
+    def test_material_pool_and_invalidation(self):
+        """Тестирует пул вопросов материала и его обновление при добавлении вопроса."""
+
+        other_test = Test.objects.create(
+            name="Other",
+            owner=self.teacher_user,
+            material=self.material,
+            passing_score=50,
+        )
+        self.test.sample_pool = "material"
+        self.test.save()
+        QuestionSamplingService.get_index(self.test)
+
+        question = self._create_question(other_test, "algebra")
+        index = QuestionSamplingService.get_index(self.test)
+
+        pool = np.concatenate(list(index.values())).tolist()
+        self.assertEqual(len(pool), 21)
+        self.assertIn(question.id, pool)
+
+    def test_start_and_submit_sampled_attempt(self):
+        """Тестирует проверку отправки только по вопросам, выбранным для попытки."""
+
+        response = self._start()
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        question_ids = [question["id"] for question in response.data["questions"]]
+        self.assertEqual(len(question_ids), 5)
+        attempt = TestAttempt.objects.get(pk=response.data["attempt_id"])
+        self.assertEqual(attempt.status, "started")
+        self.assertEqual(attempt.question_ids, question_ids)
+
+        response = self._submit(attempt.id, question_ids)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["total_questions"], 5)
+        self.assertEqual(response.data["correct_answers"], 5)
+        attempt.refresh_from_db()
+        self.assertEqual(attempt.status, "done")
+        self.assertEqual(attempt.result.total_questions, 5)
+
+        response = self._submit(attempt.id, question_ids)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(TestResult.objects.count(), 1)
+
+    def test_submit_rejects_questions_outside_sample(self):
+        """Тестирует отклонение ответа на вопрос, не выбранный для попытки."""
+
+        response = self._start()
+        drawn = {question["id"] for question in response.data["questions"]}
+        other = next(iter(set(self.correct_answers) - drawn))
+
+        response = self._submit(response.data["attempt_id"], [other])
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_submit_sampled_test_requires_attempt(self):
+        """Тестирует отправку на тест с выборкой без попытки HTTP_400_BAD_REQUEST."""
+
+        self.client.force_authenticate(user=self.student_user)
+        response = self.client.post(
+            reverse("tests:test_submit", kwargs={"test_id": self.test.id}),
+            {"answers": []},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("attempt_id", response.data)
+
+    def test_start_without_sampling(self):
+        """Тестирует начало попытки для теста без выборки HTTP_400_BAD_REQUEST."""
+
+        self.test.sample_size = None
+        self.test.save()
+
+        response = self._start()
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_regrade_sampled_results(self):
+        """Тестирует перепроверку результатов попыток с выборкой по их вопросам."""
+
+        submitted = []
+        for _ in range(2):
+            response = self._start()
+            question_ids = [question["id"] for question in response.data["questions"]]
+            self._submit(response.data["attempt_id"], question_ids)
+            submitted.append(question_ids)
+        fixed = submitted[0][0]
+        self.correct_answers[fixed].is_correct = False
+        self.correct_answers[fixed].save()
+
+        RegradeService.regrade_test(self.test, chunk_size=1)
+
+        for question_ids, result in zip(submitted, TestResult.objects.order_by("id")):
+            self.assertEqual(result.total_questions, 5)
+            self.assertEqual(result.correct_answers, 4 if fixed in question_ids else 5)
+
+    def test_item_analysis_of_sampled_attempts(self):
+        """Тестирует анализ заданий только по студентам, которым показан вопрос."""
+
+        other_test = Test.objects.create(
+            name="Other",
+            owner=self.teacher_user,
+            material=self.material,
+            passing_score=50,
+        )
+        pool_question = self._create_question(other_test, "algebra")
+        self.test.sample_pool = "material"
+        self.test.save()
+
+        drawn = set()
+        for _ in range(8):
+            response = self._start()
+            question_ids = [question["id"] for question in response.data["questions"]]
+            self._submit(response.data["attempt_id"], question_ids)
+            drawn.update(question_ids)
+
+        analysis = ItemAnalysisService.analyze(self.test, chunk_size=3)
+
+        self.assertEqual(analysis["respondents"], 8)
+        questions = {item["question_id"]: item for item in analysis["questions"]}
+        self.assertIn(pool_question.id, questions)
+        for question_id, item in questions.items():
+            if question_id in drawn:
+                self.assertEqual(item["p_value"], 1.0)
+                self.assertEqual(
+                    [answer["selection_rate"] for answer in item["answers"]],
+                    [1.0, 0.0],
+                )
+            else:
+                self.assertIsNone(item["p_value"])
+
+    def test_detail_refused_for_sampled_test(self):
+        """Тестирует отказ в выдаче всего пула теста с выборкой HTTP_400_BAD_REQUEST."""
+
+        self.client.force_authenticate(user=self.student_user)
+        url = reverse("tests:test_detail", kwargs={"pk": self.test.id})
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("tests/start/", str(response.data["detail"]))
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_publish_and_snapshot_refused_for_sampled_test(self):
+        """Тестирует отказ в публикации и чтении снимка теста с выборкой."""
+
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        group, _ = Group.objects.get_or_create(name="Преподаватели")
+        self.teacher_user.groups.add(group)
+
+        self.client.force_authenticate(user=self.teacher_user)
+        response = self.client.post(
+            reverse("tests:test-publish", kwargs={"pk": self.test.id})
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(TestSnapshot.objects.exists())
+
+        Test.objects.filter(pk=self.test.pk).update(sample_size=None)
+        with override_settings(MEDIA_ROOT=media_root):
+            response = self.client.post(
+                reverse("tests:test-publish", kwargs={"pk": self.test.id})
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        Test.objects.filter(pk=self.test.pk).update(sample_size=5)
+
+        self.client.force_authenticate(user=self.student_user)
+        for url in [
+            reverse("tests:test_snapshot_latest", kwargs={"test_id": self.test.id}),
+            reverse(
+                "tests:test_snapshot", kwargs={"test_id": self.test.id, "version": 1}
+            ),
+        ]:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(ASYNC_GRADING=True)
+    def test_sampled_attempt_graded_by_queue(self):
+        """Тестирует асинхронную проверку попытки с выборкой вопросов."""
+
+        response = self._start()
+        question_ids = [question["id"] for question in response.data["questions"]]
+
+        response = self._submit(response.data["attempt_id"], question_ids[:3])
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        GradingQueueService.process_batch()
+
+        attempt = TestAttempt.objects.get(pk=response.data["attempt_id"])
+        self.assertEqual(attempt.status, "done")
+        self.assertEqual(attempt.result.total_questions, 5)
+        self.assertEqual(attempt.result.correct_answers, 3)
+
+
+class PermissionQueryCountTestCase(APITestCase):
+    """Тесты количества запросов при проверке прав доступа."""
+
+    def setUp(self):
+        self.admin_group, _ = Group.objects.get_or_create(name="Администраторы")
+        self.teacher_group, _ = Group.objects.get_or_create(name="Преподаватели")
+        self.student_group, _ = Group.objects.get_or_create(name="Студенты")
+
+        self.teacher_user = User.objects.create(
+            email="teacher@test.com", role="teacher"
+        )
+        self.teacher_user.groups.add(self.teacher_group)
+        self.student_user = User.objects.create(
+            email="student@test.com", role="student"
+        )
+        self.student_user.groups.add(self.student_group)
+
+        self.test = Test.objects.create(
+            name="Permission Test", owner=self.teacher_user, passing_score=50
+        )
+
+    def _permission_queries(self, context):
+        return [
+            query["sql"]
+            for query in context.captured_queries
+            if "auth_group" in query["sql"] or "users_user" in query["sql"]
+        ]
+
+    def test_roles_loaded_once_per_request(self):
+        """Тестирует загрузку групп пользователя одним запросом для всех проверок."""
+
+        request = APIRequestFactory().get("/")
+        request.user = self.teacher_user
+
+        with self.assertNumQueries(1):
+            self.assertFalse(IsAdmin().has_permission(request, None))
+            self.assertTrue(IsTeacher().has_permission(request, None))
+            self.assertFalse(IsStudent().has_permission(request, None))
+            self.assertTrue(IsAdminOrTeacherOwner().has_permission(request, None))
+            self.assertTrue(
+                IsAdminOrTeacherOwner().has_object_permission(request, None, self.test)
+            )
+
+    def test_owner_check_does_not_load_users(self):
+        """Тестирует проверку владельца по owner_id без загрузки пользователя."""
+
+        request = APIRequestFactory().get("/")
+        request.user = self.teacher_user
+        test = Test.objects.get(pk=self.test.pk)
+
+        with self.assertNumQueries(0):
+            self.assertTrue(IsOwner().has_object_permission(request, None, test))
+
+    def test_owner_endpoint_runs_single_permission_query(self):
+        """Тестирует один запрос прав доступа при получении своего теста преподавателем."""
+
+        self.client.force_authenticate(user=self.teacher_user)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(
+                reverse("tests:test-detail", kwargs={"pk": self.test.id})
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(self._permission_queries(context)), 1)
+
+    def test_student_owner_destroy_runs_single_permission_query(self):
+        """Тестирует один запрос прав доступа при удалении своего результата студентом."""
+
+        result = TestResult.objects.create(
+            student=self.student_user, test=self.test, percentage=None
+        )
+        self.client.force_authenticate(user=self.student_user)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.delete(
+                reverse("tests:test_result_destroy", kwargs={"pk": result.id})
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(len(self._permission_queries(context)), 1)
+
+
+class CursorPaginationTestCase(APITestCase):
+    """Тесты постраничного вывода списков по ключу."""
+
+    def setUp(self):
+        self.teacher_group, _ = Group.objects.get_or_create(name="Преподаватели")
+        self.teacher_user = User.objects.create(
+            email="teacher@test.com", role="teacher"
+        )
+        self.teacher_user.groups.add(self.teacher_group)
+        self.student_user = User.objects.create(
+            email="student@test.com", role="student"
+        )
+
+    def _collect(self, url):
+        ids = []
+        while url:
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertFalse(
+                any(
+                    "COUNT(" in query["sql"].upper()
+                    for query in context.captured_queries
+                )
+            )
+            self.assertNotIn("count", response.data)
+            ids.extend(item["id"] for item in response.data["results"])
+            url = response.data["next"]
+        return ids
+
+    def test_tests_list_walks_all_pages(self):
+        """Тестирует обход всех страниц тестов без пропусков и повторов."""
+
+        tests = [
+            Test.objects.create(
+                name=f"Test {i}", owner=self.teacher_user, passing_score=50
+            )
+            for i in range(7)
+        ]
+        Test.objects.filter(pk__in=[test.pk for test in tests[:3]]).update(
+            created_at=tests[0].created_at
+        )
+
+        self.client.force_authenticate(user=self.teacher_user)
+        ids = self._collect(reverse("tests:test-list") + "?page_size=2")
+
+        expected = list(
+            Test.objects.order_by("-created_at", "-id").values_list("id", flat=True)
+        )
+        self.assertEqual(ids, expected)
+
+    def test_results_list_ordered_by_completed_at(self):
+        """Тестирует постраничный вывод результатов по времени завершения."""
+
+        test = Test.objects.create(
+            name="Results Test", owner=self.teacher_user, passing_score=50
+        )
+        TestResult.objects.bulk_create(
+            TestResult(student=self.student_user, test=test, percentage=i * 10)
+            for i in range(5)
+        )
+
+        self.client.force_authenticate(user=self.student_user)
+        ids = self._collect(reverse("tests:test_results") + "?page_size=2")
+
+        expected = list(
+            TestResult.objects.order_by("-completed_at", "-id").values_list(
+                "id", flat=True
+            )
+        )
+        self.assertEqual(ids, expected)
+
+
+class OwnerListTestCase(APITestCase):
+    """Тесты ограничения списков тестов и вопросов записями владельца."""
+
+    def setUp(self):
+        self.admin_group, _ = Group.objects.get_or_create(name="Администраторы")
+        self.teacher_group, _ = Group.objects.get_or_create(name="Преподаватели")
+
+        self.admin_user = User.objects.create(email="admin@test.com", role="admin")
+        self.admin_user.groups.add(self.admin_group)
+        self.teacher_user = User.objects.create(
+            email="teacher@test.com", role="teacher"
+        )
+        self.teacher_user.groups.add(self.teacher_group)
+        self.other_teacher = User.objects.create(email="other@test.com", role="teacher")
+        self.other_teacher.groups.add(self.teacher_group)
+
+        self.own_test = Test.objects.create(
+            name="Own Test", owner=self.teacher_user, passing_score=50
+        )
+        self.other_test = Test.objects.create(
+            name="Other Test", owner=self.other_teacher, passing_score=50
+        )
+        self.own_question = Question.objects.create(
+            name="Own Question", test=self.own_test, owner=self.teacher_user
+        )
+        Question.objects.create(
+            name="Other Question", test=self.other_test, owner=self.other_teacher
+        )
+
+    def _ids(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [item["id"] for item in response.data["results"]]
+
+    def test_teacher_lists_only_own_rows(self):
+        """Тестирует вывод преподавателю только его тестов и вопросов."""
+
+        self.client.force_authenticate(user=self.teacher_user)
+
+        self.assertEqual(self._ids(reverse("tests:test-list")), [self.own_test.id])
+        self.assertEqual(
+            self._ids(reverse("tests:question-list")), [self.own_question.id]
+        )
+
+    def test_admin_lists_all_rows(self):
+        """Тестирует вывод администратору всех тестов и вопросов."""
+
+        self.client.force_authenticate(user=self.admin_user)
+
+        self.assertEqual(len(self._ids(reverse("tests:test-list"))), 2)
+        self.assertEqual(len(self._ids(reverse("tests:question-list"))), 2)
+
+    def test_teacher_list_filters_by_owner_in_query(self):
+        """Тестирует фильтрацию списка по владельцу в запросе к БД."""
+
+        self.client.force_authenticate(user=self.teacher_user)
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(reverse("tests:test-list"))
+
+        list_query = context.captured_queries[-1]["sql"]
+        self.assertIn('"tests_test"."owner_id" =', list_query)
+
+
+class TestResultListTestCase(APITestCase):
+    """Тесты списка результатов тестов."""
+
+    def setUp(self):
+        self.admin_group, _ = Group.objects.get_or_create(name="Администраторы")
+        self.teacher_group, _ = Group.objects.get_or_create(name="Преподаватели")
+        self.student_group, _ = Group.objects.get_or_create(name="Студенты")
+
+        self.admin_user = User.objects.create(email="admin@test.com", role="admin")
+        self.admin_user.groups.add(self.admin_group)
+        self.teacher_user = User.objects.create(
+            email="teacher@test.com", role="teacher"
+        )
+        self.teacher_user.groups.add(self.teacher_group)
+        self.other_teacher = User.objects.create(email="other@test.com", role="teacher")
+        self.other_teacher.groups.add(self.teacher_group)
+        self.student_user = User.objects.create(
+            email="student@test.com", role="student"
+        )
+        self.student_user.groups.add(self.student_group)
+        self.other_student = User.objects.create(
+            email="student2@test.com", role="student"
+        )
+        self.other_student.groups.add(self.student_group)
+
+        self.test = Test.objects.create(
+            name="Own Test", owner=self.teacher_user, passing_score=50
+        )
+        self.other_test = Test.objects.create(
+            name="Other Test", owner=self.other_teacher, passing_score=50
+        )
+        self.url = reverse("tests:test_results")
+
+    def _create_results(self, student, test, count):
+        TestResult.objects.bulk_create(
+            TestResult(student=student, test=test, percentage=50.0)
+            for _ in range(count)
+        )
+
+    def _ids(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return {item["id"] for item in response.data["results"]}
+
+    def test_student_lists_only_own_results(self):
+        """Тестирует вывод студенту только его результатов."""
+
+        self._create_results(self.student_user, self.test, 2)
+        self._create_results(self.other_student, self.test, 3)
+
+        self.client.force_authenticate(user=self.student_user)
+
+        self.assertEqual(
+            self._ids(self.url),
+            set(
+                TestResult.objects.filter(student=self.student_user).values_list(
+                    "id", flat=True
+                )
+            ),
+        )
+        self.assertEqual(
+            self._ids(f"{self.url}?student={self.other_student.id}"),
+            self._ids(self.url),
+        )
+
+    def test_teacher_lists_results_of_own_tests(self):
+        """Тестирует вывод преподавателю результатов его тестов с фильтром по студенту."""
+
+        self._create_results(self.student_user, self.test, 2)
+        self._create_results(self.other_student, self.test, 1)
+        self._create_results(self.student_user, self.other_test, 4)
+
+        self.client.force_authenticate(user=self.teacher_user)
+
+        self.assertEqual(len(self._ids(self.url)), 3)
+        self.assertEqual(
+            len(self._ids(f"{self.url}?student={self.other_student.id}")), 1
+        )
+        self.assertEqual(len(self._ids(f"{self.url}?test={self.other_test.id}")), 0)
+
+    def test_admin_filters_by_test(self):
+        """Тестирует фильтр результатов по тесту для администратора."""
+
+        self._create_results(self.student_user, self.test, 2)
+        self._create_results(self.student_user, self.other_test, 4)
+
+        self.client.force_authenticate(user=self.admin_user)
+
+        self.assertEqual(len(self._ids(self.url)), 6)
+        self.assertEqual(len(self._ids(f"{self.url}?test={self.other_test.id}")), 4)
+
+    def test_invalid_filter(self):
+        """Тестирует ошибку при некорректном фильтре HTTP_400_BAD_REQUEST."""
+
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.get(f"{self.url}?test=abc")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_query_count_does_not_grow_with_results(self):
+        """Тестирует постоянное количество запросов при росте числа результатов."""
+
+        self.client.force_authenticate(user=self.student_user)
+        self._create_results(self.student_user, self.test, 2)
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.data["results"]), 2)
+
+        self._create_results(self.student_user, self.other_test, 20)
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.data["results"]), 22)
+        self.assertEqual(
+            {item["test_name"] for item in response.data["results"]},
+            {"Own Test", "Other Test"},
+        )
+
+
+class FieldsetTestCase(APITestCase):
+    """Тесты параметров ?fields= и ?expand= списков тестов и вопросов."""
+
+    def setUp(self):
+        self.teacher_group, _ = Group.objects.get_or_create(name="Преподаватели")
+        self.teacher_user = User.objects.create(
+            email="teacher@test.com", role="teacher"
+        )
+        self.teacher_user.groups.add(self.teacher_group)
+
+        self.material = Material.objects.create(
+            name="Material", description="Long description", owner=self.teacher_user
+        )
+        for i in range(3):
+            test = Test.objects.create(
+                name=f"Test {i}",
+                description="Long description",
+                material=self.material,
+                owner=self.teacher_user,
+                passing_score=50,
+            )
+            Question.objects.create(
+                name=f"Question {i}",
+                text="Long question text",
+                test=test,
+                owner=self.teacher_user,
+            )
+
+        self.client.force_authenticate(user=self.teacher_user)
+
+    def test_fields_narrow_response_and_columns(self):
+        """Тестирует вывод и загрузку из БД только запрошенных полей."""
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse("tests:test-list") + "?fields=id,name")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        for item in response.data["results"]:
+            self.assertEqual(set(item), {"id", "name"})
+        list_query = context.captured_queries[-1]["sql"]
+        self.assertNotIn('"tests_test"."description"', list_query)
+
+    def test_expand_uses_single_query(self):
+        """Тестирует раскрытие связи без дополнительных запросов на каждую запись."""
+
+        url = reverse("tests:question-list") + "?fields=id,test&expand=test"
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), 3)
+        for item in response.data["results"]:
+            self.assertEqual(item["test"]["material"], self.material.id)
+            self.assertNotIn("text", item)
+        self.assertEqual(
+            len([q for q in context.captured_queries if "tests_" in q["sql"]]), 1
+        )
+
+    def test_nested_expand_of_material(self):
+        """Тестирует раскрытие материала теста."""
+
+        response = self.client.get(
+            reverse("tests:test-list") + "?fields=name,material&expand=material"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"][0]["material"]["name"], "Material")
+
+    def test_unknown_expand(self):
+        """Тестирует ошибку при раскрытии неизвестной связи HTTP_400_BAD_REQUEST."""
+
+        response = self.client.get(reverse("tests:test-list") + "?expand=owner")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("expand", response.data)
+
+    def test_fields_ignored_on_write(self):
+        """Тестирует, что ?fields= не влияет на создание теста."""
+
+        response = self.client.post(
+            reverse("tests:test-list") + "?fields=id",
+            {"name": "New Test", "passing_score": 60},
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["name"], "New Test")
+
+
+class TestSearchTestCase(APITestCase):
+    """Тесты поиска тестов ?q=."""
+
+    def setUp(self):
+        self.teacher_group, _ = Group.objects.get_or_create(name="Преподаватели")
+        self.teacher_user = User.objects.create(
+            email="teacher@test.com", role="teacher"
+        )
+        self.teacher_user.groups.add(self.teacher_group)
+        Test.objects.create(
+            name="Контрольная по алгебре", owner=self.teacher_user, passing_score=50
+        )
+        Test.objects.create(
+            name="Итоговый тест",
+            description="Вопросы по алгебре и геометрии",
+            owner=self.teacher_user,
+            passing_score=50,
+        )
+        self.client.force_authenticate(user=self.teacher_user)
+
+    def test_search_with_fields(self):
+        """Тестирует поиск тестов с выбором полей."""
+
+        response = self.client.get(
+            reverse("tests:test-list"), {"q": "алгебре", "fields": "name"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data["results"],
+            [{"name": "Контрольная по алгебре"}, {"name": "Итоговый тест"}],
+        )
+
+    def test_empty_query_lists_all(self):
+        """Тестирует обычный список при пустой строке поиска."""
+
+        response = self.client.get(reverse("tests:test-list"), {"q": " "})
+
+        self.assertEqual(len(response.data["results"]), 2)
+
+
+class TestAuthoringTestCase(APITestCase):
+    """Тесты создания и обновления теста с вопросами и ответами одним запросом."""
+
+    def setUp(self):
+        self.teacher_group, _ = Group.objects.get_or_create(name="Преподаватели")
+        self.teacher_user = User.objects.create(
+            email="teacher@test.com", role="teacher"
+        )
+        self.teacher_user.groups.add(self.teacher_group)
+        self.other_teacher = User.objects.create(email="other@test.com", role="teacher")
+        self.other_teacher.groups.add(self.teacher_group)
+        self.client.force_authenticate(user=self.teacher_user)
+
+    def _payload(self, questions):
+        return {
+            "name": "Authoring Test",
+            "passing_score": 60,
+            "questions": [
+                {
+                    "name": f"Question {i}",
+                    "text": f"Text {i}",
+                    "question_type": "single",
+                    "answers": [
+                        {"text": f"Answer {i}.{j}", "is_correct": j == 0}
+                        for j in range(4)
+                    ],
+                }
+                for i in range(questions)
+            ],
+        }
+
+    def _create(self, questions):
+        response = self.client.post(
+            reverse("tests:test_authoring"), self._payload(questions), format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data
+
+    def test_create_tree(self):
+        """Тестирует создание теста с вопросами и ответами."""
+
+        data = self._create(5)
+        test = Test.objects.get(pk=data["id"])
+
+        self.assertEqual(test.owner, self.teacher_user)
+        self.assertEqual(test.questions.count(), 5)
+        self.assertEqual(Answer.objects.filter(question__test=test).count(), 20)
+        self.assertEqual(
+            Answer.objects.filter(question__test=test, is_correct=True).count(), 5
+        )
+        self.assertEqual(len(data["questions"][0]["answers"]), 4)
+        self.assertEqual(
+            Question.objects.get(pk=data["questions"][2]["id"]).owner,
+            self.teacher_user,
+        )
+
+    def test_create_query_count_does_not_grow(self):
+        """Тестирует постоянное количество запросов при росте числа вопросов."""
+
+        with CaptureQueriesContext(connection) as small:
+            self._create(3)
+        with CaptureQueriesContext(connection) as large:
+            self._create(30)
+
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+    def test_replace_and_delete_query_count_does_not_grow(self):
+        """Тестирует постоянное количество запросов при удалении вопросов и теста."""
+
+        counts = []
+        for questions in [3, 20]:
+            data = self._create(questions + 1)
+            with CaptureQueriesContext(connection) as replaced:
+                response = self.client.put(
+                    reverse("tests:test_authoring_detail", kwargs={"pk": data["id"]}),
+                    {
+                        "name": "Authoring Test",
+                        "passing_score": 60,
+                        "questions": data["questions"][:1],
+                    },
+                    format="json",
+                )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            with CaptureQueriesContext(connection) as deleted:
+                response = self.client.delete(
+                    reverse("tests:test-detail", kwargs={"pk": data["id"]})
+                )
+            self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+            counts.append(
+                (len(replaced.captured_queries), len(deleted.captured_queries))
+            )
+
+        self.assertEqual(counts[0], counts[1])
+
+    def test_upsert_tree(self):
+        """Тестирует обновление по id, создание новых и удаление отсутствующих записей."""
+
+        data = self._create(3)
+        kept, removed = data["questions"][0], data["questions"][1]
+        kept["text"] = "Updated text"
+        kept["answers"][0]["text"] = "Updated answer"
+        kept["answers"] = kept["answers"][:2]
+        payload = {
+            "name": "Renamed Test",
+            "passing_score": 70,
+            "questions": [
+                kept,
+                data["questions"][2],
+                {"name": "New", "text": "New question", "answers": []},
+            ],
+        }
+
+        response = self.client.put(
+            reverse("tests:test_authoring_detail", kwargs={"pk": data["id"]}),
+            payload,
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        test = Test.objects.get(pk=data["id"])
+        self.assertEqual(test.name, "Renamed Test")
+        self.assertEqual(test.questions.count(), 3)
+        self.assertFalse(Question.objects.filter(pk=removed["id"]).exists())
+        question = Question.objects.get(pk=kept["id"])
+        self.assertEqual(question.text, "Updated text")
+        self.assertEqual(
+            list(question.answers.order_by("id").values_list("text", flat=True)),
+            ["Updated answer", "Answer 0.1"],
+        )
+        self.assertTrue(Question.objects.filter(test=test, name="New").exists())
+
+    def test_upsert_invalidates_test_version(self):
+        """Тестирует сброс версии теста при обновлении дерева."""
+
+        data = self._create(2)
+        version = get_test_version(data["id"])
+
+        self.client.put(
+            reverse("tests:test_authoring_detail", kwargs={"pk": data["id"]}),
+            self._payload(1),
+            format="json",
+        )
+
+        self.assertGreater(get_test_version(data["id"]), version)
+
+    def test_foreign_ids_rejected(self):
+        """Тестирует отказ при id вопроса другого теста без изменения данных."""
+
+        first = self._create(1)
+        second = self._create(1)
+        payload = self._payload(0)
+        payload["questions"] = [second["questions"][0]]
+
+        response = self.client.put(
+            reverse("tests:test_authoring_detail", kwargs={"pk": first["id"]}),
+            payload,
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Test.objects.get(pk=first["id"]).name, "Authoring Test")
+        self.assertEqual(Question.objects.filter(test_id=first["id"]).count(), 1)
+
+    def test_invalid_single_choice(self):
+        """Тестирует отказ при нескольких правильных ответах у вопроса с одним ответом."""
+
+        payload = self._payload(1)
+        payload["questions"][0]["answers"][1]["is_correct"] = True
+
+        response = self.client.post(
+            reverse("tests:test_authoring"), payload, format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Test.objects.exists())
+
+    def test_answer_without_is_correct(self):
+        """Тестирует создание ответа без is_correct как неправильного."""
+
+        payload = self._payload(1)
+        payload["questions"][0]["answers"] = [{"text": "a"}]
+
+        response = self.client.post(
+            reverse("tests:test_authoring"), payload, format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(Answer.objects.get(text="a").is_correct)
+
+    def test_update_multiple_without_question_type(self):
+        """Тестирует обновление вопроса с несколькими ответами без question_type."""
+
+        payload = self._payload(1)
+        payload["questions"][0]["question_type"] = "multiple"
+        for answer in payload["questions"][0]["answers"][:2]:
+            answer["is_correct"] = True
+        response = self.client.post(
+            reverse("tests:test_authoring"), payload, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        data = response.data
+        question = data["questions"][0]
+        question.pop("question_type")
+        question["text"] = "Updated text"
+
+        response = self.client.put(
+            reverse("tests:test_authoring_detail", kwargs={"pk": data["id"]}),
+            {"name": data["name"], "passing_score": 60, "questions": [question]},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        updated = Question.objects.get(pk=question["id"])
+        self.assertEqual(updated.question_type, "multiple")
+        self.assertEqual(updated.text, "Updated text")
+
+    def test_update_single_with_stored_correct_answers(self):
+        """Тестирует отказ, если с сохраненными ответами правильных становится несколько."""
+
+        data = self._create(1)
+        question = data["questions"][0]
+        question.pop("question_type")
+        for answer in question["answers"]:
+            answer.pop("is_correct")
+        question["answers"][1]["is_correct"] = True
+
+        response = self.client.put(
+            reverse("tests:test_authoring_detail", kwargs={"pk": data["id"]}),
+            {"name": data["name"], "passing_score": 60, "questions": [question]},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Answer.objects.get(pk=question["answers"][1]["id"]).is_correct)
+
+    def test_other_teacher_forbidden(self):
+        """Тестирует запрет изменения чужого теста HTTP_403_FORBIDDEN."""
+
+        data = self._create(1)
+        self.client.force_authenticate(user=self.other_teacher)
+
+        response = self.client.put(
+            reverse("tests:test_authoring_detail", kwargs={"pk": data["id"]}),
+            self._payload(1),
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(Question.objects.filter(test_id=data["id"]).count(), 1)
+
+
+class QuestionBankTestCase(APITestCase):
+    """Тесты экспорта и импорта банков вопросов."""
+
+    def setUp(self):
+        self.teacher_group, _ = Group.objects.get_or_create(name="Преподаватели")
+        self.teacher_user = User.objects.create(
+            email="teacher@test.com", role="teacher"
+        )
+        self.teacher_user.groups.add(self.teacher_group)
+        self.other_teacher = User.objects.create(email="other@test.com", role="teacher")
+        self.other_teacher.groups.add(self.teacher_group)
+
+        self.source = Test.objects.create(
+            name="Source", owner=self.teacher_user, passing_score=50
+        )
+        self.target = Test.objects.create(
+            name="Target", owner=self.teacher_user, passing_score=50
+        )
+        for i in range(5):
+            question = Question.objects.create(
+                name=f"Вопрос {i}",
+                text=f'Текст, "с кавычками"\nи переводом строки {i}',
+                test=self.source,
+                question_type="text" if i == 4 else "single",
+                tag="алгебра" if i % 2 else "",
+                difficulty="easy",
+            )
+            if i == 4:
+                continue
+            for j in range(3):
+                Answer.objects.create(
+                    question=question, text=f"Ответ {i}.{j}", is_correct=j == 0
+                )
+        self.client.force_authenticate(user=self.teacher_user)
+
+    def _bank(self, test):
+        return [
+            (
+                question.name,
+                question.text,
+                question.question_type,
+                question.tag,
+                question.difficulty,
+                [
+                    (answer.text, answer.is_correct)
+                    for answer in question.answers.order_by("id")
+                ],
+            )
+            for question in test.questions.order_by("id")
+        ]
+
+    def _export(self, bank_format):
+        response = self.client.get(
+            reverse(
+                "tests:test_question_bank",
+                kwargs={"test_id": self.source.id, "bank_format": bank_format},
+            )
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content)
+
+    def _import(self, content, bank_format):
+        upload = SimpleUploadedFile(f"bank.{bank_format}", content)
+        return self.client.post(
+            reverse(
+                "tests:test_question_bank",
+                kwargs={"test_id": self.target.id, "bank_format": bank_format},
+            ),
+            {"file": upload},
+            format="multipart",
+        )
+
+    def test_round_trip(self):
+        """Тестирует перенос банка вопросов через JSON Lines и CSV."""
+
+        for bank_format in ("jsonl", "csv"):
+            with self.subTest(bank_format=bank_format):
+                Question.objects.filter(test=self.target).delete()
+                response = self._import(self._export(bank_format), bank_format)
+
+                self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+                self.assertEqual(response.data["questions"], 5)
+                self.assertEqual(response.data["answers"], 12)
+                self.assertIn("rows_per_second", response.data)
+                self.assertEqual(self._bank(self.target), self._bank(self.source))
+
+    def test_export_queries_per_chunk(self):
+        """Тестирует загрузку ответов одним запросом на порцию вопросов."""
+
+        with self.assertNumQueries(3):
+            questions = list(QuestionBankService.export(self.source, chunk_size=3))
+
+        self.assertEqual(len(questions), 5)
+        self.assertEqual(len(questions[0]["answers"]), 3)
+
+    def test_import_error_reports_line(self):
+        """Тестирует отказ импорта с номером строки без сохранения вопросов."""
+
+        content = (
+            json.dumps({"name": "Ок", "text": "Текст", "answers": []})
+            + "\n"
+            + json.dumps({"name": "Без текста", "answers": []})
+            + "\n"
+        ).encode()
+
+        response = self._import(content, "jsonl")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["line"], "2")
+        self.assertFalse(Question.objects.filter(test=self.target).exists())
+
+    def test_import_answers_without_is_correct(self):
+        """Тестирует импорт JSON Lines с ответами без is_correct как неправильными."""
+
+        content = (
+            json.dumps({"name": "Вопрос", "text": "Текст", "answers": [{"text": "a"}]})
+            + "\n"
+        ).encode()
+
+        response = self._import(content, "jsonl")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self._bank(self.target)[0][5], [("a", False)])
+
+    def test_import_short_csv_row(self):
+        """Тестирует импорт CSV со строкой без последних столбцов."""
+
+        content = (
+            "question,name,text,question_type,tag,difficulty,answer,is_correct\n"
+            "1,Вопрос,Текст,single,,easy,a\n"
+            "1,Вопрос,Текст,single,,easy,b,1\n"
+            "2,Короткий\n"
+        ).encode()
+
+        response = self._import(content, "csv")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["line"], "4")
+
+        response = self._import(content.rsplit(b"2,", 1)[0], "csv")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self._bank(self.target)[0][5], [("a", False), ("b", True)])
+
+    def test_import_command_answers_without_is_correct(self):
+        """Тестирует импорт командой ответов без is_correct."""
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = f"{directory}/bank.jsonl"
+        with open(path, "w", encoding="utf-8") as bank:
+            bank.write(
+                json.dumps(
+                    {"name": "Вопрос", "text": "Текст", "answers": [{"text": "a"}]}
+                )
+                + "\n"
+            )
+
+        out = StringIO()
+        call_command("import_bank", test=self.target.id, input=path, stdout=out)
+
+        self.assertIn("Импортировано вопросов: 1, ответов: 1", out.getvalue())
+
+    def test_other_teacher_forbidden(self):
+        """Тестирует запрет экспорта чужого теста HTTP_403_FORBIDDEN."""
+
+        self.client.force_authenticate(user=self.other_teacher)
+        response = self.client.get(
+            reverse(
+                "tests:test_question_bank",
+                kwargs={"test_id": self.source.id, "bank_format": "csv"},
+            )
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_commands(self):
+        """Тестирует экспорт и импорт банка вопросов командами."""
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = f"{directory}/bank.csv"
+
+        call_command("export_bank", test=self.source.id, format="csv", output=path)
+        out = StringIO()
+        call_command("import_bank", test=self.target.id, input=path, stdout=out)
+
+        self.assertIn("Импортировано вопросов: 5, ответов: 12", out.getvalue())
+        self.assertEqual(self._bank(self.target), self._bank(self.source))
+        self.assertEqual(
+            set(self.target.questions.values_list("owner_id", flat=True)),
+            {self.teacher_user.id},
+        )
+
+
+class GradebookExportTestCase(APITestCase):
+    """Тесты потоковой выгрузки результатов тестов."""
+
+    def setUp(self):
+        self.admin_group, _ = Group.objects.get_or_create(name="Администраторы")
+        self.teacher_group, _ = Group.objects.get_or_create(name="Преподаватели")
+        self.student_group, _ = Group.objects.get_or_create(name="Студенты")
+
+        self.admin_user = User.objects.create(email="admin@test.com", role="admin")
+        self.admin_user.groups.add(self.admin_group)
+        self.teacher_user = User.objects.create(
+            email="teacher@test.com", role="teacher"
+        )
+        self.teacher_user.groups.add(self.teacher_group)
+        self.student_user = User.objects.create(
+            email="student@test.com", role="student"
+        )
+        self.student_user.groups.add(self.student_group)
+
+        self.test = Test.objects.create(
+            name="Алгебра, часть 1", owner=self.teacher_user, passing_score=50
+        )
+        self.other_test = Test.objects.create(
+            name="История", owner=self.admin_user, passing_score=50
+        )
+        TestResult.objects.bulk_create(
+            TestResult(
+                student=self.student_user,
+                test=test,
+                score=i,
+                total_questions=10,
+                correct_answers=i,
+                percentage=i * 10.0,
+                is_passed=i >= 5,
+            )
+            for test in (self.test, self.other_test)
+            for i in range(4)
+        )
+        TestResult.objects.filter(test=self.other_test).update(
+            completed_at=timezone.now() - timedelta(days=10)
+        )
+
+    def _export(self, export_format, params=None):
+        response = self.client.get(
+            reverse(
+                "tests:test_results_export", kwargs={"export_format": export_format}
+            ),
+            params or {},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content).decode()
+
+    def test_csv_export(self):
+        """Тестирует выгрузку CSV с email студента и названием теста."""
+
+        self.client.force_authenticate(user=self.admin_user)
+        rows = list(csv.DictReader(StringIO(self._export("csv"))))
+
+        self.assertEqual(len(rows), 8)
+        self.assertEqual(rows[0]["student_email"], "student@test.com")
+        self.assertEqual(rows[0]["test_name"], "Алгебра, часть 1")
+        self.assertEqual(rows[3]["is_passed"], "False")
+
+    def test_jsonl_export_filtered_by_period(self):
+        """Тестирует выгрузку JSON Lines за период."""
+
+        self.client.force_authenticate(user=self.admin_user)
+        content = self._export(
+            "jsonl",
+            {"completed_after": (timezone.now() - timedelta(days=1)).isoformat()},
+        )
+        rows = [json.loads(line) for line in content.splitlines()]
+
+        self.assertEqual({row["test_id"] for row in rows}, {self.test.id})
+        self.assertEqual(len(rows), 4)
+
+    def test_teacher_exports_own_tests(self):
+        """Тестирует выгрузку преподавателем только результатов его тестов."""
+
+        self.client.force_authenticate(user=self.teacher_user)
+        rows = list(csv.DictReader(StringIO(self._export("csv"))))
+
+        self.assertEqual({row["test_id"] for row in rows}, {str(self.test.id)})
+
+    def test_rows_read_in_single_query(self):
+        """Тестирует чтение результатов одним запросом с соединением таблиц."""
+
+        with self.assertNumQueries(1):
+            rows = list(GradebookService.rows(TestResult.objects.all(), chunk_size=3))
+
+        self.assertEqual(len(rows), 8)
+        self.assertIsInstance(rows[0], tuple)
+
+    def test_student_forbidden(self):
+        """Тестирует запрет выгрузки студентом HTTP_403_FORBIDDEN."""
+
+        self.client.force_authenticate(user=self.student_user)
+        response = self.client.get(
+            reverse("tests:test_results_export", kwargs={"export_format": "csv"})
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
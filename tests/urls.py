@@ -7,8 +7,18 @@ from tests.views import (
     AnswerViewSet,
     TestResultDestroyAPIView,
     TestResultListAPIView,
+    GradebookExportAPIView,
+    QuestionBankAPIView,
+    TestAuthoringAPIView,
+    TestAuthoringDetailAPIView,
     TestDetailAPIView,
+    TestStartView,
     TestSubmitView,
+    TestBulkSubmitView,
+    TestAttemptRetrieveAPIView,
+    TestSnapshotAPIView,
+    TestStatsAPIView,
+    ItemAnalysisAPIView,
     TestResultRetrieveAPIView,
 )
 
@@ -21,9 +31,52 @@ router.register("answer", AnswerViewSet, basename="answer")
 
 urlpatterns = [
     path("", include(router.urls)),
+    path("authoring/", TestAuthoringAPIView.as_view(), name="test_authoring"),
+    path(
+        "authoring/<int:pk>/",
+        TestAuthoringDetailAPIView.as_view(),
+        name="test_authoring_detail",
+    ),
+    path(
+        "banks/<int:test_id>/<str:bank_format>/",
+        QuestionBankAPIView.as_view(),
+        name="test_question_bank",
+    ),
     path("detail/<int:pk>/", TestDetailAPIView.as_view(), name="test_detail"),
+    path(
+        "snapshots/<int:test_id>/",
+        TestSnapshotAPIView.as_view(),
+        name="test_snapshot_latest",
+    ),
+    path(
+        "snapshots/<int:test_id>/<int:version>/",
+        TestSnapshotAPIView.as_view(),
+        name="test_snapshot",
+    ),
+    path("start/<int:test_id>/", TestStartView.as_view(), name="test_start"),
     path("submit/<int:test_id>/", TestSubmitView.as_view(), name="test_submit"),
+    path(
+        "submit/<int:test_id>/bulk/",
+        TestBulkSubmitView.as_view(),
+        name="test_submit_bulk",
+    ),
+    path(
+        "attempts/<int:pk>/",
+        TestAttemptRetrieveAPIView.as_view(),
+        name="test_attempt_detail",
+    ),
+    path("stats/<int:test_id>/", TestStatsAPIView.as_view(), name="test_stats"),
+    path(
+        "items/<int:test_id>/",
+        ItemAnalysisAPIView.as_view(),
+        name="test_item_analysis",
+    ),
     path("results/", TestResultListAPIView.as_view(), name="test_results"),
+    path(
+        "results/export/<str:export_format>/",
+        GradebookExportAPIView.as_view(),
+        name="test_results_export",
+    ),
     path(
         "results/<int:pk>/detail/",
         TestResultRetrieveAPIView.as_view(),
@@ -1,3 +1,7 @@
+import gzip
+import io
+
+from rest_framework.decorators import action
 from rest_framework.generics import (
     DestroyAPIView,
     ListAPIView,
@@ -7,29 +11,67 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from django.conf import settings
+from django.db import transaction
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    HttpResponseNotModified,
+    StreamingHttpResponse,
+)
 from django.shortcuts import get_object_or_404
+from django.utils.http import parse_etags
 
+from fieldsets import FieldsetViewSetMixin
+from pagination import CompletedAtCursorPagination
+from search import SearchViewSetMixin
 from permissions import (
     IsAdminOrTeacher,
     IsAdminOrTeacherOwner,
     IsAdminOrStudent,
     IsAdminOrStudentOwner,
     IsStudentOwner,
+    OwnerListMixin,
+    get_user_roles,
 )
 
-from tests.models import Test, Question, Answer, TestResult
+from tests import banks, gradebook
+from tests.cache import get_test_version
+from tests.models import Test, Question, Answer, TestResult, TestAttempt, TestStats
 from tests.serializer import (
     TestSerializer,
     QuestionSerializer,
     AnswerSerializer,
     TestResultSerializer,
     TestDetailSerializer,
+    GradebookQuerySerializer,
+    TestDetailQuerySerializer,
+    TestResultListQuerySerializer,
     TestSubmissionSerializer,
+    TestAttemptSerializer,
+    TestStatsSerializer,
+    StartedAttemptSerializer,
+    TestAuthoringSerializer,
+)
+from tests.services import (
+    BulkSubmitService,
+    GradingQueueService,
+    ItemAnalysisService,
+    QuestionSamplingService,
+    SnapshotService,
+    StatsService,
+    TestCalculateService,
+    GradebookService,
+    QuestionBankService,
+    TestAuthoringService,
+    TestDetailService,
 )
-from tests.services import TestCalculateService
 
 
-class TestViewSet(ModelViewSet):
+class TestViewSet(
+    SearchViewSetMixin, FieldsetViewSetMixin, OwnerListMixin, ModelViewSet
+):
     """ViewSet модели Test."""
 
     queryset = Test.objects.all()
@@ -44,17 +86,31 @@ class TestViewSet(ModelViewSet):
             self.permission_classes = [IsAdminOrTeacher]
         elif self.action in ["partial_update", "update", "retrieve"]:
             self.permission_classes = [IsAdminOrTeacherOwner]
-        elif self.action == "destroy":
+        elif self.action in ["destroy", "publish"]:
             self.permission_classes = [IsAdminOrTeacherOwner]
         return super().get_permissions()
 
     def perform_create(self, serializer):
         """Метод переопределяющий при создании урока поле owner на текущего авторизованного пользователя."""
 
-        serializer.save(owner=self.request.user)
+        serializer.save(owner_id=self.request.user.id)
+
+    @action(detail=True, methods=["post"])
+    def publish(self, request, pk=None):
+        """Публикация неизменяемого снимка теста для прохождения."""
+
+        snapshot = SnapshotService.publish(self.get_object())
+        return Response(
+            {
+                "test": snapshot.test_id,
+                "snapshot_version": snapshot.version,
+                "created_at": snapshot.created_at,
+            },
+            status=201,
+        )
 
 
-class QuestionViewSet(ModelViewSet):
+class QuestionViewSet(FieldsetViewSetMixin, OwnerListMixin, ModelViewSet):
     """ViewSet модели Question."""
 
     queryset = Question.objects.all()
@@ -76,7 +132,7 @@ class QuestionViewSet(ModelViewSet):
     def perform_create(self, serializer):
         """Метод переопределяющий при создании урока поле owner на текущего авторизованного пользователя."""
 
-        serializer.save(owner=self.request.user)
+        serializer.save(owner_id=self.request.user.id)
 
 
 class AnswerViewSet(ModelViewSet):
@@ -99,12 +155,147 @@ class AnswerViewSet(ModelViewSet):
         return super().get_permissions()
 
 
+class TestAuthoringAPIView(APIView):
+    """Создание теста с вопросами и ответами одним запросом."""
+
+    permission_classes = [IsAdminOrTeacher]
+
+    def post(self, request):
+        serializer = TestAuthoringSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        test = TestAuthoringService.save(serializer.validated_data, request.user.id)
+
+        return Response(
+            TestAuthoringSerializer(TestAuthoringService.get_tree(test.id)).data,
+            status=201,
+        )
+
+
+class TestAuthoringDetailAPIView(APIView):
+    """Получение и замена теста с вопросами и ответами одним запросом.
+
+    Вопросы и ответы с id обновляются, без id — создаются, отсутствующие в
+    запросе удаляются.
+    """
+
+    permission_classes = [IsAdminOrTeacherOwner]
+
+    def get(self, request, pk):
+        test = get_object_or_404(TestAuthoringService.get_queryset(), pk=pk)
+        self.check_object_permissions(request, test)
+        return Response(TestAuthoringSerializer(test).data)
+
+    def put(self, request, pk):
+        serializer = TestAuthoringSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        with transaction.atomic():
+            test = get_object_or_404(
+                Test.objects.select_for_update(of=("self",)), pk=pk
+            )
+            self.check_object_permissions(request, test)
+            TestAuthoringService.save(
+                serializer.validated_data, request.user.id, test=test
+            )
+
+        return Response(
+            TestAuthoringSerializer(TestAuthoringService.get_tree(test.id)).data
+        )
+
+
+class QuestionBankAPIView(APIView):
+    """Потоковый экспорт (GET) и импорт (POST, файл file) банка вопросов теста."""
+
+    permission_classes = [IsAdminOrTeacherOwner]
+
+    def get_test(self, request, test_id, bank_format):
+        if bank_format not in banks.FORMATS:
+            raise Http404
+        test = get_object_or_404(Test, id=test_id)
+        self.check_object_permissions(request, test)
+        return test
+
+    def get(self, request, test_id, bank_format):
+        test = self.get_test(request, test_id, bank_format)
+        response = StreamingHttpResponse(
+            banks.write(QuestionBankService.export(test), bank_format),
+            content_type=banks.CONTENT_TYPES[bank_format],
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="test-{test.id}.{bank_format}"'
+        )
+        return response
+
+    def post(self, request, test_id, bank_format):
+        test = self.get_test(request, test_id, bank_format)
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response({"file": ["Загрузите файл банка вопросов."]}, status=400)
+
+        lines = io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+        report = QuestionBankService.import_questions(
+            test, banks.read(lines, bank_format), request.user.id
+        )
+        return Response(report, status=201)
+
+
 class TestDetailAPIView(RetrieveAPIView):
     """Получение теста для прохождения."""
 
     permission_classes = [IsAuthenticated]
     serializer_class = TestDetailSerializer
-    queryset = Test.objects.all()
+    queryset = TestDetailService.get_queryset()
+
+    def retrieve(self, request, *args, **kwargs):
+        """Метод отдачи теста из кеша с поддержкой If-None-Match.
+
+        При SHUFFLE_TEST_QUESTIONS вопросы и варианты ответа перемешиваются
+        воспроизводимо по (студент, тест, попытка).
+        """
+
+        query = TestDetailQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+
+        test_id = kwargs["pk"]
+        version = get_test_version(test_id)
+        shuffle = getattr(settings, "SHUFFLE_TEST_QUESTIONS", False)
+        student_id = request.user.id if shuffle else None
+        attempt = query.validated_data["attempt"]
+        etag = TestDetailService.etag(test_id, version, student_id, attempt)
+
+        if_none_match = parse_etags(request.headers.get("If-None-Match", ""))
+        if etag in if_none_match or "*" in if_none_match:
+            response = HttpResponseNotModified()
+        else:
+            if shuffle:
+                content = TestDetailService.render_shuffled(
+                    test_id, version, student_id, attempt
+                )
+            else:
+                content = TestDetailService.render(test_id, version)
+            if content is None:
+                raise Http404
+            response = HttpResponse(content, content_type="application/json")
+
+        response["ETag"] = etag
+        response["Cache-Control"] = "private, no-cache"
+        return response
+
+
+class TestStartView(APIView):
+    """Начало попытки с выборкой вопросов из пула теста или материала."""
+
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, test_id):
+        test = get_object_or_404(Test, id=test_id)
+        attempt = QuestionSamplingService.start(request.user, test)
+        questions = QuestionSamplingService.get_questions(attempt)
+
+        return Response(
+            StartedAttemptSerializer(attempt, context={"questions": questions}).data,
+            status=201,
+        )
 
 
 class TestSubmitView(APIView):
@@ -118,29 +309,229 @@ class TestSubmitView(APIView):
         if not serializer.is_valid():
             return Response(serializer.errors, status=400)
 
-        result_data = TestCalculateService.calculate_results(
-            self, test, serializer.validated_data["answers"]
+        started = QuestionSamplingService.for_submission(
+            request.user, test, serializer.validated_data.get("attempt_id")
+        )
+        snapshot = (
+            None
+            if started
+            else SnapshotService.for_submission(
+                test, serializer.validated_data.get("snapshot_version")
+            )
         )
 
-        test_result = TestResult.objects.create(
-            student=request.user,
-            test=test,
-            score=result_data["score"],
-            total_questions=result_data["total_questions"],
-            correct_answers=result_data["correct_answers"],
-            percentage=result_data["percentage"],
-            is_passed=result_data["is_passed"],
+        if getattr(settings, "ASYNC_GRADING", False):
+            attempt = GradingQueueService.enqueue(
+                request.user,
+                test,
+                serializer.validated_data["answers"],
+                snapshot,
+                serializer.validated_data["attempt"],
+                started,
+            )
+            return Response(
+                {"attempt_id": attempt.id, "status": attempt.status}, status=202
+            )
+
+        if started is not None:
+            answer_key = QuestionSamplingService.answer_key(test, started)
+        elif snapshot is not None:
+            answer_key = SnapshotService.answer_key(test, snapshot)
+        else:
+            answer_key = None
+        result_data, responses = TestCalculateService.grade_submission(
+            test, serializer.validated_data["answers"], answer_key
         )
 
+        with transaction.atomic():
+            test_result = TestResult.objects.create(
+                student_id=request.user.id,
+                test=test,
+                score=result_data["score"],
+                total_questions=result_data["total_questions"],
+                correct_answers=result_data["correct_answers"],
+                percentage=result_data["percentage"],
+                is_passed=result_data["is_passed"],
+                responses=responses,
+                snapshot=snapshot,
+                attempt_number=serializer.validated_data["attempt"],
+            )
+            if started is not None:
+                QuestionSamplingService.finish(
+                    started,
+                    "done",
+                    answers=serializer.validated_data["answers"],
+                    attempt_number=serializer.validated_data["attempt"],
+                    result=test_result,
+                )
+            # Последним запросом транзакции: строка статистики теста общая для
+            # всех отправок и остается заблокированной до фиксации.
+            StatsService.record_results(test.id, [result_data])
+
+        if snapshot is not None:
+            result_data["snapshot_version"] = snapshot.version
         return Response(result_data, status=201)
 
 
+class TestSnapshotAPIView(APIView):
+    """Получение опубликованного снимка теста из готового файла gzip JSON."""
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, test_id, version=None):
+        snapshot = SnapshotService.get_snapshot(test_id, version)
+        if snapshot is None:
+            raise Http404
+        if snapshot.test.sample_size:
+            QuestionSamplingService.refuse_pool(test_id)
+
+        etag = f'"{test_id}-s{snapshot.version}"'
+        if etag in parse_etags(request.headers.get("If-None-Match", "")):
+            response = HttpResponseNotModified()
+        elif "gzip" in request.headers.get("Accept-Encoding", ""):
+            response = FileResponse(
+                snapshot.content.open("rb"), content_type="application/json"
+            )
+            response["Content-Encoding"] = "gzip"
+        else:
+            with snapshot.content.open("rb") as content:
+                response = HttpResponse(
+                    gzip.decompress(content.read()), content_type="application/json"
+                )
+
+        response["ETag"] = etag
+        response["Vary"] = "Accept-Encoding"
+        response["Cache-Control"] = (
+            "private, no-cache"
+            if version is None
+            else "private, max-age=31536000, immutable"
+        )
+        return response
+
+
+class TestAttemptRetrieveAPIView(RetrieveAPIView):
+    """Generic получения статуса асинхронной проверки попытки."""
+
+    permission_classes = [IsAuthenticated]
+    serializer_class = TestAttemptSerializer
+
+    def get_queryset(self):
+        return TestAttempt.objects.filter(
+            student_id=self.request.user.id
+        ).select_related("result__test")
+
+
+class TestBulkSubmitView(APIView):
+    """Пакетная отправка ответов студентов на тест в формате JSON Lines."""
+
+    permission_classes = [IsAdminOrTeacherOwner]
+
+    def post(self, request, test_id):
+        test = get_object_or_404(Test, id=test_id)
+        self.check_object_permissions(request, test)
+
+        created, errors = BulkSubmitService.submit(test, request.stream or [])
+
+        return Response(
+            {"created": created, "errors": errors},
+            status=201 if created else 400,
+        )
+
+
+class TestStatsAPIView(APIView):
+    """Получение статистики результатов теста."""
+
+    permission_classes = [IsAdminOrTeacherOwner]
+
+    def get(self, request, test_id):
+        test = get_object_or_404(Test, id=test_id)
+        self.check_object_permissions(request, test)
+
+        stats = TestStats.objects.filter(test=test).first() or TestStats(test=test)
+        return Response(TestStatsSerializer(stats).data)
+
+
+class ItemAnalysisAPIView(APIView):
+    """Получение анализа заданий теста: трудность, различающая способность и выбор вариантов."""
+
+    permission_classes = [IsAdminOrTeacherOwner]
+
+    def get(self, request, test_id):
+        test = get_object_or_404(Test, id=test_id)
+        self.check_object_permissions(request, test)
+
+        return Response(ItemAnalysisService.get(test))
+
+
 class TestResultListAPIView(ListAPIView):
     """Generic получения списка результатов тестов пользователя."""
 
     permission_classes = [IsAuthenticated]
     serializer_class = TestResultSerializer
-    queryset = TestResult.objects.all()
+    pagination_class = CompletedAtCursorPagination
+
+    def get_queryset(self):
+        """Результаты студента; администратору — все, преподавателю — по своим тестам.
+
+        Администратор и преподаватель могут отфильтровать результаты по
+        студенту, все пользователи — по тесту.
+        """
+
+        query = TestResultListQuerySerializer(data=self.request.query_params)
+        query.is_valid(raise_exception=True)
+
+        queryset = TestResult.objects.select_related("test").defer("responses")
+        roles = get_user_roles(self.request)
+        if "Администраторы" in roles or "Преподаватели" in roles:
+            if "Администраторы" not in roles:
+                queryset = queryset.filter(test__owner_id=self.request.user.id)
+            if "student" in query.validated_data:
+                queryset = queryset.filter(student_id=query.validated_data["student"])
+        else:
+            queryset = queryset.filter(student_id=self.request.user.id)
+
+        if "test" in query.validated_data:
+            queryset = queryset.filter(test_id=query.validated_data["test"])
+        return queryset
+
+
+class GradebookExportAPIView(APIView):
+    """Потоковая выгрузка результатов тестов в CSV или JSON Lines.
+
+    Администратор выгружает все результаты, преподаватель — по своим тестам;
+    результаты фильтруются по тесту и периоду завершения.
+    """
+
+    permission_classes = [IsAdminOrTeacher]
+
+    def get(self, request, export_format):
+        if export_format not in gradebook.FORMATS:
+            raise Http404
+        query = GradebookQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+
+        results = TestResult.objects.all()
+        if "Администраторы" not in get_user_roles(request):
+            results = results.filter(test__owner_id=request.user.id)
+        if "test" in query.validated_data:
+            results = results.filter(test_id=query.validated_data["test"])
+        if "completed_after" in query.validated_data:
+            results = results.filter(
+                completed_at__gte=query.validated_data["completed_after"]
+            )
+        if "completed_before" in query.validated_data:
+            results = results.filter(
+                completed_at__lt=query.validated_data["completed_before"]
+            )
+
+        response = StreamingHttpResponse(
+            gradebook.write(GradebookService.rows(results), export_format),
+            content_type=gradebook.CONTENT_TYPES[export_format],
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="results.{export_format}"'
+        )
+        return response
 
 
 class TestResultRetrieveAPIView(RetrieveAPIView):
@@ -151,7 +542,7 @@ class TestResultRetrieveAPIView(RetrieveAPIView):
     queryset = TestResult.objects.all()
 
     def get_queryset(self):
-        return TestResult.objects.filter(student=self.request.user)
+        return TestResult.objects.filter(student_id=self.request.user.id)
 
 
 class TestResultDestroyAPIView(DestroyAPIView):
@@ -0,0 +1,109 @@
+import threading
+import time
+
+from django.conf import settings
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from users.models import User
+
+
+class TokenVersionCache:
+    """Кеш версий токенов пользователей в памяти процесса с ограниченным временем жизни.
+
+    Изменение ролей в этом процессе сбрасывает запись сразу, изменения из
+    других процессов становятся видны не позже чем через ttl секунд. Ключ —
+    строковый id пользователя, как в claim токена.
+    """
+
+    MAX_ENTRIES = 10000
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        """Текущая версия токенов активного пользователя, None — пользователь не найден или отключен."""
+
+        key = str(user_id)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and entry[1] > now:
+            return entry[0]
+
+        row = (
+            User.objects.filter(**{api_settings.USER_ID_FIELD: user_id})
+            .values_list("token_version", "is_active")
+            .first()
+        )
+        version = row[0] if row is not None and row[1] else None
+
+        with self._lock:
+            if len(self._entries) >= self.MAX_ENTRIES:
+                self._entries = {
+                    key: value for key, value in self._entries.items() if value[1] > now
+                }
+            self._entries[key] = (version, now + self.ttl)
+        return version
+
+    def discard(self, user_id):
+        """Сброс записи пользователя."""
+
+        with self._lock:
+            self._entries.pop(str(user_id), None)
+
+    def clear(self):
+        """Очистка кеша."""
+
+        with self._lock:
+            self._entries.clear()
+
+
+token_version_cache = TokenVersionCache(
+    getattr(settings, "TOKEN_VERSION_CACHE_TTL", 30)
+)
+
+
+class RoleTokenUser(TokenUser):
+    """Пользователь, восстановленный из claims токена без загрузки из БД."""
+
+    @cached_property
+    def id(self):
+        return User._meta.pk.to_python(self.token[api_settings.USER_ID_CLAIM])
+
+    @cached_property
+    def pk(self):
+        return self.id
+
+    @property
+    def token_roles(self):
+        return frozenset(self.token.get("roles", ()))
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """Аутентификация по JWT с ролями и версией токенов в claims.
+
+    Пользователь строится из claims, а актуальность токена проверяется по
+    версии токенов из TokenVersionCache. Токены без версии обрабатываются
+    как в JWTAuthentication.
+    """
+
+    def get_user(self, validated_token):
+        if "token_version" not in validated_token:
+            return super().get_user(validated_token)
+
+        version = token_version_cache.get(validated_token[api_settings.USER_ID_CLAIM])
+        if version is None:
+            raise AuthenticationFailed(
+                "Пользователь не найден или отключен.", code="user_inactive"
+            )
+        if version != validated_token["token_version"]:
+            raise AuthenticationFailed(
+                "Токен устарел, выполните вход повторно.", code="token_outdated"
+            )
+        return RoleTokenUser(validated_token)
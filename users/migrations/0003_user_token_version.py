@@ -0,0 +1,20 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0002_user_role_alter_user_avatar_alter_user_city_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="token_version",
+            field=models.PositiveIntegerField(
+                default=0, verbose_name="Версия токенов доступа"
+            ),
+        ),
+    ]
@@ -33,6 +33,9 @@ class User(AbstractUser):
     role = models.CharField(
         max_length=7, verbose_name="Роль", choices=ROLE, default="student"
     )
+    token_version = models.PositiveIntegerField(
+        verbose_name="Версия токенов доступа", default=0
+    )
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = []
@@ -0,0 +1,54 @@
+from django.db.models import F
+from django.db.models.signals import m2m_changed, pre_save
+from django.dispatch import receiver
+
+from users.authentication import token_version_cache
+from users.models import User
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def bump_token_version_on_groups_change(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    """Увеличение версии токенов пользователей при изменении их групп.
+
+    При очистке со стороны группы pk_set не передается, поэтому пользователи
+    группы запоминаются в pre_clear.
+    """
+
+    if action == "pre_clear" and reverse:
+        instance._cleared_user_ids = set(instance.user_set.values_list("pk", flat=True))
+        return
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if action == "post_clear" and reverse:
+        user_ids = instance.__dict__.pop("_cleared_user_ids", set())
+    else:
+        user_ids = pk_set if reverse else {instance.pk}
+    if not user_ids:
+        return
+
+    User.objects.filter(pk__in=user_ids).update(token_version=F("token_version") + 1)
+    for user_id in user_ids:
+        token_version_cache.discard(user_id)
+    if not reverse:
+        instance.refresh_from_db(fields=["token_version"])
+
+
+@receiver(pre_save, sender=User)
+def bump_token_version_on_role_change(sender, instance, raw=False, **kwargs):
+    """Увеличение версии токенов при смене роли или отключении пользователя."""
+
+    if not instance.pk or raw:
+        return
+    previous = (
+        User.objects.filter(pk=instance.pk)
+        .values_list("role", "is_active", "token_version")
+        .first()
+    )
+    if previous is None:
+        return
+    role, is_active, token_version = previous
+    if role != instance.role or is_active != instance.is_active:
+        instance.token_version = token_version + 1
+        token_version_cache.discard(instance.pk)
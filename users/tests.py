@@ -1,3 +1,158 @@
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
 
-# Create your tests here.
+from materials.models import Section
+from users.authentication import token_version_cache
+
+User = get_user_model()
+
+
+class ClaimsJWTAuthenticationTestCase(APITestCase):
+    """Тесты ролей и версии токенов в claims JWT."""
+
+    def setUp(self):
+        token_version_cache.clear()
+        self.teachers = Group.objects.create(name="Преподаватели")
+        self.students = Group.objects.create(name="Студенты")
+        self.user = User.objects.create(email="teacher@test.com", role="teacher")
+        self.user.set_password("teacher123")
+        self.user.save()
+        self.user.groups.add(self.teachers)
+        Section.objects.create(name="Test Section", owner=self.user)
+
+    def tearDown(self):
+        token_version_cache.clear()
+
+    def login(self):
+        response = self.client.post(
+            reverse("users:login"),
+            {"email": "teacher@test.com", "password": "teacher123"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def authorize(self, access):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+
+    def test_token_contains_roles_and_version(self):
+        """Тест наличия ролей и версии токенов в access-токене."""
+
+        token = AccessToken(self.login()["access"])
+        self.user.refresh_from_db()
+
+        self.assertEqual(token["roles"], ["Преподаватели"])
+        self.assertEqual(token["token_version"], self.user.token_version)
+
+    def test_authorization_without_user_queries(self):
+        """Тест проверки прав без загрузки пользователя и его групп из БД."""
+
+        self.authorize(self.login()["access"])
+        self.client.get(reverse("materials:section-list"))
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("materials:section-list"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), 1)
+
+    def test_create_with_token_user(self):
+        """Тест назначения владельца по пользователю из токена."""
+
+        self.authorize(self.login()["access"])
+
+        response = self.client.post(
+            reverse("materials:section-list"), {"name": "New Section"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Section.objects.get(name="New Section").owner, self.user)
+
+    def test_owner_check_with_token_user(self):
+        """Тест проверки владельца по id пользователя из токена."""
+
+        section = Section.objects.get(name="Test Section")
+        self.authorize(self.login()["access"])
+
+        response = self.client.patch(
+            reverse("materials:section-detail", args=[section.id]),
+            {"name": "Renamed Section"},
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_groups_change_revokes_tokens(self):
+        """Тест отзыва токенов при изменении групп пользователя."""
+
+        tokens = self.login()
+        self.authorize(tokens["access"])
+        self.client.get(reverse("materials:section-list"))
+
+        self.user.groups.remove(self.teachers)
+        self.user.groups.add(self.students)
+
+        response = self.client.get(reverse("materials:section-list"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        response = self.client.post(
+            reverse("users:token_refresh"), {"refresh": tokens["refresh"]}
+        )
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.authorize(self.login()["access"])
+        response = self.client.get(reverse("materials:section-list"))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_group_clear_revokes_tokens(self):
+        """Тест отзыва токенов при очистке пользователей группы."""
+
+        self.authorize(self.login()["access"])
+        self.client.get(reverse("materials:section-list"))
+
+        self.teachers.user_set.clear()
+
+        self.assertFalse(self.user.groups.exists())
+        response = self.client.get(reverse("materials:section-list"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivation_revokes_tokens(self):
+        """Тест отзыва токенов при отключении пользователя."""
+
+        self.authorize(self.login()["access"])
+        self.client.get(reverse("materials:section-list"))
+
+        self.user.is_active = False
+        self.user.save()
+
+        response = self.client.get(reverse("materials:section-list"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_version_change_in_other_process_after_ttl(self):
+        """Тест отзыва токенов, версия которых изменена без сигналов, после истечения кеша."""
+
+        self.authorize(self.login()["access"])
+        self.client.get(reverse("materials:section-list"))
+
+        User.objects.filter(pk=self.user.pk).update(token_version=100)
+
+        response = self.client.get(reverse("materials:section-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        token_version_cache.clear()
+        response = self.client.get(reverse("materials:section-list"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh_keeps_claims(self):
+        """Тест сохранения claims в access-токене, выпущенном при обновлении."""
+
+        response = self.client.post(
+            reverse("users:token_refresh"), {"refresh": self.login()["refresh"]}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            AccessToken(response.data["access"])["roles"], ["Преподаватели"]
+        )
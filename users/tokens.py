@@ -0,0 +1,51 @@
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import (
+    TokenObtainPairSerializer,
+    TokenRefreshSerializer,
+)
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from users.models import User
+
+
+class RoleRefreshToken(RefreshToken):
+    """Refresh-токен с ролями пользователя и версией токенов в claims.
+
+    Access-токен, выпускаемый из него, получает те же claims, поэтому
+    проверка прав не требует обращений к БД.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token["roles"] = sorted(user.groups.values_list("name", flat=True))
+        token["token_version"] = user.token_version
+        return token
+
+
+class RoleTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Serializer входа, выпускающий токены с ролями и версией токенов."""
+
+    token_class = RoleRefreshToken
+
+
+class RoleTokenRefreshSerializer(TokenRefreshSerializer):
+    """Serializer обновления access-токена с проверкой версии токенов по БД."""
+
+    token_class = RoleRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+        if "token_version" in refresh:
+            current = (
+                User.objects.filter(
+                    **{api_settings.USER_ID_FIELD: refresh[api_settings.USER_ID_CLAIM]},
+                    is_active=True,
+                )
+                .values_list("token_version", flat=True)
+                .first()
+            )
+            if current != refresh["token_version"]:
+                raise InvalidToken("Токен устарел, выполните вход повторно.")
+        return super().validate(attrs)